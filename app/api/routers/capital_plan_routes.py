@@ -34,7 +34,7 @@ async def auto_generate_project(payload: AutoProjectRequest):
         open(LOG_FILE_PATH, "w").close()
     log.info("capital plan route request---")
     try:
-        result = _controller.analyze_project_command(
+        result = await _controller.analyze_project_command(
             payload.user_command, payload.model_key.strip(), payload.model_id.strip()
         )
         return result
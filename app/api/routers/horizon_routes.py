@@ -1,9 +1,24 @@
 from app.controllers.huggingface import HuggingFaceController
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+import hmac
 import logging
 from app.controllers.horizon_controller import HorizonController
+from app.graphs.registry import graph_registry
+from app.services.intent_classifier import intent_classifier
 import os
 from app.core.config import settings
+from app.db.replica import replica
+from app.core.deadline import ClientDisconnected, cancel_on_disconnect
+from app.llms.runnable.admission import admission
+from app.llms.runnable.hedging import hedger
+from app.llms.runnable.provider_pool import provider_pool
+from app.llms.runnable.response_cache import response_cache
+from app.services.semantic_cache import semantic_cache
+from app.services.schema_cache import SCHEMA_MODULES, schema_cache
+from app.services.sql_example_store import sql_examples
+from app.services.sql_result_cache import sql_result_cache
+from app.services.sql_template_cache import sql_templates
 
 log = logging.getLogger("horizon_routes")
 _controller = HorizonController()
@@ -18,10 +33,28 @@ async def health():
 
 
 @router.post("/horizon-engine")
-async def horizon_engine(payload: dict):
+async def horizon_engine(payload: dict, request: Request, idempotency_key: str | None = Header(default=None)):
     if os.path.exists(LOG_FILE_PATH):
         open(LOG_FILE_PATH, "w").close()
-    return await _controller.horizon_engine(payload)
+    try:
+        # Stop spending LLM / Laravel calls on clients that already went away
+        return await cancel_on_disconnect(request, _controller.horizon_engine(payload, idempotency_key))
+    except ClientDisconnected:
+        log.info("horizon-engine: client disconnected, request cancelled")
+        return Response(status_code=499)
+
+
+@router.post("/horizon-engine/stream")
+async def horizon_engine_stream(payload: dict, request: Request, format: str | None = None):
+    # Explicit ?format= wins; otherwise negotiate on the Accept header.
+    fmt = format or ("ndjson" if "application/x-ndjson" in request.headers.get("accept", "") else "sse")
+    body = _controller.horizon_engine_stream(payload, fmt)
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "text/event-stream"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/load-models")
@@ -29,3 +62,122 @@ async def load_models(payload: dict):
     if os.path.exists(LOG_FILE_PATH):
         open(LOG_FILE_PATH, "w").close()
     return await _hfController.loadModels()
+
+
+@router.get("/graphs")
+async def graph_stats():
+    return graph_registry.stats()
+
+
+@router.post("/graphs/active")
+async def set_active_graph(payload: dict):
+    version = str(payload.get("version", "")).strip()
+    if version not in graph_registry.versions():
+        raise HTTPException(status_code=400, detail=f"Unknown graph version: {version}")
+    try:
+        if payload.get("rebuild"):
+            graph_registry.rebuild(version)
+        graph_registry.set_active(version)
+    except Exception as e:
+        log.exception("Graph swap failed")
+        raise HTTPException(status_code=500, detail=f"Graph build failed: {e}")
+    return graph_registry.stats()
+
+
+@router.get("/intent-classifier")
+async def intent_classifier_stats():
+    return intent_classifier.stats()
+
+
+@router.get("/llm-admission")
+async def llm_admission_stats():
+    return admission.stats()
+
+
+@router.get("/llm-hedging")
+async def llm_hedging_stats():
+    return hedger.stats()
+
+
+@router.get("/llm-pool")
+async def llm_pool_stats():
+    return provider_pool.stats()
+
+
+@router.get("/llm-cache")
+async def llm_cache_stats():
+    return response_cache.stats()
+
+
+@router.delete("/llm-cache")
+async def llm_cache_clear():
+    # In-process tier only; Redis entries expire by TTL
+    response_cache.clear()
+    return {"status": "cleared"}
+
+
+@router.get("/semantic-cache")
+async def semantic_cache_stats():
+    return semantic_cache.stats()
+
+
+@router.post("/semantic-cache/invalidate")
+async def semantic_cache_invalidate(payload: dict | None = None):
+    # {"intent": "text_to_sql", "match": "projects"}; empty body drops everything
+    payload = payload or {}
+    removed = semantic_cache.invalidate(payload.get("intent"), payload.get("match"))
+    return {"status": "invalidated", "removed": removed}
+
+
+@router.get("/schema-cache")
+async def schema_cache_stats():
+    return schema_cache.stats()
+
+
+@router.post("/schema-cache/invalidate")
+async def schema_cache_invalidate(payload: dict | None = None):
+    # {"modules": ["projects_module"], "refresh": true}; empty body drops every module
+    payload = payload or {}
+    removed = schema_cache.invalidate(payload.get("modules"))
+    if payload.get("refresh") and settings.SCHEMA_CACHE_ENABLED:
+        await schema_cache.warmup(payload.get("modules") or SCHEMA_MODULES)
+    return {"status": "invalidated", "removed": removed}
+
+
+@router.get("/sql-examples")
+async def sql_examples_stats():
+    return sql_examples.stats()
+
+
+@router.get("/sql-templates")
+async def sql_templates_stats():
+    return sql_templates.stats()
+
+
+@router.post("/sql-templates/invalidate")
+async def sql_templates_invalidate(payload: dict | None = None):
+    # {"match": "project_labours"}; empty body drops every template
+    payload = payload or {}
+    removed = sql_templates.invalidate(payload.get("match"))
+    return {"status": "invalidated", "removed": removed}
+
+
+@router.get("/sql-result-cache")
+async def sql_result_cache_stats():
+    return sql_result_cache.stats()
+
+
+@router.post("/sql-result-cache/invalidate")
+async def sql_result_cache_invalidate(payload: dict | None = None, x_webhook_secret: str | None = Header(default=None)):
+    # Laravel webhook: {"tables": ["projects", "project_financials"]}; empty body drops everything
+    secret = settings.SQL_RESULT_CACHE_WEBHOOK_SECRET
+    if secret and not hmac.compare_digest(x_webhook_secret or "", secret):
+        raise HTTPException(status_code=401, detail="invalid webhook secret")
+    payload = payload or {}
+    removed = sql_result_cache.invalidate(payload.get("tables"))
+    return {"status": "invalidated", "removed": removed}
+
+
+@router.get("/sql-executor")
+async def sql_executor_stats():
+    return replica.stats()
@@ -0,0 +1,210 @@
+"""
+Record/replay cassettes for offline graph benchmarks.
+
+A cassette is a JSONL file of external exchanges captured during a real
+run:
+
+    {"kind": "request",   "key": ..., "request": {...}}
+    {"kind": "llm",       "key": ..., "node": ..., "request": {...}, "response": "...", "latency": 1.2}
+    {"kind": "retrieval", "key": ..., "request": {...}, "response": [docs], "latency": 0.4}
+    {"kind": "laravel",   "key": ..., "request": {...}, "response": {...}, "latency": 0.3}
+
+CASSETTE_MODE=record appends every exchange to CASSETTE_PATH.
+CASSETTE_MODE=replay answers LLM calls (ReplayProvider), retrievals and
+call_laravel from the cassette instead of the network, sleeping for the
+injected latency (recorded latency * CASSETTE_LATENCY_SCALE +
+CASSETTE_LATENCY_MS).
+
+Exchanges are matched by a content key. LLM keys use the node name and
+the last human message only, so chat history that differs between the
+recorded run and the replay does not cause misses; a miss falls back to
+the next recorded response for the same node (or kind).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+from langchain_core.outputs import LLMResult
+
+from app.core.config import settings
+import logging
+
+log = logging.getLogger("app.bench.cassette")
+
+CASSETTE_MODES = {"off", "record", "replay"}
+
+
+class CassetteMiss(LookupError):
+    """No recorded exchange matches the replayed call."""
+
+
+def exchange_key(*parts: Any) -> str:
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def llm_key(node: Optional[str], messages: List[Any]) -> str:
+    """Key an LLM call by node and its last human message."""
+    last_human = ""
+    for m in reversed(messages):
+        role = getattr(m, "type", None) or (m.get("role") if isinstance(m, dict) else None)
+        if role in {"human", "user"}:
+            content = getattr(m, "content", None) if not isinstance(m, dict) else m.get("content")
+            last_human = content if isinstance(content, str) else json.dumps(content, default=str)
+            break
+    return exchange_key("llm", node or "", last_human)
+
+
+def documents_to_json(docs: List[Document]) -> List[Dict[str, Any]]:
+    return [{"page_content": d.page_content, "metadata": d.metadata} for d in docs]
+
+
+def documents_from_json(items: List[Dict[str, Any]]) -> List[Document]:
+    return [Document(page_content=i.get("page_content") or "", metadata=i.get("metadata") or {}) for i in items]
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "off", latency_scale: float = 1.0, latency_ms: float = 0.0):
+        mode = (mode or "off").lower()
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"CASSETTE_MODE must be one of {sorted(CASSETTE_MODES)}, got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.latency_ms = latency_ms
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._by_group: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._records: List[Dict[str, Any]] = []
+        if mode == "replay":
+            self.load(path)
+
+    @classmethod
+    def from_settings(cls) -> "Cassette":
+        return cls(
+            path=settings.CASSETTE_PATH,
+            mode=settings.CASSETTE_MODE,
+            latency_scale=settings.CASSETTE_LATENCY_SCALE,
+            latency_ms=settings.CASSETTE_LATENCY_MS,
+        )
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # ---------- recording ----------
+
+    def record(self, kind: str, key: str, request: Any, response: Any = None, latency: float = 0.0, node: Optional[str] = None) -> None:
+        entry = {
+            "kind": kind,
+            "key": key,
+            "node": node,
+            "request": request,
+            "response": response,
+            "latency": round(latency, 4),
+            "ts": time.time(),
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+
+    # ---------- replay ----------
+
+    def load(self, path: str) -> int:
+        with self._lock:
+            self._by_key.clear()
+            self._by_group.clear()
+            self._records = []
+            if not os.path.exists(path):
+                log.warning(f"Cassette {path} does not exist; every replayed call will miss")
+                return 0
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    entry = json.loads(line)
+                    self._records.append(entry)
+                    self._by_key[entry["key"]].append(entry)
+                    self._by_group[(entry["kind"], entry.get("node") or "")].append(entry)
+        log.info(f"Loaded {len(self._records)} cassette entries from {path}")
+        return len(self._records)
+
+    def entries(self, kind: str) -> List[Dict[str, Any]]:
+        return [e for e in self._records if e["kind"] == kind]
+
+    def lookup(self, kind: str, key: str, node: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Recorded entry for `key`; falls back to the next entry of the same
+        kind/node. Entries rotate so repeated benchmark iterations keep working.
+        """
+        with self._lock:
+            for queue in (self._by_key.get(key), self._by_group.get((kind, node or ""))):
+                if queue:
+                    entry = queue[0]
+                    queue.rotate(-1)
+                    return entry
+        raise CassetteMiss(f"No cassette entry for kind={kind} node={node} key={key}")
+
+    def delay_for(self, entry: Dict[str, Any]) -> float:
+        return max(0.0, float(entry.get("latency") or 0.0) * self.latency_scale + self.latency_ms / 1000.0)
+
+    async def replay(self, kind: str, key: str, node: Optional[str] = None) -> Any:
+        entry = self.lookup(kind, key, node)
+        delay = self.delay_for(entry)
+        if delay:
+            await asyncio.sleep(delay)
+        return entry.get("response")
+
+
+class CassetteRecorder(BaseCallbackHandler):
+    """Captures chat model prompts/responses into the cassette while recording."""
+
+    run_inline = True
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self._pending: Dict[UUID, Tuple[str, Optional[str], Dict[str, Any], float]] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        batch = messages[0] if messages else []
+        request = {
+            "messages": [{"type": m.type, "content": m.content} for m in batch],
+        }
+        self._pending[run_id] = (llm_key(node, batch), node, request, time.perf_counter())
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        pending = self._pending.pop(run_id, None)
+        if pending is None:
+            return
+        key, node, request, started = pending
+        try:
+            text = response.generations[0][0].text
+        except (IndexError, AttributeError):
+            text = ""
+        self.cassette.record("llm", key, request, text, time.perf_counter() - started, node=node)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._pending.pop(run_id, None)
+
+
+cassette = Cassette.from_settings()
+cassette_recorder = CassetteRecorder(cassette)
@@ -0,0 +1,144 @@
+"""
+Replay a recorded cassette through the Horizon engine and report latency
+and throughput of the orchestration (no network, CPU only).
+
+    # 1) record while exercising a real deployment
+    CASSETTE_MODE=record CASSETTE_PATH=extras/cassettes/horizon.jsonl uvicorn app.main:app
+
+    # 2) replay offline
+    python -m app.bench.run_benchmark --cassette extras/cassettes/horizon.jsonl \\
+        --concurrency 8 --iterations 200 --latency-scale 0
+
+    # 3) fail CI when p95 regresses by more than 20% against a saved run
+    python -m app.bench.run_benchmark --cassette ... --save bench.json
+    python -m app.bench.run_benchmark --cassette ... --baseline bench.json --max-regression 0.2
+
+Requests are taken from the cassette's "request" entries. Chat memory is
+disabled unless --with-memory is given, so Mongo/Redis latency does not
+leak into the numbers.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Replay a cassette through the Horizon engine.")
+    p.add_argument("--cassette", required=True, help="JSONL cassette recorded with CASSETTE_MODE=record")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--iterations", type=int, default=50, help="total engine requests to run")
+    p.add_argument("--warmup", type=int, default=5, help="requests run before measuring")
+    p.add_argument("--latency-scale", type=float, default=0.0, help="multiplier on recorded latencies")
+    p.add_argument("--latency-ms", type=float, default=0.0, help="fixed latency added per exchange")
+    p.add_argument("--with-memory", action="store_true", help="keep Mongo/Redis chat memory enabled")
+    p.add_argument("--save", help="write the result summary to this JSON file")
+    p.add_argument("--baseline", help="compare against a summary saved with --save")
+    p.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 increase vs baseline (fraction)")
+    return p.parse_args(argv)
+
+
+def _configure_env(args: argparse.Namespace) -> None:
+    # Settings and the cassette singleton are read at import time, so this
+    # has to happen before anything under app/ is imported.
+    os.environ["CASSETTE_MODE"] = "replay"
+    os.environ["CASSETTE_PATH"] = args.cassette
+    os.environ["CASSETTE_LATENCY_SCALE"] = str(args.latency_scale)
+    os.environ["CASSETTE_LATENCY_MS"] = str(args.latency_ms)
+    if not args.with_memory:
+        os.environ["MONGODB_URI"] = ""
+        os.environ["REDIS_URL"] = "redis://127.0.0.1:1/0"
+    os.environ.setdefault("INTENT_CENTROID_ENABLED", "false")
+    os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+async def _run(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.bench.cassette import cassette
+    from app.services.horizon_service import HorizonService
+
+    requests = [e["request"] for e in cassette.entries("request")]
+    if not requests:
+        raise SystemExit(f"No request entries in {args.cassette}; record one with CASSETTE_MODE=record")
+
+    service = HorizonService()
+    sem = asyncio.Semaphore(max(1, args.concurrency))
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int, measure: bool) -> None:
+        nonlocal errors
+        req = requests[i % len(requests)]
+        async with sem:
+            started = time.perf_counter()
+            try:
+                await service.process_horizon_engine_request(
+                    req["user_input"], f"bench-{i}", req.get("model_id"), "replay"
+                )
+            except Exception as e:
+                errors += 1
+                print(f"request {i} failed: {e!r}", file=sys.stderr)
+                return
+            if measure:
+                latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i, False) for i in range(args.warmup)))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i, True) for i in range(args.iterations)))
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": args.iterations,
+        "errors": errors,
+        "concurrency": args.concurrency,
+        "latency_scale": args.latency_scale,
+        "latency_ms": args.latency_ms,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_seconds": {
+            "mean": round(statistics.fmean(latencies), 5) if latencies else 0.0,
+            "p50": round(_percentile(latencies, 0.50), 5),
+            "p95": round(_percentile(latencies, 0.95), 5),
+            "p99": round(_percentile(latencies, 0.99), 5),
+            "max": round(max(latencies), 5) if latencies else 0.0,
+        },
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    _configure_env(args)
+    summary = asyncio.run(_run(args))
+    print(json.dumps(summary, indent=2))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(summary, fh, indent=2)
+
+    if summary["errors"]:
+        return 1
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        base_p95 = baseline["latency_seconds"]["p95"]
+        p95 = summary["latency_seconds"]["p95"]
+        if base_p95 and p95 > base_p95 * (1 + args.max_regression):
+            print(f"p95 regression: {p95:.5f}s vs baseline {base_p95:.5f}s", file=sys.stderr)
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Measure column-level schema pruning (SQL_SCHEMA_PRUNE_TOP_N) on a fixed
+question set before turning it on.
+
+    python -m app.bench.schema_prune_report --top-n 5,10,20,40
+    python -m app.bench.schema_prune_report --live --generate --execute \\
+        --provider do_serverless --save prune.json
+
+Questions are JSON lines with "question" and gold "sql" (optionally an
+explicit "columns" list of `table.column`). For every N it reports:
+
+- prompt tokens of the SQL user message with the full vs the pruned schema
+  (mean / p95) and the saving;
+- gold column recall: share of the gold query's columns still present in
+  the pruned schema, and the share of questions with every gold column
+  kept. Gold columns the schema does not contain are not counted;
+- with --generate, SQL is generated from the full and the pruned prompt
+  (SECOND_SYSTEM_PROMPT, no history); with --execute both and the gold
+  query run through Laravel execute-sql and rows are compared.
+
+The schema is SCHEMA_REGISTRY unless --schema (a JSON file) or --live (all
+Laravel modules, merged) is given.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+DEFAULT_QUESTIONS = "extras/bench/sql_questions.jsonl"
+
+_TABLE_ALIAS_RE = re.compile(r"\b(?:from|join)\s+([\w.`]+)(?:\s+(?:as\s+)?(?!on\b|where\b|join\b|left\b|inner\b|group\b|order\b|limit\b)(\w+))?", re.I)
+_COLUMN_REF_RE = re.compile(r"\b(\w+)\.(\w+)\b")
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Report token savings and accuracy of SQL schema pruning.")
+    p.add_argument("--questions", default=DEFAULT_QUESTIONS, help="JSONL file of {question, sql[, columns]}")
+    p.add_argument("--schema", help="schema JSON file (default: SCHEMA_REGISTRY)")
+    p.add_argument("--live", action="store_true", help="use every Laravel schema module instead")
+    p.add_argument("--top-n", default="5,10,20,40", help="comma-separated values of N to compare")
+    p.add_argument("--generate", action="store_true", help="generate SQL from the full and pruned prompts")
+    p.add_argument("--execute", action="store_true", help="run generated and gold SQL and compare rows")
+    p.add_argument("--provider", default=None, help="provider key for --generate (default: LLM_PROVIDER)")
+    p.add_argument("--model", default=None, help="model id for --generate")
+    p.add_argument("--save", help="write the report to this JSON file")
+    return p.parse_args(argv)
+
+
+def _load_questions(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def gold_columns(sql: str) -> Set[Tuple[str, str]]:
+    """(table, column) pairs referenced as `alias.column` in a gold query."""
+    aliases: Dict[str, str] = {}
+    for table, alias in _TABLE_ALIAS_RE.findall(sql):
+        short = table.split(".")[-1].strip("`")
+        aliases[short.lower()] = short
+        if alias:
+            aliases[alias.lower()] = short
+    found = set()
+    for alias, column in _COLUMN_REF_RE.findall(sql):
+        table = aliases.get(alias.lower())
+        if table is not None:
+            found.add((table, column))
+    return found
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))]
+
+
+def _user_message(question: str, schema_json: str) -> str:
+    return "User Question:\n" + question + "\n\nDatabase Schema (JSON):\n" + schema_json
+
+
+async def _load_schema(args: argparse.Namespace) -> Any:
+    if args.live:
+        from app.services.schema_cache import SCHEMA_MODULES, schema_cache
+
+        return (await schema_cache.get(SCHEMA_MODULES)).content
+    if args.schema:
+        with open(args.schema, encoding="utf-8") as fh:
+            return json.load(fh)
+    from app.schemas.registry import SCHEMA_REGISTRY
+
+    return SCHEMA_REGISTRY
+
+
+async def _generate(llm, question: str, schema_json: str) -> Optional[str]:
+    from langchain_core.prompts import ChatPromptTemplate
+
+    from app.graphs.nodes.prompts.sql_gen_prompt import SECOND_SYSTEM_PROMPT
+
+    prompt = ChatPromptTemplate.from_messages(
+        [("system", "{system_text}"), ("user", "User Question:\n{user_input}\n\nDatabase Schema (JSON):\n{schema_json}")]
+    )
+    try:
+        message = await (prompt | llm).ainvoke(
+            {"system_text": SECOND_SYSTEM_PROMPT, "user_input": question, "schema_json": schema_json},
+            config={"metadata": {"langgraph_node": "sqlgen"}},
+        )
+        return json.loads(message.content)["sql"].strip()
+    except Exception as e:
+        print(f"generation failed for {question!r}: {e!r}", file=sys.stderr)
+        return None
+
+
+def _rows(result: Any) -> Optional[List[str]]:
+    """Order-insensitive comparable form of an execute-sql response."""
+    rows = result.get("data", result.get("rows")) if isinstance(result, dict) else result
+    if not isinstance(rows, list):
+        return None
+    return sorted(
+        json.dumps(sorted(row.values(), key=str) if isinstance(row, dict) else row, sort_keys=True, default=str)
+        for row in rows
+    )
+
+
+async def _execute(sql: Optional[str]) -> Optional[List[str]]:
+    from app.controllers.tool_impl import tool_execute_sql
+
+    if not sql:
+        return None
+    try:
+        return _rows(await tool_execute_sql(sql))
+    except Exception as e:
+        print(f"execute-sql failed for {sql!r}: {e!r}", file=sys.stderr)
+        return None
+
+
+async def _run(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.core.config import settings
+    from app.llms.runnable.prompt_budget import count_tokens
+    from app.services.schema_index import SchemaIndex
+
+    questions = _load_questions(args.questions)
+    schema = await _load_schema(args)
+    index = SchemaIndex(schema)
+    full_json = json.dumps(schema, indent=2)
+    top_ns = [int(n) for n in args.top_n.split(",") if n.strip()]
+    pinned = [c.strip() for c in (settings.SQL_SCHEMA_PINNED_COLUMNS or "").split(",") if c.strip()]
+
+    llm = None
+    if args.generate:
+        from app.llms.runnable.llm_provider import get_chain_llm
+
+        llm = get_chain_llm(args.provider, args.model)
+
+    full_tokens = [count_tokens(_user_message(q["question"], full_json)) for q in questions]
+    gold: List[Set[Tuple[str, str]]] = []
+    for q in questions:
+        columns = {tuple(c.split(".", 1)) for c in q["columns"]} if q.get("columns") else gold_columns(q["sql"])
+        # Columns outside the schema under test cannot be kept by any N
+        gold.append({(t, c) for t, c in columns if c in index.tables.get(t, {})})
+
+    baseline: Dict[str, Any] = {"prompt_tokens_mean": round(statistics.fmean(full_tokens), 1)}
+    gold_rows: List[Optional[List[str]]] = []
+    full_sql: List[Optional[str]] = []
+    if llm is not None:
+        full_sql = [await _generate(llm, q["question"], full_json) for q in questions]
+        baseline["generated"] = sum(1 for s in full_sql if s)
+        if args.execute:
+            gold_rows = [await _execute(q["sql"]) for q in questions]
+            matches = [await _execute(s) == g and g is not None for s, g in zip(full_sql, gold_rows)]
+            baseline["result_accuracy"] = round(sum(matches) / len(matches), 4) if matches else 0.0
+
+    report: Dict[str, Any] = {
+        "questions": len(questions),
+        "total_columns": index.total_columns,
+        "full_schema": baseline,
+        "top_n": {},
+    }
+    for n in top_ns:
+        tokens: List[float] = []
+        recalls: List[float] = []
+        complete = 0
+        kept_columns: List[int] = []
+        missed: Dict[str, List[str]] = {}
+        pruned_sql: List[Optional[str]] = []
+        for q, expected, full in zip(questions, gold, full_tokens):
+            result = index.prune(q["question"], n, pinned)
+            if result is None:
+                # No match: the node sends the full schema
+                tokens.append(full)
+                kept = {(t, c) for t, columns in index.tables.items() for c in columns}
+                kept_columns.append(index.total_columns)
+                pruned_json = full_json
+            else:
+                pruned_json = json.dumps(result.content, indent=2)
+                tokens.append(count_tokens(_user_message(q["question"], pruned_json)))
+                kept = {(t, c) for t, columns in result.columns.items() for c in columns}
+                kept_columns.append(result.kept_columns)
+            if expected:
+                hit = expected & kept
+                recalls.append(len(hit) / len(expected))
+                if hit == expected:
+                    complete += 1
+                else:
+                    missed[q["question"]] = sorted(f"{t}.{c}" for t, c in expected - kept)
+            if llm is not None:
+                pruned_sql.append(await _generate(llm, q["question"], pruned_json))
+
+        entry: Dict[str, Any] = {
+            "prompt_tokens_mean": round(statistics.fmean(tokens), 1),
+            "prompt_tokens_p95": round(_percentile(tokens, 0.95), 1),
+            "token_saving": round(1 - sum(tokens) / sum(full_tokens), 4) if sum(full_tokens) else 0.0,
+            "kept_columns_mean": round(statistics.fmean(kept_columns), 1),
+            "gold_column_recall": round(statistics.fmean(recalls), 4) if recalls else None,
+            "questions_fully_covered": round(complete / len(recalls), 4) if recalls else None,
+            "missed_columns": missed,
+        }
+        if llm is not None:
+            entry["generated"] = sum(1 for s in pruned_sql if s)
+            entry["same_sql_as_full"] = sum(
+                1 for a, b in zip(pruned_sql, full_sql) if a and b and " ".join(a.split()) == " ".join(b.split())
+            )
+            if args.execute:
+                matches = [await _execute(s) == g and g is not None for s, g in zip(pruned_sql, gold_rows)]
+                entry["result_accuracy"] = round(sum(matches) / len(matches), 4) if matches else 0.0
+        report["top_n"][str(n)] = entry
+    return report
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    if args.execute and not args.generate:
+        raise SystemExit("--execute needs --generate")
+    # Read at import time by app.core.config
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["LLM_HEDGE_ENABLED"] = "false"
+    report = asyncio.run(_run(args))
+    print(json.dumps(report, indent=2))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
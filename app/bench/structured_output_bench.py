@@ -0,0 +1,146 @@
+"""
+Compare structured-output modes ("prompt" format instructions vs provider
+"native" JSON schema / tool calling) against a live provider.
+
+    python -m app.bench.structured_output_bench --provider openai --iterations 10
+    python -m app.bench.structured_output_bench --provider do_serverless \\
+        --cases intent,work_request --save structured.json
+
+For every case and mode it reports prompt tokens (provider usage when
+reported, else the ~4 chars/token estimate), latency percentiles and the
+parse-failure rate. Each call is a single attempt: the prompt-mode
+fallback of `structured_chain` is not used, so native failures show up.
+The LLM response cache and hedging are disabled for the run.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+CASES = ("intent", "work_request", "project_summary_extract")
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark prompt vs native structured output.")
+    p.add_argument("--provider", default=None, help="provider key (default: LLM_PROVIDER)")
+    p.add_argument("--model", default=None, help="model id (default: the provider's configured model)")
+    p.add_argument("--cases", default=",".join(CASES), help=f"comma-separated subset of {', '.join(CASES)}")
+    p.add_argument("--iterations", type=int, default=5, help="calls per case and mode")
+    p.add_argument("--save", help="write the result summary to this JSON file")
+    return p.parse_args(argv)
+
+
+def _case_inputs(case: str):
+    """(prompt, schema, inputs, format_var) for a benchmark case."""
+    if case == "intent":
+        from app.graphs.nodes.intent_node import INTENT_PROMPT
+        from app.models.parsers.chat_node_parsers import IntentResult
+
+        return INTENT_PROMPT, IntentResult, {
+            "user_input": "How many open work orders do we have in the UK this month?",
+            "chat_history": [],
+        }, "format_instructions"
+    if case == "work_request":
+        from app.graphs.nodes.work_request_node import WORK_REQUEST_PROMPT, enum_tables
+        from app.models.parsers.work_request_models import WorkRequestModel
+
+        return WORK_REQUEST_PROMPT, WorkRequestModel, {
+            **enum_tables(),
+            "user_query": "Create a work request to replace two chiller pumps at ABC Tower, urgent, lump sum.",
+            "retrieved_context": "PROJECT #1\nSCOPE OF WORK:\nReplace chilled water pump P-2 and VFD.\nMETADATA:\ndiscipline: Mechanical",
+            "chat_history": [],
+        }, "format_instructions"
+    if case == "project_summary_extract":
+        from app.graphs.nodes.project_summary_node import EXTRACTOR_PROMPT, SearchParamModel
+
+        return EXTRACTOR_PROMPT, SearchParamModel, {
+            "query": "Summarize project US-EW-06112025-12987",
+            "chat_history": [],
+        }, "format"
+    raise SystemExit(f"Unknown case {case!r}; choose from {', '.join(CASES)}")
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))]
+
+
+async def _run_mode(llm, case: str, mode: str, iterations: int) -> Dict[str, Any]:
+    from app.llms.runnable.admission import estimate_tokens
+    from app.llms.runnable.structured import build_structured
+
+    prompt, schema, inputs, format_var = _case_inputs(case)
+    built = build_structured(prompt, llm, schema, node=f"bench_{case}", mode=mode, format_var=format_var)
+    if built is None:
+        return {"supported": False}
+    prompt, bound_llm, parser = built
+
+    latencies: List[float] = []
+    prompt_tokens: List[int] = []
+    failures = 0
+    for _ in range(iterations):
+        try:
+            messages = await prompt.ainvoke(inputs)
+            started = time.perf_counter()
+            message = await bound_llm.ainvoke(messages)
+        except Exception as e:
+            failures += 1
+            print(f"{case}/{mode}: prompt or call failed: {e!r}", file=sys.stderr)
+            continue
+        latencies.append(time.perf_counter() - started)
+        usage = getattr(message, "usage_metadata", None) or {}
+        # estimate_tokens adds the completion budget; count the prompt only
+        prompt_tokens.append(usage.get("input_tokens") or estimate_tokens(messages, max_tokens=1) - 1)
+        try:
+            parser.invoke(message)
+        except Exception as e:
+            failures += 1
+            print(f"{case}/{mode}: parse failed: {e}", file=sys.stderr)
+
+    return {
+        "supported": True,
+        "calls": iterations,
+        "prompt_tokens_mean": round(statistics.fmean(prompt_tokens), 1) if prompt_tokens else 0.0,
+        "latency_seconds": {
+            "p50": round(_percentile(latencies, 0.50), 4),
+            "p95": round(_percentile(latencies, 0.95), 4),
+            "mean": round(statistics.fmean(latencies), 4) if latencies else 0.0,
+        },
+        "parse_failure_rate": round(failures / iterations, 4) if iterations else 0.0,
+    }
+
+
+async def _run(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.llms.runnable.llm_provider import get_chain_llm
+
+    llm = get_chain_llm(args.provider, args.model)
+    results: Dict[str, Any] = {"provider": llm.provider_name, "model": llm.model_id, "cases": {}}
+    for case in [c.strip() for c in args.cases.split(",") if c.strip()]:
+        results["cases"][case] = {
+            mode: await _run_mode(llm, case, mode, args.iterations) for mode in ("prompt", "native")
+        }
+    return results
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    # Read at import time by app.core.config
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["LLM_HEDGE_ENABLED"] = "false"
+    summary = asyncio.run(_run(args))
+    print(json.dumps(summary, indent=2))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(summary, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,8 @@ from app.services.capital_request_generation import create_project_intent_chain
 from app.models.capital.request_generation import ProjectIntentLLM
 from app.models.capital.request_generation import ProjectAutoGenerated
 from app.services.best_selection import call_best_selection_llm
+from app.core.config import settings
+import asyncio
 import json
 import logging
 from typing import Dict, Any, List
@@ -85,18 +87,23 @@ class CapitalPlanningController:
                     status_code=400, detail="No purchasable items found in scope."
                 )
 
-            # 2) For each item, call Tavily and estimate price
-            estimates: List[ItemEstimate] = []
-            for item in material_result.items:
-                estimate = estimate_price_for_item(item, req)
-                estimates.append(estimate)
-                log.info("final estimate: %s", estimate)
+            # Items are independent, but each one calls Tavily / the LLM: bound the
+            # fan-out so a large plan does not run into provider rate limits
+            limit = asyncio.Semaphore(max(1, settings.CAPITAL_ESTIMATE_CONCURRENCY))
+
+            async def bounded(call):
+                async with limit:
+                    return await call
+
+            # 2) For each item, call Tavily and estimate price (items are independent)
+            estimates: List[ItemEstimate] = list(
+                await asyncio.gather(*(bounded(estimate_price_for_item(item, req)) for item in material_result.items))
+            )
             log.info("final estimates to return: %s", estimates)
 
-            selected_estimates = []
-            for estimate in estimates:
-                selected = call_best_selection_llm(estimate)
-                selected_estimates.append(selected)
+            selected_estimates = list(
+                await asyncio.gather(*(bounded(call_best_selection_llm(estimate)) for estimate in estimates))
+            )
 
             log.info("selected estimates to return: %s", selected_estimates)
 
@@ -118,10 +125,10 @@ class CapitalPlanningController:
                 },
             }
 
-    def analyze_project_command(self, user_command: str, model_key: str | None = None, model_id: str | None = None) -> ProjectAutoGenerated:
+    async def analyze_project_command(self, user_command: str, model_key: str | None = None, model_id: str | None = None) -> ProjectAutoGenerated:
         # 1) Call LLM chain → strongly typed intent
         log.info("user_command: %s", user_command)
-        intent: ProjectIntentLLM = create_project_intent_chain(model_key=model_key, model_id=model_id).invoke(
+        intent: ProjectIntentLLM = await create_project_intent_chain(model_key=model_key, model_id=model_id).ainvoke(
             {"user_command": user_command}
         )
         log.info("intent: %s", intent)
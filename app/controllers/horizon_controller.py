@@ -1,6 +1,11 @@
+import json
 import logging
+from typing import Any, AsyncIterator, Dict, Optional
 from fastapi import HTTPException
+from app.core.config import settings
+from app.llms.runnable.admission import AdmissionRejected
 from app.services.horizon_service import HorizonService
+from app.services.singleflight import SingleFlight, request_key
 
 log = logging.getLogger("app.controllers.horizon")
 
@@ -8,8 +13,9 @@ log = logging.getLogger("app.controllers.horizon")
 class HorizonController:
     def __init__(self):
         self.service = HorizonService()
+        self.flight = SingleFlight("horizon_engine", max_completed=settings.IDEMPOTENCY_MAX_ENTRIES)
 
-    async def horizon_engine(self, payload: dict):
+    def _parse_payload(self, payload: dict) -> Dict[str, Any]:
         query = str(payload.get("user_input", "")).strip()
         chat_id = str(payload.get("chat_id", "")).strip()
         model_id = str(payload.get("model_id", "")).strip() or None
@@ -23,8 +29,67 @@ class HorizonController:
             raise HTTPException(status_code=400, detail="Model is required")
         if not model_key:
             raise HTTPException(status_code=400, detail="Model key is required")
+
+        deadline_seconds = payload.get("deadline_seconds")
+        if deadline_seconds is not None:
+            try:
+                deadline_seconds = float(deadline_seconds)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="deadline_seconds must be a number")
+            if deadline_seconds <= 0:
+                raise HTTPException(status_code=400, detail="deadline_seconds must be positive")
+        return {
+            "user_input": query,
+            "chat_id": chat_id,
+            "model_id": model_id,
+            "model_key": model_key,
+            "deadline_seconds": deadline_seconds,
+        }
+
+    async def horizon_engine(self, payload: dict, idempotency_key: Optional[str] = None):
+        args = self._parse_payload(payload)
+
+        def _run():
+            return self.service.process_horizon_engine_request(
+                args["user_input"], args["chat_id"], args["model_id"], args["model_key"], args["deadline_seconds"]
+            )
+
         try:
-            return await self.service.process_horizon_engine_request(query, chat_id, model_id, model_key)
+            if not settings.SINGLE_FLIGHT_ENABLED:
+                return await _run()
+            # Identical concurrent requests (retries, double submits) share one
+            # graph run and one memory write.
+            idempotency_key = (idempotency_key or "").strip() or None
+            key = request_key(
+                args["chat_id"], args["user_input"], args["model_key"], args["model_id"], idempotency_key
+            )
+            keep_for = settings.IDEMPOTENCY_TTL_SECONDS if idempotency_key else None
+            return await self.flight.do(key, _run, keep_for=keep_for)
+        except AdmissionRejected:
+            # Mapped to 503 + Retry-After by the app's exception handler
+            raise
         except Exception:
             log.exception("Dynamic processing failed")
             raise HTTPException(status_code=500, detail="Internal server error")
+
+    def horizon_engine_stream(self, payload: dict, fmt: str = "sse") -> AsyncIterator[str]:
+        """
+        Validates eagerly (so bad input is still a 400) and returns an async
+        iterator of encoded SSE frames or NDJSON lines.
+        """
+        args = self._parse_payload(payload)
+        if fmt not in {"sse", "ndjson"}:
+            raise HTTPException(status_code=400, detail="format must be 'sse' or 'ndjson'")
+
+        async def _encode() -> AsyncIterator[str]:
+            events = self.service.stream_horizon_engine_request(
+                args["user_input"], args["chat_id"], args["model_id"], args["model_key"], args["deadline_seconds"]
+            )
+            async for event in events:
+                data = json.dumps(event, ensure_ascii=False, default=str)
+                if fmt == "ndjson":
+                    yield data + "\n"
+                else:
+                    yield f"event: {event.get('event', 'message')}\ndata: {data}\n\n"
+
+        return _encode()
@@ -1,7 +1,11 @@
 # tool_impl.py
 import os
+import time
 import httpx
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from app.telemetry.metrics import LARAVEL_REQUEST_SECONDS
+from app.bench.cassette import cassette, exchange_key
+from app.core.deadline import call_timeout, with_deadline
 
 # LARAVEL_BASE_URL = "http://127.0.0.1:8003/horizon-extra-works/mcp/api/v1/"
 LARAVEL_BASE_URL = "https://stagingapi.horizoncenter.co/horizon-extra-works/mcp/api/v1/"
@@ -16,12 +20,41 @@ HEADERS = {
 }
 
 
-async def call_laravel(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+async def call_laravel_conditional(
+    path: str, payload: Dict[str, Any], etag: Optional[str] = None
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    POST to a Laravel MCP endpoint with optional ETag revalidation: returns
+    (data, etag), or (None, etag) when the server answers 304 Not Modified.
+    """
     url = f"{LARAVEL_BASE_URL}{path}"
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.post(url, json=payload, headers=HEADERS)
-        response.raise_for_status()
-        return response.json()
+    key = exchange_key("laravel", path, payload)
+    if cassette.replaying:
+        return await cassette.replay("laravel", key, node=path), None
+
+    headers = {**HEADERS, "If-None-Match": etag} if etag else HEADERS
+    started = time.perf_counter()
+    status = "error"
+    try:
+        # 10s per call, shrunk to whatever is left of the request deadline
+        async with httpx.AsyncClient(timeout=call_timeout(10.0)) as client:
+            response = await with_deadline(client.post(url, json=payload, headers=headers))
+            status = str(response.status_code)
+            if response.status_code == 304:
+                return None, etag
+            response.raise_for_status()
+            data = response.json()
+            if cassette.recording:
+                cassette.record("laravel", key, {"path": path, "payload": payload}, data, time.perf_counter() - started, node=path)
+            return data, response.headers.get("ETag")
+    finally:
+        LARAVEL_REQUEST_SECONDS.observe(time.perf_counter() - started, path=path, status=status)
+
+
+async def call_laravel(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Without If-None-Match the server never answers 304, so data is always set
+    data, _ = await call_laravel_conditional(path, payload)
+    return data
 
 
 async def tool_get_schema(modules: List[str]) -> Dict[str, Any]:
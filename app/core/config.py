@@ -60,12 +60,205 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379/0"
     TOOL_NAME: str = "EW"
 
+    # Graphs
+    HORIZON_GRAPH_VERSION: str = "horizon_brain_graph"
+    HORIZON_GRAPH_WARMUP: str = "horizon_brain_graph"
+
+    # Intent fast path (rules -> embedding centroids -> LLM)
+    INTENT_FAST_PATH_ENABLED: bool = True
+    INTENT_RULES_MIN_CONFIDENCE: float = 0.9
+    INTENT_CENTROID_ENABLED: bool = True
+    INTENT_CENTROID_MIN_CONFIDENCE: float = 0.82
+    INTENT_CENTROID_MIN_MARGIN: float = 0.05
+    INTENT_CENTROID_MIN_SAMPLES: int = 5
+    INTENT_CENTROID_TRAINING_CHATS: int = 2000
+
+    # Start Pinecone retrieval for RAG intents while intent_node is running
+    SPECULATIVE_RETRIEVAL_ENABLED: bool = True
+
+    # Coalesce identical concurrent /horizon-engine calls; Idempotency-Key
+    # results are replayed for this long after completion
+    SINGLE_FLIGHT_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: int = 300
+    IDEMPOTENCY_MAX_ENTRIES: int = 1000
+
+    # Per-request time budget (payload "deadline_seconds" may lower/raise it up to the max)
+    REQUEST_DEADLINE_SECONDS: float = 90.0
+    REQUEST_DEADLINE_MAX_SECONDS: float = 300.0
+
+    # LLM admission control (per provider/model). ADMISSION_LIMITS is a JSON
+    # object of overrides keyed by "provider" or "provider:model".
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_DEFAULT_CONCURRENCY: int = 8
+    ADMISSION_DEFAULT_TPM: int = 200000
+    ADMISSION_DEFAULT_COMPLETION_TOKENS: int = 512
+    ADMISSION_MAX_QUEUE: int = 32
+    ADMISSION_MAX_WAIT_SECONDS: float = 15.0
+    ADMISSION_LIMITS: str = ""
+
+    # Pooled LLM providers and shared keep-alive HTTP clients
+    LLM_PROVIDER_POOL_SIZE: int = 32
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+
+    # Exact-match LLM response cache (memory LRU -> Redis). Opt-in per call
+    # site: LLM_CACHE_TTLS maps a policy (llm_cache_policy metadata or the
+    # LangGraph node name) to a TTL in seconds.
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_REDIS_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 2048
+    LLM_CACHE_TTLS: str = '{"route_intent": 86400, "sqlgen_modules": 21600, "work_request_site_name": 86400}'
+    LLM_CACHE_DETERMINISTIC_TTL: int = 0
+
+    # Hedged LLM requests: calls to LLM_HEDGE_PROVIDERS slower than their
+    # EWMA p95 (clamped to min/max delay) are duplicated to LLM_HEDGE_SECONDARY
+    # ("provider:model"); hard failures fail over to it. At most
+    # LLM_HEDGE_MAX_RATE of calls are hedged in steady state.
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_PROVIDERS: str = "do_serverless"
+    LLM_HEDGE_SECONDARY: str = "openai:gpt-4o-mini"
+    LLM_HEDGE_MAX_RATE: float = 0.1
+    LLM_HEDGE_BUDGET_BURST: float = 5.0
+    LLM_HEDGE_EWMA_ALPHA: float = 0.2
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    LLM_HEDGE_MAX_DELAY_SECONDS: float = 20.0
+
+    # Structured output (app.llms.runnable.structured): "native" uses the
+    # provider's JSON-schema / tool-calling mode, "prompt" injects Pydantic
+    # format instructions. Per-node overrides as JSON, e.g. {"intent": "prompt"}.
+    STRUCTURED_OUTPUT_MODE: str = "native"
+    STRUCTURED_OUTPUT_NODE_MODES: str = "{}"
+
+    # Prompt token budgets per node (app.llms.runnable.prompt_budget): fixed
+    # parts and the user turn first, then retrieved context, then history.
+    # Nodes missing from the map (and without "default") are not budgeted.
+    PROMPT_BUDGETS: str = '{"intent": 3000, "app_info": 6000, "work_request": 10000, "sqlgen": 16000, "project_summary_extract": 2000, "project_summary": 12000}'
+    PROMPT_HISTORY_MESSAGE_MAX_TOKENS: int = 400
+    PROMPT_MIN_CHUNK_TOKENS: int = 100
+    PROMPT_TOKENIZER_ENCODING: str = "cl100k_base"
+
+    # Debug: log the event-loop thread's stack whenever the loop is blocked
+    # for longer than LOOP_MONITOR_THRESHOLD_MS (app.core.loop_monitor).
+    LOOP_MONITOR_ENABLED: bool = False
+    LOOP_MONITOR_THRESHOLD_MS: int = 100
+    LOOP_MONITOR_INTERVAL_MS: int = 50
+
+    # Capital-plan cost estimation prices items concurrently (Tavily search +
+    # LLM per item); at most this many items are in flight at once.
+    CAPITAL_ESTIMATE_CONCURRENCY: int = 4
+
+    # Semantic answer cache (app.services.semantic_cache): per-intent cosine
+    # similarity thresholds and TTLs (seconds); intents without both are not cached.
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLDS: str = '{"app_info": 0.92, "text_to_sql": 0.95}'
+    SEMANTIC_CACHE_TTLS: str = '{"app_info": 86400, "text_to_sql": 3600}'
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000
+
+    # Text-to-SQL schema cache (app.services.schema_cache): per-module Laravel
+    # schemas kept for the TTL, then revalidated (ETag when the API sends one);
+    # all modules are fetched at startup when warmup is on.
+    SCHEMA_CACHE_ENABLED: bool = True
+    SCHEMA_CACHE_TTL_SECONDS: int = 3600
+    SCHEMA_CACHE_WARMUP: bool = True
+
+    # Text-to-SQL flow: "two_step" (LLM module selection, then SQL), "single_call"
+    # (all modules, no selection call) or "auto" (single call when the full
+    # schema fits the sqlgen prompt budget). With prefetch, every module schema
+    # is loaded concurrently with the module selection call.
+    SQLGEN_MODE: str = "two_step"
+    SQLGEN_SCHEMA_PREFETCH: bool = True
+
+    # Column-level schema pruning for the SQL prompt (app.services.schema_index):
+    # keep the top-N question-relevant columns plus keys and the pinned columns
+    # the SQL prompt always expects. 0 sends the full schema; pick N with
+    # app/bench/schema_prune_report.py.
+    SQL_SCHEMA_PRUNE_TOP_N: int = 0
+    SQL_SCHEMA_PINNED_COLUMNS: str = (
+        "projects.id,projects.project_title,projects.site_name,projects.cbre_interal_work_order,"
+        "projects.project_status_code,project_statuses.status_code,project_statuses.name"
+    )
+
+    # Few-shot examples for the SQL prompt (app.services.sql_example_store):
+    # SQL that executed with rows is stored per question; the top-k similar
+    # examples replace the static examples block of the second SQL prompt.
+    SQL_EXAMPLES_ENABLED: bool = True
+    SQL_EXAMPLES_PATH: str = "extras/sql_examples/examples.jsonl"
+    SQL_EXAMPLES_TOP_K: int = 3
+    SQL_EXAMPLES_MIN_SIMILARITY: float = 0.6
+    SQL_EXAMPLES_DEDUP_SIMILARITY: float = 0.97
+    SQL_EXAMPLES_CAPACITY: int = 500
+
+    # SQL template cache (app.services.sql_template_cache): question shapes with
+    # typed literal slots -> parameterized SQL. "shadow" compares the bound
+    # template with the LLM's SQL; "on" also serves trusted templates (enough
+    # agreeing shadow comparisons at the minimum agreement rate) without LLM calls.
+    SQL_TEMPLATE_CACHE_MODE: str = "shadow"
+    SQL_TEMPLATE_MIN_AGREEMENTS: int = 3
+    SQL_TEMPLATE_MIN_CONFIDENCE: float = 0.9
+    SQL_TEMPLATE_MAX_ENTRIES: int = 1000
+
+    # execute-sql result cache (app.services.sql_result_cache): TTL per table
+    # (JSON, seconds; the smallest among a query's tables applies, 0 = never
+    # cached), bounded by serialized bytes. Laravel invalidates tables via
+    # POST /horizon/sql-result-cache/invalidate (X-Webhook-Secret when set).
+    SQL_RESULT_CACHE_ENABLED: bool = True
+    SQL_RESULT_CACHE_TTLS: str = '{"projects": 60, "project_financials": 60, "project_statuses": 3600}'
+    SQL_RESULT_CACHE_DEFAULT_TTL: int = 60
+    SQL_RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    SQL_RESULT_CACHE_MAX_ENTRY_BYTES: int = 4 * 1024 * 1024
+    SQL_RESULT_CACHE_WEBHOOK_SECRET: str | None = None
+
+    # Pre-execution SQL guard (app.safety.sql_validator): off | report | enforce.
+    # Unsafe SQL is always rejected and LIMIT / SELECT * always rewritten; the
+    # mode applies to schema, cartesian-join and sargability violations, the
+    # last one checked on the large tables listed here. Switch to "enforce"
+    # once the reported violations have been checked against the live schema.
+    SQL_GUARD_MODE: str = "report"
+    SQL_GUARD_LARGE_TABLES: str = "projects,project_labours,project_vendors,project_financials"
+
+    # Where text-to-SQL queries run: "laravel" (execute-sql over HTTPS) or
+    # "replica" (app.db.replica: pooled async SQLAlchemy on a read replica,
+    # mysql+aiomysql://... or sqlite+aiosqlite:///... as a stand-in). Statements
+    # are limited by SQL_TIMEOUT_SECONDS; with SQL_REPLICA_FALLBACK a replica
+    # that cannot hand out a connection sends the query to Laravel instead.
+    SQL_EXECUTOR: str = "laravel"
+    SQL_REPLICA_DSN: str = ""
+    SQL_REPLICA_POOL_SIZE: int = 10
+    SQL_REPLICA_MAX_OVERFLOW: int = 5
+    SQL_REPLICA_POOL_TIMEOUT: float = 5.0
+    SQL_REPLICA_POOL_RECYCLE: int = 1800
+    SQL_REPLICA_FALLBACK: bool = True
+
+    # Record/replay cassette for offline benchmarks: off | record | replay.
+    # Replay sleeps recorded latency * scale + fixed ms per exchange.
+    CASSETTE_MODE: str = "off"
+    CASSETTE_PATH: str = "extras/cassettes/horizon.jsonl"
+    CASSETTE_LATENCY_SCALE: float = 1.0
+    CASSETTE_LATENCY_MS: float = 0.0
+
+    # Simulated LLM provider ("simulated" / "mock") for load tests: lognormal
+    # time to first token (median ms, sigma; 0 = constant) + ms per output
+    # token, error rate, and reply fixtures (JSON file path or inline JSON).
+    SIMULATED_LLM_LATENCY_MS: float = 800.0
+    SIMULATED_LLM_LATENCY_SIGMA: float = 0.5
+    SIMULATED_LLM_TOKEN_MS: float = 5.0
+    SIMULATED_LLM_ERROR_RATE: float = 0.0
+    SIMULATED_LLM_OUTPUT_TOKENS: int = 120
+    SIMULATED_LLM_FIXTURES: str = ""
+    SIMULATED_LLM_SEED: int = 0
+
 
 
     @property
     def cors_origins_list(self) -> List[str]:
         return [o.strip() for o in self.CORS_ORIGINS.split(",") if o.strip()]
 
+    @property
+    def graph_warmup_list(self) -> List[str]:
+        return [v.strip() for v in self.HORIZON_GRAPH_WARMUP.split(",") if v.strip()]
+
     @property
     def models_list(self) -> List[dict[str, str]]:
         return [
@@ -0,0 +1,118 @@
+"""
+Per-request deadlines.
+
+A `Deadline` is created once per engine request and carried in the graph
+state (`state["deadline"]`). Every node binds it to a context variable
+for its duration (see `instrument_node`), so LLM, retriever and Laravel
+calls deep inside a node can bound themselves with `with_deadline()` /
+`call_timeout()` without threading the state through every signature.
+Per-call timeouts shrink as the request budget is consumed.
+"""
+
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Optional
+
+from app.core.config import settings
+
+_current: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar("horizon_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out."""
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away before the response was ready."""
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.budget = float(seconds)
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.budget
+
+    @classmethod
+    def from_request(cls, seconds: Optional[float] = None) -> "Deadline":
+        """Deadline from a payload value, clamped to the configured maximum."""
+        if seconds is None or seconds <= 0:
+            seconds = settings.REQUEST_DEADLINE_SECONDS
+        return cls(min(float(seconds), settings.REQUEST_DEADLINE_MAX_SECONDS))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Timeout for one call: the remaining budget, capped by the call's own limit."""
+        remaining = self.remaining()
+        if remaining <= 0.0:
+            raise DeadlineExceeded(f"request deadline of {self.budget:.1f}s exceeded")
+        return min(remaining, cap) if cap else remaining
+
+    def __repr__(self) -> str:
+        return f"Deadline(budget={self.budget:.1f}s, remaining={self.remaining():.2f}s)"
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def call_timeout(default: Optional[float] = None) -> Optional[float]:
+    """Per-call timeout honouring the current deadline (or `default` without one)."""
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    return deadline.timeout(default)
+
+
+async def with_deadline(awaitable: Awaitable[Any], cap: Optional[float] = None) -> Any:
+    """Await `awaitable`, cancelling it when the current deadline (or `cap`) elapses."""
+    deadline = _current.get()
+    if deadline is None and cap is None:
+        return await awaitable
+    timeout = deadline.timeout(cap) if deadline is not None else cap
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError as e:
+        if isinstance(e, DeadlineExceeded):
+            raise
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceeded(f"request deadline of {deadline.budget:.1f}s exceeded") from e
+        raise
+
+
+async def cancel_on_disconnect(request: Any, awaitable: Awaitable[Any], poll_interval: float = 0.5) -> Any:
+    """
+    Run `awaitable` while polling the ASGI request; cancel it when the
+    client goes away so no more LLM / Laravel work is spent on it.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
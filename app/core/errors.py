@@ -2,10 +2,27 @@ from fastapi import Request
 from fastapi.responses import JSONResponse
 import structlog
 
+from app.core.deadline import DeadlineExceeded
+from app.llms.runnable.admission import AdmissionRejected
+
 
 log = structlog.get_logger()
 
+# Errors that abort the whole request (503 + Retry-After, or the partial
+# response at the deadline). Graph nodes re-raise them ahead of their own
+# fallback answers, which would otherwise turn them into a 200.
+REQUEST_ABORTED = (AdmissionRejected, DeadlineExceeded)
+
 
 async def unhandled_exception_handler(request: Request, exc: Exception):
     log.error("unhandled_exception", path=str(request.url), error=str(exc))
-    return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
\ No newline at end of file
+    return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+
+
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    log.warning("llm_admission_rejected", path=str(request.url), provider=exc.provider, model=exc.model, reason=exc.reason)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service is busy, please retry shortly.", "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
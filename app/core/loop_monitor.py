@@ -0,0 +1,95 @@
+"""
+Event-loop lag monitor (debug aid).
+
+A heartbeat coroutine wakes up every LOOP_MONITOR_INTERVAL_MS and records
+when it last ran. A watchdog thread checks the heartbeat; when the loop has
+not come back for more than LOOP_MONITOR_THRESHOLD_MS, some callback is
+blocking it (a sync network call in an async node, a heavy JSON dump, ...)
+and the watchdog logs the loop thread's current stack, once per stall, so
+the offending frame shows up in the logs while it is still running.
+
+Every heartbeat also observes the measured lag in
+`horizon_event_loop_lag_seconds`. Enabled with LOOP_MONITOR_ENABLED
+(off by default; the stack capture is cheap, but the logs are noisy).
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from app.core.config import settings
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.core.loop_monitor")
+
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "horizon_event_loop_lag_seconds",
+    "Delay between a heartbeat's scheduled and actual wake-up on the event loop.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_BLOCKED = REGISTRY.counter(
+    "horizon_event_loop_blocked_total", "Stalls where the event loop was blocked longer than the threshold."
+)
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+        log.info(f"Event loop monitor started (threshold={self.threshold * 1000:.0f}ms)")
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            EVENT_LOOP_LAG.observe(max(0.0, now - expected))
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            blocked_for = time.monotonic() - beat - self.interval
+            if blocked_for < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            EVENT_LOOP_BLOCKED.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<no frame>"
+            log.warning(f"Event loop blocked for {blocked_for * 1000:.0f}ms+; loop thread stack:\n{stack}")
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_MS / 1000.0,
+    threshold=settings.LOOP_MONITOR_THRESHOLD_MS / 1000.0,
+)
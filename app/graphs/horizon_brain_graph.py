@@ -2,6 +2,7 @@
 
 from typing import TypedDict, Optional, List, Dict, Any
 from langgraph.graph import StateGraph, END
+from app.telemetry.callbacks import instrument_node
 
 # Core LLM nodes
 from app.graphs.nodes.intent_node import intent_node
@@ -66,6 +67,19 @@ class HorizonState(TypedDict, total=False):
     work_request_payload: Optional[Dict[str, Any]] = None
     project_summary_data: Optional[Dict[str, Any]] = None
 
+    # Speculative Pinecone retrieval started before intent_node (RetrievalPrefetch)
+    retrieval_prefetch: Optional[Any]
+    # Request time budget (app.core.deadline.Deadline)
+    deadline: Optional[Any]
+    # SQL reused from the semantic cache (skip re-storing it after execution)
+    sql_from_cache: Optional[bool]
+    # Schema modules the SQL was generated against (few-shot example store)
+    sql_modules: Optional[List[str]]
+    # SQL bound from a trusted template (app.services.sql_template_cache)
+    sql_from_template: Optional[bool]
+    # SQL before sql_guard rewrites (what templates learn from)
+    sql_raw: Optional[str]
+
 
 # =============== ROUTING FUNCTIONS ===============
 
@@ -146,29 +160,29 @@ def _next_after_aggregate(state: HorizonState) -> str:
 
 def build_horizon_brain_graph():
     g = StateGraph(HorizonState)
-    g.add_node("route_intent", intent_node)
+    g.add_node("route_intent", instrument_node(intent_node))
 
-    g.add_node("work_request_generation", work_request_node)
+    g.add_node("work_request_generation", instrument_node(work_request_node))
 
     # Main task nodes
-    g.add_node("sqlgen", sqlgen_node)
-    g.add_node("sqlexec", sqlexec_node)
+    g.add_node("sqlgen", instrument_node(sqlgen_node))
+    g.add_node("sqlexec", instrument_node(sqlexec_node))
 
-    g.add_node("project_summary", project_summary_node)
-    g.add_node("project_metadata", project_metadata_node)
-    g.add_node("rag_qa", rag_qa_node)
-    g.add_node("app_info", app_info_node)
+    g.add_node("project_summary", instrument_node(project_summary_node))
+    g.add_node("project_metadata", instrument_node(project_metadata_node))
+    g.add_node("rag_qa", instrument_node(rag_qa_node))
+    g.add_node("app_info", instrument_node(app_info_node))
 
     # Multi-step execution (for post-actions)
-    g.add_node("planner", planner_node)
-    g.add_node("dispatcher", dispatcher_node)
-    g.add_node("aggregate", aggregate_node)
-    g.add_node("action_executor", action_executor_node)
+    g.add_node("planner", instrument_node(planner_node))
+    g.add_node("dispatcher", instrument_node(dispatcher_node))
+    g.add_node("aggregate", instrument_node(aggregate_node))
+    g.add_node("action_executor", instrument_node(action_executor_node))
 
     # Utility / fallback
-    g.add_node("irrelevant", help_node)
-    g.add_node("unknown", fallback_node)
-    g.add_node("humanize", humanize_node)
+    g.add_node("irrelevant", instrument_node(help_node))
+    g.add_node("unknown", instrument_node(fallback_node))
+    g.add_node("humanize", instrument_node(humanize_node))
 
     # -------------------------
     # INTENT ROUTING (MAIN TASK ONLY)
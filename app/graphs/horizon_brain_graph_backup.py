@@ -2,6 +2,7 @@
 
 from typing import TypedDict, Optional, List, Dict, Any
 from langgraph.graph import StateGraph, END
+from app.telemetry.callbacks import instrument_node
 
 # Core LLM nodes
 from app.graphs.nodes.intent_node import intent_node
@@ -44,6 +45,10 @@ class HorizonState1(TypedDict, total=False):
     response: Optional[str]
     aggregate_summary: Optional[Dict[str, Any]]
     human_summary_json: Optional[Dict[str, Any]]
+    deadline: Optional[Any]
+
+
+HorizonState = HorizonState1
 
 
 # =============== ROUTING FUNCTIONS ===============
@@ -111,26 +116,26 @@ def build_horizon_brain_graph():
     g = StateGraph(HorizonState)
 
     # Entry: LLM intent classifier
-    g.add_node("route_intent", intent_node)
+    g.add_node("route_intent", instrument_node(intent_node))
 
     # Simple SQL pipeline
-    g.add_node("sqlgen", sqlgen_node)
-    g.add_node("sqlexec", sqlexec_node)
+    g.add_node("sqlgen", instrument_node(sqlgen_node))
+    g.add_node("sqlexec", instrument_node(sqlexec_node))
 
     # Complex / multi-step flow
-    g.add_node("planner", planner_node)
-    g.add_node("dispatcher", dispatcher_node)
-    g.add_node("aggregate", aggregate_node)
+    g.add_node("planner", instrument_node(planner_node))
+    g.add_node("dispatcher", instrument_node(dispatcher_node))
+    g.add_node("aggregate", instrument_node(aggregate_node))
 
     # Post actions
-    g.add_node("export_file", export_node)
-    g.add_node("send_email", email_node)
+    g.add_node("export_file", instrument_node(export_node))
+    g.add_node("send_email", instrument_node(email_node))
 
     # Conversational
-    g.add_node("help", help_node)
-    g.add_node("greeting", greeting_node)
-    g.add_node("unknown", fallback_node)
-    g.add_node("humanize", humanize_node)
+    g.add_node("help", instrument_node(help_node))
+    g.add_node("greeting", instrument_node(greeting_node))
+    g.add_node("unknown", instrument_node(fallback_node))
+    g.add_node("humanize", instrument_node(humanize_node))
     # =============== CONDITIONAL ROUTING ===============
 
     # From intent classification
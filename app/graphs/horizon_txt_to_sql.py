@@ -1,5 +1,6 @@
 from typing import TypedDict, Optional, List, Dict, Any
 from langgraph.graph import StateGraph, END
+from app.telemetry.callbacks import instrument_node
 from app.graphs.nodes.intent_node import intent_node
 from app.graphs.nodes.sqlgen_node import sqlgen_node
 from app.graphs.nodes.sqlexec_node import sqlexec_node
@@ -23,6 +24,14 @@ class HorizonState(TypedDict, total=False):
     export_path: Optional[str]
     email_sent: Optional[bool]
     response: Optional[str]
+    deadline: Optional[Any]
+    sql_from_cache: Optional[bool]
+    # Schema modules the SQL was generated against (few-shot example store)
+    sql_modules: Optional[List[str]]
+    # SQL bound from a trusted template (app.services.sql_template_cache)
+    sql_from_template: Optional[bool]
+    # SQL before sql_guard rewrites (what templates learn from)
+    sql_raw: Optional[str]
 
 def _next_after_sqlexec(state: dict) -> str:
     # Decide what to do after SQL execution
@@ -45,19 +54,19 @@ def build_horizon_txt_to_sql_graph():
     g = StateGraph(HorizonState)
 
     # Universal entry
-    g.add_node("route_intent", intent_node)
+    g.add_node("route_intent", instrument_node(intent_node))
 
     # SQL pipeline (modular)
-    g.add_node("parse_sql_intent", parse_sql_intent)
-    g.add_node("sqlgen", sqlgen_node)
-    g.add_node("sqlexec", sqlexec_node)
-    g.add_node("export_file", export_node)
-    g.add_node("send_email", email_node)
+    g.add_node("parse_sql_intent", instrument_node(parse_sql_intent))
+    g.add_node("sqlgen", instrument_node(sqlgen_node))
+    g.add_node("sqlexec", instrument_node(sqlexec_node))
+    g.add_node("export_file", instrument_node(export_node))
+    g.add_node("send_email", instrument_node(email_node))
 
     # Non-SQL branches
-    g.add_node("help", help_node)
-    g.add_node("greeting", greeting_node)
-    g.add_node("unknown", fallback_node)
+    g.add_node("help", instrument_node(help_node))
+    g.add_node("greeting", instrument_node(greeting_node))
+    g.add_node("unknown", instrument_node(fallback_node))
 
     # Route by intent
     g.add_conditional_edges("route_intent", _route_intent, {
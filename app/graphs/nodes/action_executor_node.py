@@ -1,5 +1,6 @@
 # app/graphs/nodes/action_executor_node.py
 
+from app.core.errors import REQUEST_ABORTED
 import logging
 from typing import Dict, Any
 
@@ -68,6 +69,8 @@ async def action_executor_node(state: Dict[str, Any]) -> Dict[str, Any]:
         try:
             await send_email_via_api(email_to, state)
             state["email_sent"] = True
+        except REQUEST_ABORTED:
+            raise
         except Exception as e:
             log.exception("Email sending failed: %s", e)
             state["email_sent"] = False
@@ -83,6 +86,8 @@ async def action_executor_node(state: Dict[str, Any]) -> Dict[str, Any]:
             export_path = await export_file_via_api(format=file_format, state=state)
             state["exported"] = True
             state["export_path"] = export_path
+        except REQUEST_ABORTED:
+            raise
         except Exception as e:
             log.exception("Export failed: %s", e)
             state["exported"] = False
@@ -98,6 +103,8 @@ async def action_executor_node(state: Dict[str, Any]) -> Dict[str, Any]:
         try:
             await notify_via_api(channel=channel, message=message, state=state)
             state["notified"] = True
+        except REQUEST_ABORTED:
+            raise
         except Exception as e:
             log.exception("Notify action failed: %s", e)
             state["notified"] = False
@@ -111,6 +118,8 @@ async def action_executor_node(state: Dict[str, Any]) -> Dict[str, Any]:
             result = await create_record_via_api(params)
             state["create_result"] = result
             state["created"] = True
+        except REQUEST_ABORTED:
+            raise
         except Exception as e:
             log.exception("Create action failed: %s", e)
             state["created"] = False
@@ -124,6 +133,8 @@ async def action_executor_node(state: Dict[str, Any]) -> Dict[str, Any]:
             result = await save_generic_via_api(params, state)
             state["save_result"] = result
             state["saved"] = True
+        except REQUEST_ABORTED:
+            raise
         except Exception as e:
             log.exception("Save action failed: %s", e)
             state["saved"] = False
@@ -142,6 +153,8 @@ async def action_executor_node(state: Dict[str, Any]) -> Dict[str, Any]:
         try:
             await webhook_call_via_api(url, params=params, state=state)
             state["webhook_called"] = True
+        except REQUEST_ABORTED:
+            raise
         except Exception as e:
             log.exception("Webhook call failed: %s", e)
             state["webhook_called"] = False
@@ -3,8 +3,10 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.documents import Document
 from app.llms.runnable.llm_provider import get_chain_llm
 from app.core.config import settings
-from langchain_pinecone import PineconeVectorStore
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from app.services.retrieval import get_documents
+from app.services.semantic_cache import semantic_cache
+from app.llms.runnable.prompt_budget import fit_prompt, template_text
+from app.core.errors import REQUEST_ABORTED
 import logging
 
 log = logging.getLogger("app_info_node")
@@ -15,21 +17,18 @@ async def app_info_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Answers 'app_info' intent questions using RAG over the 'horizon-app-flow' Pinecone index.
     Keeps output concise and step-focused. Falls back gracefully when info is not found.
     """
-    index_name = "horizon-app-flow"
     user_query = state.get("user_input") or ""
 
-    log.info("app_info_node: start, index=%s", index_name)
+    log.info("app_info_node: start")
 
-    # Retriever
-    embeddings = HuggingFaceEmbeddings(model_name=settings.HG_EMBEDDING_MODEL)
-    vectorstore = PineconeVectorStore(
-        index_name=index_name,
-        embedding=embeddings,
-        text_key="text",
-        pinecone_api_key=settings.PINECONE_API_KEY,
-    )
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-    docs: List[Document] = retriever.invoke(user_query)
+    has_history = bool(state.get("chat_history"))
+    cached = await semantic_cache.lookup("app_info", user_query, has_history)
+    if cached is not None:
+        state["response"] = cached.answer
+        return state
+
+    # Retriever (prefetched while intent_node was running, when available)
+    docs: List[Document] = await get_documents(state, "app_info")
     log.info("app_info_node: retrieved %d docs", len(docs))
 
     # Build minimal context
@@ -40,11 +39,6 @@ async def app_info_node(state: Dict[str, Any]) -> Dict[str, Any]:
         context_chunks.append(
             f"[DOC {idx+1} | {src}]\n{(d.page_content or '').strip()}"
         )
-    retrieved_context = (
-        "\n\n---\n\n".join(context_chunks)
-        if context_chunks
-        else "No relevant context found."
-    )
 
     # LLM
     llm = get_chain_llm(state.get("model_key"), state.get("model_id"))
@@ -66,17 +60,34 @@ async def app_info_node(state: Dict[str, Any]) -> Dict[str, Any]:
         ]
     )
 
+    # Keep the prompt within the node's token budget: top-ranked docs first, then recent history
+    fitted = fit_prompt(
+        "app_info",
+        fixed=[template_text(prompt)],
+        user=user_query,
+        context=context_chunks,
+        history=state.get("chat_history") or [],
+    )
+    retrieved_context = (
+        "\n\n---\n\n".join(fitted.context)
+        if fitted.context
+        else "No relevant context found."
+    )
+
     chain = prompt | llm
     try:
-        answer = chain.invoke({
+        answer = await chain.ainvoke({
             "question": user_query,
             "context": retrieved_context,
-            "chat_history": state.get("chat_history") or [],
+            "chat_history": fitted.history,
         })
         # Some models return a message object; ensure string
         if hasattr(answer, "content"):
             answer = answer.content
         answer = (answer or "").strip()
+        await semantic_cache.store("app_info", user_query, answer, has_history)
+    except REQUEST_ABORTED:
+        raise
     except Exception as e:
         log.exception("app_info_node: LLM failed")
         answer = (
@@ -1,4 +1,5 @@
 from typing import Dict, Any
+from app.core.errors import REQUEST_ABORTED
 import logging
 import json
 import re
@@ -94,6 +95,8 @@ async def humanize_node(state: Dict[str, Any]) -> Dict[str, Any]:
         }
         return state
 
+    except REQUEST_ABORTED:
+        raise
     except Exception as e:
         log.exception("humanize_node failed: %s", e)
         # fallback (non-LLM)
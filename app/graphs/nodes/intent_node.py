@@ -2,38 +2,35 @@
 
 import json
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.output_parsers import PydanticOutputParser
 from app.llms.runnable.llm_provider import get_chain_llm
+from app.llms.runnable.structured import structured_chain
+from app.llms.runnable.prompt_budget import fit_prompt, template_text
 import logging
 log=logging.getLogger("intent_node")
 from app.graphs.nodes.prompts.intent_prompt import SYSTEM_MESSAGE
 from app.models.parsers.chat_node_parsers import IntentResult
+from app.services.intent_classifier import intent_classifier
  
 
 # - "project_metadata"   → simple project info (BU, site, status, ID, filters)
-parser = PydanticOutputParser(pydantic_object=IntentResult)
+INTENT_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_MESSAGE),
+        MessagesPlaceholder("chat_history"),
+        ("user", "{user_input}"),
+    ]
+)
 
 
-async def intent_node(state):
-    log.info("*************landed into intent node*************")
-
-    user_input = state["user_input"]
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_MESSAGE),
-            MessagesPlaceholder("chat_history"),
-            ("user", "{user_input}"),
-        ]
-    )
-
-    log.info("History .....")
-    log.info(state.get("chat_history"))
+async def _classify_with_llm(state, user_input: str) -> dict:
     llm = get_chain_llm(state.get("model_key"), state.get("model_id")) 
-    chain=prompt | llm | parser 
+    chain = structured_chain(INTENT_PROMPT, llm, IntentResult, node="intent")
+    fitted = fit_prompt(
+        "intent", fixed=[template_text(INTENT_PROMPT)], user=user_input, history=state.get("chat_history") or []
+    )
     response=await chain.ainvoke({
         "user_input": user_input,
-        "chat_history": state.get("chat_history") or [],
+        "chat_history": fitted.history,
     })
 
     log.info(f"generated response in intention---->{response}")
@@ -48,6 +45,26 @@ async def intent_node(state):
             "params": {},
             "requires_multistep": False
         }
+    return parsed
+
+
+async def intent_node(state):
+    log.info("*************landed into intent node*************")
+
+    user_input = state["user_input"]
+
+    log.info("History .....")
+    log.info(state.get("chat_history"))
+
+    # Fast path: rules / embedding centroids. Falls through to the LLM
+    # classifier when no tier is confident enough.
+    decision = await intent_classifier.classify(user_input, state.get("chat_history"))
+    if decision is not None:
+        parsed = decision.result.dict()
+        log.info(f"intention detected by {decision.tier} tier (confidence={decision.confidence})---->{parsed}")
+    else:
+        parsed = await _classify_with_llm(state, user_input)
+        intent_classifier.record("llm", parsed.get("intent", "unknown"))
 
     # Fill into state
     state["intent"] = parsed.get("intent", "unknown")
@@ -55,6 +72,11 @@ async def intent_node(state):
     state["params"] = parsed.get("params", {})
     state["requires_multistep"] = parsed.get("requires_multistep", False)
 
+    # Keep the speculative retrieval for the chosen intent, drop the rest
+    prefetch = state.get("retrieval_prefetch")
+    if prefetch is not None:
+        prefetch.keep(state["intent"])
+
     # Also normalize email presence for convenience
     state["email"] = "email" in state["post_actions"]
     state["export"] = "export" in state["post_actions"] or "download" in state["post_actions"]
@@ -1,6 +1,7 @@
 # app/graphs/nodes/planner_node.py
 
 import json
+from app.core.errors import REQUEST_ABORTED
 import logging
 from app.models.llm.factory import get_llm
 
@@ -161,6 +162,8 @@ async def planner_node(state):
         log.info(f"Raw planner output: {text}")
         plan = json.loads(text)
 
+    except REQUEST_ABORTED:
+        raise
     except Exception as e:
         log.exception("Planner failed: %s", e)
         plan = {
@@ -11,7 +11,8 @@ import httpx
 from pydantic import BaseModel, Field
 
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.output_parsers import PydanticOutputParser
+from app.llms.runnable.structured import structured_chain
+from app.llms.runnable.prompt_budget import fit_prompt, template_text
 
 log = logging.getLogger("project_summarization_node")
 
@@ -142,6 +143,28 @@ async def _fetch_project_from_laravel(
     return projects[0]  # we take the first match
 
 
+# {format} is filled in by structured_chain
+EXTRACTOR_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You are a system that extracts search parameters for project summarization.\n"
+            "You will receive recent chat history (assistant and user turns). Use it to resolve follow‑ups, e.g., "
+            "if the user says 'same project' or 'update previous answer', infer the last referenced project (ref_id or title) from history.\n"
+            "User can either give a CBRE project reference ID like 'US-EW-06112025-12987' "
+            "OR a project_title like 'Chiller Pump Upgrade'.\n\n"
+            "Rules:\n"
+            "- If ref_id pattern detected (AA-EW-ddMMyyyy-xxxxx) → fill ref_id.\n"
+            "- Otherwise → treat the input as project_title.\n"
+            "- If neither is explicitly provided but recent history mentions a project id/title, reuse that as the target.\n"
+            "- Return ONLY the JSON.\n",
+        ),
+        MessagesPlaceholder("chat_history"),
+        ("human", "User query:\n{query}\n\n" "Return JSON:\n{format}"),
+    ]
+)
+
+
 # -----------------------------
 # MAIN NODE
 # -----------------------------
@@ -162,33 +185,20 @@ async def project_summary_node(state: Dict[str, Any]) -> Dict[str, Any]:
     #     model="gpt-4o-mini", temperature=0.3, openai_api_key=settings.OPENAI_API_KEY
     # )
 
-    extractor_parser = PydanticOutputParser(pydantic_object=SearchParamModel)
-    extractor_format = extractor_parser.get_format_instructions()
-
-    extractor_prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                "You are a system that extracts search parameters for project summarization.\n"
-                "You will receive recent chat history (assistant and user turns). Use it to resolve follow‑ups, e.g., "
-                "if the user says 'same project' or 'update previous answer', infer the last referenced project (ref_id or title) from history.\n"
-                "User can either give a CBRE project reference ID like 'US-EW-06112025-12987' "
-                "OR a project_title like 'Chiller Pump Upgrade'.\n\n"
-                "Rules:\n"
-                "- If ref_id pattern detected (AA-EW-ddMMyyyy-xxxxx) → fill ref_id.\n"
-                "- Otherwise → treat the input as project_title.\n"
-                "- If neither is explicitly provided but recent history mentions a project id/title, reuse that as the target.\n"
-                "- Return ONLY the JSON.\n",
-            ),
-            MessagesPlaceholder("chat_history"),
-            ("human", "User query:\n{query}\n\n" "Return JSON:\n{format}"),
-        ]
+    extractor_chain = structured_chain(
+        EXTRACTOR_PROMPT, extractor_llm, SearchParamModel, node="project_summary_extract", format_var="format"
     )
 
-    extractor_chain = extractor_prompt | extractor_llm | extractor_parser
-
-    search_param_obj: SearchParamModel = extractor_chain.invoke(
-        {"query": user_query, "format": extractor_format, "chat_history": state.get("chat_history") or []}
+    search_param_obj: SearchParamModel = await extractor_chain.ainvoke(
+        {
+            "query": user_query,
+            "chat_history": fit_prompt(
+                "project_summary_extract",
+                fixed=[template_text(EXTRACTOR_PROMPT)],
+                user=user_query,
+                history=state.get("chat_history") or [],
+            ).history,
+        }
     )
 
     ref_id = search_param_obj.ref_id
@@ -216,9 +226,6 @@ async def project_summary_node(state: Dict[str, Any]) -> Dict[str, Any]:
     # summarizer_parser = PydanticOutputParser(pydantic_object=ProjectSummaryModel)
     # summarizer_format = summarizer_parser.get_format_instructions()
 
-    summarizer_parser = PydanticOutputParser(pydantic_object=ProjectSummaryModel)
-    summarizer_format_instructions = summarizer_parser.get_format_instructions()
-
     project_json_str = json.dumps(project_data, ensure_ascii=False, indent=2)
 
     summarizer_prompt = ChatPromptTemplate.from_messages(
@@ -275,18 +282,21 @@ async def project_summary_node(state: Dict[str, Any]) -> Dict[str, Any]:
         ]
     )
 
-    summarizer_chain = summarizer_prompt | summarizer_llm | summarizer_parser
+    summarizer_chain = structured_chain(summarizer_prompt, summarizer_llm, ProjectSummaryModel, node="project_summary")
 
     # chain_input = {
     #     "project_json": project_json_str,
     #     "format_instructions": summarizer_format,
     # }
 
-    summary_obj: ProjectSummaryModel = summarizer_chain.invoke(
+    summary_obj: ProjectSummaryModel = await summarizer_chain.ainvoke(
         {
             "project_json": project_json_str,
-            "format_instructions": summarizer_format_instructions,
-            "chat_history": state.get("chat_history") or [],
+            "chat_history": fit_prompt(
+                "project_summary",
+                fixed=[template_text(summarizer_prompt), project_json_str],
+                history=state.get("chat_history") or [],
+            ).history,
         }
     )
 
@@ -189,7 +189,10 @@ Remember:
 - Output ONLY the JSON object.
 """
 
-SECOND_SYSTEM_PROMPT = """
+# The second system prompt is rules + an examples block + the final reminder.
+# sqlgen_node swaps STATIC_SQL_EXAMPLES for verified examples retrieved for
+# the question (app.services.sql_example_store) when it has any.
+SQL_SYSTEM_RULES = """
 You are HorizonAI, an expert MySQL SQL generation engine used in an enterprise
 project management system.
 
@@ -325,35 +328,6 @@ In ALL such cases, you MUST:
      (and p.cbre_interal_work_order if selected),
      to keep the query valid.
 
-Example transformation:
-
-- INSTEAD OF:
-
-  SELECT
-    pl.project_id,
-    SUM(pl.total) AS project_revenue_lcy
-  FROM horizon_extra_work_tool.project_labours AS pl
-  GROUP BY pl.project_id;
-
-- YOU MUST WRITE SOMETHING LIKE:
-
-  SELECT
-    p.project_title,
-    p.site_name,
-    ps.name AS project_status_name,
-    SUM(pl.total) AS project_revenue_lcy
-  FROM horizon_extra_work_tool.project_labours AS pl
-  JOIN horizon_extra_work_tool.projects AS p
-    ON pl.project_id = p.id
-  JOIN horizon_extra_work_tool.project_statuses AS ps
-    ON p.project_status_code = ps.status_code
-  WHERE pl.deleted_at IS NULL
-  GROUP BY
-    p.id,
-    p.project_title,
-    p.site_name,
-    ps.name;
-
 This ALWAYS-ON PROJECT CONTEXT RULE is mandatory whenever a project reference
 column is used in the query.
 
@@ -411,15 +385,6 @@ TEXT FILTER & STRING MATCHING RULES
   country name, status name), you MUST use a LIKE predicate with wildcard % around
   the search term for flexible partial matching.
 
-  Example:
-
-  SELECT
-    p.project_title,
-    p.site_name,
-    p.cbre_interal_work_order
-  FROM horizon_extra_work_tool.projects AS p
-  WHERE p.site_name LIKE '%xxx%';
-
 - Do NOT use exact string equality (=) for free-text filters unless the user explicitly
   asks for an exact match (for example "site name equals 'Karachi Data Center' exactly").
 - You MUST still use equality (=) for numeric IDs or enum ID columns (for example
@@ -458,7 +423,53 @@ Do NOT include project_status_code or any raw status ID/code fields in SELECT
 output (unless explicitly requested). Use only the human-readable status name
 or label.
 
+"""
+
+STATIC_SQL_EXAMPLES = """====================
+EXAMPLES
 ====================
+
+Project-centric aggregation (ALWAYS-ON PROJECT CONTEXT RULE):
+
+- INSTEAD OF:
+
+  SELECT
+    pl.project_id,
+    SUM(pl.total) AS project_revenue_lcy
+  FROM horizon_extra_work_tool.project_labours AS pl
+  GROUP BY pl.project_id;
+
+- YOU MUST WRITE SOMETHING LIKE:
+
+  SELECT
+    p.project_title,
+    p.site_name,
+    ps.name AS project_status_name,
+    SUM(pl.total) AS project_revenue_lcy
+  FROM horizon_extra_work_tool.project_labours AS pl
+  JOIN horizon_extra_work_tool.projects AS p
+    ON pl.project_id = p.id
+  JOIN horizon_extra_work_tool.project_statuses AS ps
+    ON p.project_status_code = ps.status_code
+  WHERE pl.deleted_at IS NULL
+  GROUP BY
+    p.id,
+    p.project_title,
+    p.site_name,
+    ps.name;
+
+Free-text filter (TEXT FILTER & STRING MATCHING RULES):
+
+  SELECT
+    p.project_title,
+    p.site_name,
+    p.cbre_interal_work_order
+  FROM horizon_extra_work_tool.projects AS p
+  WHERE p.site_name LIKE '%xxx%';
+
+"""
+
+SQL_FINAL_REMINDER = """====================
 FINAL REMINDER
 ====================
 
@@ -477,3 +488,11 @@ Remember:
   - Include p.project_title, p.site_name, and ps.name AS project_status_name, p.cbre_interal_work_order
     in the SELECT projection.
 """
+
+
+def sql_system_prompt(examples: str = STATIC_SQL_EXAMPLES) -> str:
+    return SQL_SYSTEM_RULES + examples + SQL_FINAL_REMINDER
+
+
+SECOND_SYSTEM_PROMPT = sql_system_prompt()
+
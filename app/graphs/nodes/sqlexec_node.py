@@ -8,7 +8,11 @@
 #     return {**state, "rows": rows, "row_count": len(rows)}
 
 
-from app.controllers.tool_impl import tool_execute_sql
+from app.safety.sql_validator import SqlRejected, sql_guard
+from app.services.semantic_cache import semantic_cache
+from app.services.sql_example_store import sql_examples
+from app.services.sql_result_cache import sql_result_cache
+from app.services.sql_template_cache import sql_templates
 import logging
 
 log = logging.getLogger("SQL_EXECUTION")
@@ -18,8 +22,24 @@ async def sqlexec_node(state: dict) -> dict:
     sql = state.get("sql")
     log.info(f"sql execution node received ---> {sql}")
 
-    result = await tool_execute_sql(sql)
+    question = state.get("user_input") or ""
+    has_history = bool(state.get("chat_history"))
+    from_template = bool(state.get("sql_from_template"))
+    # Templates learn from the SQL as generated: sqlgen's shadow compare sees the unguarded LLM output too
+    raw_sql = state["sql_raw"] = sql
+    try:
+        # Read-only, bounded and schema-valid SQL only; LIMIT / SELECT * may be rewritten
+        sql = state["sql"] = (await sql_guard.check(sql)).sql
+        # Identical SQL that ran recently is answered from the result cache
+        result = await sql_result_cache.execute(sql)
+    except SqlRejected as e:
+        result = {"error": f"SQL rejected before execution: {e}"}
+    except Exception:
+        if from_template:
+            sql_templates.learn(question, raw_sql, state.get("sql_modules"), has_history, served=True, failed=True)
+        raise
     log.info(f"sql execution rows executed ---> {result}")
+    failed = isinstance(result, dict) and bool(result.get("error"))
 
     # Normalize result into list of rows
     if isinstance(result, dict):
@@ -33,6 +53,22 @@ async def sqlexec_node(state: dict) -> dict:
     else:
         rows = result  # already a list
     state["rows_data"] = rows
+
+    # Served templates are penalized when their SQL fails; LLM SQL that ran becomes a template
+    if sql and not state.get("sql_from_cache"):
+        sql_templates.learn(question, raw_sql, state.get("sql_modules"), has_history, served=from_template, failed=failed)
+
+    # Only SQL that actually ran is worth reusing for similar questions
+    if sql and not state.get("sql_from_cache") and not failed:
+        await semantic_cache.store("text_to_sql", question, sql, has_history)
+        # Verified (question, modules, SQL) triples become few-shot examples for sqlgen
+        await sql_examples.record(
+            question,
+            state.get("sql_modules"),
+            sql,
+            len(rows) if isinstance(rows, list) else None,
+            has_history,
+        )
     return state
     # if not isinstance(rows, list):
     #     log.warning(f"Rows are not a list, converting to list: {rows}")
@@ -1,19 +1,28 @@
-from app.graphs.nodes.prompts.sql_gen_prompt import SECOND_SYSTEM_PROMPT
+from app.graphs.nodes.prompts.sql_gen_prompt import SECOND_SYSTEM_PROMPT, sql_system_prompt
 from app.models.parsers.text_to_sql_models import SchemaArgsModel
 from app.mcp.tools.sql_node_tools import schema_tool
 from app.graphs.nodes.prompts.sql_gen_prompt import FIRST_SYSTEM_PROMPT
 from app.llms.runnable.llm_provider import get_chain_llm
+import asyncio
 import json
 import re
+from app.core.errors import REQUEST_ABORTED
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
-from langchain_core.output_parsers import PydanticOutputParser
+from app.llms.runnable.structured import structured_chain
 from app.mcp.tools.sql_node_tools import tools
-from app.controllers.tool_impl import tool_get_schema
+from app.services.schema_cache import SCHEMA_MODULES, SchemaBundle, schema_cache
+from app.services.schema_index import schema_index
+from app.services.sql_example_store import render_examples, sql_examples
+from app.services.sql_template_cache import sql_templates
+from app.core.config import settings
+from app.telemetry.metrics import REGISTRY
 from app.models.llm.factory import get_llm
 from app.schemas.registry import SCHEMA_REGISTRY
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from app.services.semantic_cache import semantic_cache
+from app.llms.runnable.prompt_budget import fit_prompt
 
 log = logging.getLogger("graph>node>sqlgen")
 
@@ -44,50 +53,178 @@ Describe what the SQL retrieves & why it's useful for decisions.
 """
 
 
-first_parser = PydanticOutputParser(pydantic_object=SchemaArgsModel)
+SQLGEN_MODES = ("two_step", "single_call", "auto")
+# User turn of the SQL generation call (counted in the prompt budget)
+SQL_USER_TEMPLATE = "User Question:\n{user_input}\n\nDatabase Schema (JSON):\n{schema_json}"
 
+SQLGEN_CALLS = REGISTRY.counter(
+    "horizon_sqlgen_calls_total", "SQL generations by mode (two_step: module selection + SQL, single_call: SQL only)."
+)
 
-async def sqlgen_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    log.info("landed in sql generation node 2 steps ")
-    user_input = state["user_input"]
 
-    llm = get_chain_llm(state.get("model_key"), state.get("model_id"))
-    first_llm = llm
+async def _single_call_schema(mode: str, prefetch, user_input: str) -> Optional[SchemaBundle]:
+    """
+    Full schema bundle when module selection can be skipped: always in
+    "single_call" mode, in "auto" mode only if every module fits the sqlgen
+    prompt budget next to the system prompt and the question.
+    """
+    if mode == "two_step" or prefetch is None:
+        return None
+    prefetched = await prefetch
+    if not all(module in prefetched for module in SCHEMA_MODULES):
+        return None
+    bundle = await schema_cache.get(SCHEMA_MODULES, prefetched)
+    if mode == "single_call":
+        return bundle
+    fitted = fit_prompt("sqlgen", fixed=[SQL_USER_TEMPLATE, SECOND_SYSTEM_PROMPT, bundle.compact], user=user_input)
+    if fitted.budget and fitted.tokens <= fitted.budget:
+        return bundle
+    log.info(f"sqlgen: full schema needs {fitted.tokens} tokens (budget {fitted.budget}), selecting modules")
+    return None
+
+
+def _discard(task: Optional["asyncio.Future"]) -> None:
+    """Cancel a speculative task; an error it already finished with is consumed, not logged as unretrieved."""
+    if task is None:
+        return
+    if task.done():
+        if not task.cancelled():
+            task.exception()
+    else:
+        task.cancel()
+
+
+async def _select_modules(llm, user_input: str) -> List[str]:
+    """First call of two-step mode: the schema modules the question needs."""
+    # Module selection depends only on the question: opt into the LLM response cache
+    first_llm = llm.with_config(metadata={"llm_cache_policy": "sqlgen_modules"})
     first_prompt = ChatPromptTemplate.from_messages(
         [
             ("system", FIRST_SYSTEM_PROMPT),
             ("user", "{user_input}"),
         ]
     )
-    first_chain = first_prompt | first_llm | first_parser
+    first_chain = structured_chain(first_prompt, first_llm, SchemaArgsModel, node="sqlgen_modules")
+    first_response = await first_chain.ainvoke({"user_input": user_input})
+    log.info(f"The response for schema modules -> {first_response}")
 
-    try:
-        first_response = await first_chain.ainvoke({"user_input": user_input})
-        log.info(f"The response for schema modules -> {first_response}")
+    first_response_dict = first_response.dict()
+    log.info(f"Parsed modules dict -> {first_response_dict}")
+    return first_response_dict["modules"]
 
-        first_response_dict = first_response.dict()
-        log.info(f"Parsed modules dict -> {first_response_dict}")
 
+async def _pruned_schema_json(bundle: SchemaBundle, user_input: str, compact: bool) -> Optional[str]:
+    """Schema JSON cut down to the question's top-N columns (+ keys); None keeps the full schema."""
+    try:
+        pruned = await schema_index.prune(bundle.content, user_input, settings.SQL_SCHEMA_PRUNE_TOP_N)
     except Exception as e:
-        log.exception("Router schema extraction failed: %s", e)
-        state["sql"] = None
+        log.warning(f"sqlgen: schema pruning failed, sending the full schema: {e}")
+        return None
+    if pruned is None:
+        return None
+    log.info(f"sqlgen: pruned schema to {pruned.kept_columns}/{pruned.total_columns} columns in {pruned.tables}")
+    if compact:
+        return json.dumps(pruned.content, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(pruned.content, indent=2)
+
+
+async def sqlgen_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    log.info("landed in sql generation node 2 steps ")
+    user_input = state["user_input"]
+    has_history = bool(state.get("chat_history"))
+    state["sql_from_template"] = False
+
+    # Same question shape as earlier SQL: bind this question's literals into its template
+    template = sql_templates.lookup(user_input, has_history)
+    if template is not None and template.trusted:
+        log.info(f"sqlgen: SQL from template {template.shape!r} (confidence {template.confidence})")
+        state["sql"] = template.sql
+        state["sql_from_cache"] = False
+        state["sql_from_template"] = True
+        state["sql_modules"] = template.modules
         return state
 
-    modules = first_response_dict["modules"]
-    log.info(f"Extracted modules list -> {modules}")
+    # A near-identical question already produced SQL that executed fine
+    cached = await semantic_cache.lookup("text_to_sql", user_input, has_history)
+    if cached is not None:
+        state["sql"] = cached.answer
+        state["sql_from_cache"] = True
+        state["sql_modules"] = None
+        return state
+    state["sql_from_cache"] = False
 
-    # ===========================================
-    #  EXECUTE SCHEMA TOOL
-    # ===========================================
+    # Similar verified examples are looked up while the schema is resolved
+    examples_lookup = asyncio.ensure_future(sql_examples.search(user_input))
+
+    llm = get_chain_llm(state.get("model_key"), state.get("model_id"))
+    mode = settings.SQLGEN_MODE if settings.SQLGEN_MODE in SQLGEN_MODES else "two_step"
+
+    # Speculatively load every module schema (4 of them) while the module
+    # selection call runs; only the selected ones are used afterwards.
+    prefetch = (
+        asyncio.ensure_future(schema_cache.prefetch())
+        if mode != "two_step" or settings.SQLGEN_SCHEMA_PREFETCH
+        else None
+    )
+
+    # In "auto" mode module selection runs alongside the prefetch and is
+    # cancelled if the full schema turns out to fit the prompt budget.
+    selection = asyncio.ensure_future(_select_modules(llm, user_input)) if mode != "single_call" else None
+    try:
+        schema_bundle = await _single_call_schema(mode, prefetch, user_input)
+    except BaseException:
+        for task in (selection, prefetch, examples_lookup):
+            _discard(task)
+        raise
+    if schema_bundle is not None:
+        _discard(selection)
+        SQLGEN_CALLS.inc(mode="single_call")
+        log.info(f"sqlgen: single-call mode with all {len(schema_bundle.modules)} schema modules")
+        schema_json, compact = schema_bundle.compact, True
+    else:
+        SQLGEN_CALLS.inc(mode="two_step")
+        if selection is None:
+            selection = asyncio.ensure_future(_select_modules(llm, user_input))
+        try:
+            modules = await selection
+        except REQUEST_ABORTED:
+            _discard(prefetch)
+            _discard(examples_lookup)
+            raise
+        except Exception as e:
+            log.exception("Router schema extraction failed: %s", e)
+            _discard(prefetch)
+            _discard(examples_lookup)
+            state["sql"] = None
+            return state
 
-    tool_result = await tool_get_schema(modules)
-    log.info(f"the response after get schema from laravel {str(tool_result)[:5]}")
+        log.info(f"Extracted modules list -> {modules}")
+
+        # ===========================================
+        #  EXECUTE SCHEMA TOOL
+        # ===========================================
+
+        # Per-module schemas are cached (TTL + revalidation), as is the merged JSON string
+        prefetched = await prefetch if prefetch is not None else None
+        schema_bundle = await schema_cache.get(modules, prefetched)
+        log.info(f"the response after get schema from laravel {schema_bundle.serialized[:5]}")
+        schema_json, compact = schema_bundle.serialized, False
+
+    if settings.SQL_SCHEMA_PRUNE_TOP_N > 0:
+        schema_json = await _pruned_schema_json(schema_bundle, user_input, compact) or schema_json
+
+    state["sql_modules"] = schema_bundle.modules
+
+    # Retrieved examples replace the static examples block of the system prompt
+    examples = sql_examples.choose(await examples_lookup, schema_bundle.modules)
+    system_text = sql_system_prompt(render_examples(examples)) if examples else SECOND_SYSTEM_PROMPT
+    if examples:
+        log.info(f"sqlgen: {len(examples)} retrieved SQL examples in the prompt")
 
     # ===========================================
     # 3) SECOND CALL — SQL GENERATION
     # ===========================================
 
-    schema_json = json.dumps(tool_result, indent=2)  # or tool_result["schema"], etc.
 
     sql_user_message = (
         "User Question:\n" + user_input + "\n\nDatabase Schema (JSON):\n" + schema_json
@@ -98,15 +235,23 @@ async def sqlgen_node(state: Dict[str, Any]) -> Dict[str, Any]:
         [
             ("system", "{system_text}"),
             MessagesPlaceholder("chat_history"),
-            ("user", "User Question:\n{user_input}\n\nDatabase Schema (JSON):\n{schema_json}"),
+            ("user", SQL_USER_TEMPLATE),
         ]
     )
 
+    # The schema is mandatory; history only gets what is left of the budget
+    fitted = fit_prompt(
+        "sqlgen",
+        fixed=[SQL_USER_TEMPLATE, system_text, schema_json],
+        user=user_input,
+        history=state.get("chat_history") or [],
+    )
+
     try:
         second_chain = second_prompt | llm
         sql_response = await second_chain.ainvoke({
-            "system_text": SECOND_SYSTEM_PROMPT,
-            "chat_history": state.get("chat_history") or [],
+            "system_text": system_text,
+            "chat_history": fitted.history,
             "user_input": user_input,
             "schema_json": schema_json,
         })
@@ -115,6 +260,8 @@ async def sqlgen_node(state: Dict[str, Any]) -> Dict[str, Any]:
         sql_obj = json.loads(content_str)
         sql_query = sql_obj["sql"]
 
+    except REQUEST_ABORTED:
+        raise
     except Exception as e:
         log.exception("SQL generation failed: %s", e)
         state["sql"] = None
@@ -126,5 +273,9 @@ async def sqlgen_node(state: Dict[str, Any]) -> Dict[str, Any]:
     if not sql_query.endswith(";"):
         sql_query += ";"
 
+    if template is not None:
+        # Shadow mode: the template earns trust by matching the LLM
+        sql_templates.compare(template, sql_query)
+
     state["sql"] = sql_query
     return state
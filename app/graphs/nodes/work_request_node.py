@@ -1,10 +1,12 @@
 from app.llms.runnable.llm_provider import get_chain_llm
 from typing import Dict, Any, List
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.documents import Document
 from app.core.config import settings
-from langchain_pinecone import PineconeVectorStore
+from app.services.retrieval import get_documents
+from app.llms.runnable.structured import format_instructions, structured_chain
+from app.llms.runnable.prompt_budget import fit_prompt, template_text
 from app.models.parsers.work_request_models import (
     WorkRequestModel,
     LUMSUM_TYPE_ENUMS,
@@ -14,41 +16,66 @@ from app.models.parsers.work_request_models import (
     QUOTATION_TYPE_ENUMS,
 )
 from app.graphs.nodes.prompts.work_request_prompt import SYSTEM_MESSAGE
-from langchain_community.embeddings import HuggingFaceEmbeddings
 import json
 import re
+from app.core.errors import REQUEST_ABORTED
 import logging
 
 log = logging.getLogger("work_request_node")
 
+# {format_instructions} is filled in by structured_chain (schema in prompt
+# mode, a one-line note in native mode)
+WORK_REQUEST_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_MESSAGE),
+        MessagesPlaceholder("chat_history"),
+        (
+            "human",
+            (
+                "User description of the required work request:\n"
+                "{user_query}\n\n"
+                "Retrieved similar projects (scopes + metadata):\n"
+                "{retrieved_context}\n\n"
+                "Follow these format instructions exactly (do NOT repeat them):\n"
+                "<FORMAT_START>\n"
+                "{format_instructions}\n"
+                "<FORMAT_END>\n\n"
+                "Your reply MUST be only a single minified JSON object. "
+                "Do NOT include code fences or any schema keys such as $defs, properties, required, type, additionalProperties."
+            ),
+        ),
+    ]
+)
 
-async def work_request_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    pinecone_index_name = "horizon-work-order-scopes"
 
+def enum_tables() -> Dict[str, str]:
+    """The enum tables (`- ID 1: Name` lines) WORK_REQUEST_PROMPT's system message lists."""
+
+    def table(items: List[Dict[str, Any]]) -> str:
+        return "\n".join(f"- ID {item['id']}: {item['name']}" for item in items)
+
+    return {
+        "project_type_table": table(PROJECT_TYPE_ENUMS),
+        "discipline_table": table(DISCIPLINE_ENUMS),
+        "lumsum_table": table(LUMSUM_TYPE_ENUMS),
+        "quotation_type_table": table(QUOTATION_TYPE_ENUMS),
+        "project_checklist_table": table(PROJECT_CHECKLIST_ENUMS),
+    }
+
+
+async def work_request_node(state: Dict[str, Any]) -> Dict[str, Any]:
     log.info("******* Entered work_request_node ********")
     log.info(f"work_request_node: incoming state keys -> {list(state.keys())}")
 
     user_query = state.get("user_input")
 
-    embeddings = HuggingFaceEmbeddings(model_name=settings.HG_EMBEDDING_MODEL)
-    vectorstore = PineconeVectorStore(
-        index_name=pinecone_index_name,
-        embedding=embeddings,
-        text_key="project_title",
-        pinecone_api_key=settings.PINECONE_API_KEY,
-    )
-
-    log.info("work_request_node: converting vectorstore to retriever (k=5)")
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
     llm = get_chain_llm(state.get("model_key"), state.get("model_id"))
 
-    parser = PydanticOutputParser(pydantic_object=WorkRequestModel)
-
     # -------------------------
     # Retrieve similar projects from Pinecone
     # -------------------------
-    log.info("work_request_node: invoking retriever with user_query")
-    docs: List[Document] = retriever.invoke(user_query)
+    log.info("work_request_node: fetching similar projects for user_query")
+    docs: List[Document] = await get_documents(state, "work_request_generation")
     log.info(f"work_request_node: retrieved {len(docs)} docs from Pinecone")
 
     context_chunks = []
@@ -65,97 +92,51 @@ async def work_request_node(state: Dict[str, Any]) -> Dict[str, Any]:
             list(d.metadata.keys()),
         )
 
-    retrieved_context = (
-        "\n\n---\n\n".join(context_chunks)
-        if context_chunks
-        else "No similar projects found."
-    )
-    log.info(
-        "work_request_node: final retrieved_context length -> %s",
-        len(retrieved_context),
-    )
-
     # -------------------------
     #  Prepare enums as prompt text
     # -------------------------
-    log.info(
-        "work_request_node: building project_type_table_str from PROJECT_TYPE_ENUMS"
-    )
-    project_type_table_str = "\n".join(
-        f"- ID {item['id']}: {item['name']}" for item in PROJECT_TYPE_ENUMS
-    )
-
-    log.info("work_request_node: building discipline_table_str from DISCIPLINE_ENUMS")
-    discipline_table_str = "\n".join(
-        f"- ID {item['id']}: {item['name']}" for item in DISCIPLINE_ENUMS
-    )
-
-    log.info("work_request_node: building lumsum_table_str from LUMSUM_TYPE_ENUMS")
-    lumsum_table_str = "\n".join(
-        f"- ID {item['id']}: {item['name']}" for item in LUMSUM_TYPE_ENUMS
-    )
-
-    log.info("work_request_node: building quotation_type_table_str from QUOTATION_TYPE_ENUMS")
-    quotation_type_table_str = "\n".join(
-        f"- ID {item['id']}: {item['name']}" for item in QUOTATION_TYPE_ENUMS
-    )
-
-    log.info("work_request_node: building project_checklist_table_str from PROJECT_CHECKLIST_ENUMS")
-    project_checklist_table_str = "\n".join(
-        f"- ID {item['id']}: {item['name']}" for item in PROJECT_CHECKLIST_ENUMS
-    )
+    log.info("work_request_node: building enum tables for the prompt")
+    tables = enum_tables()
 
     # -------------------------
-    #  Prompt template
+    #  Fit retrieved scopes + history into the token budget
     # -------------------------
-    log.info("work_request_node: fetching format_instructions from parser")
-    format_instructions = parser.get_format_instructions()
-    log.info(
-        "work_request_node: format_instructions length -> %s",
-        len(format_instructions),
+    fitted = fit_prompt(
+        "work_request",
+        fixed=[
+            template_text(WORK_REQUEST_PROMPT),
+            # Filled into {format_instructions} by structured_chain
+            format_instructions(WorkRequestModel),
+            *tables.values(),
+        ],
+        user=user_query or "",
+        context=context_chunks,
+        history=state.get("chat_history") or [],
     )
-
-    log.info("work_request_node: constructing ChatPromptTemplate")
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_MESSAGE),
-            MessagesPlaceholder("chat_history"),
-            (
-                "human",
-                (
-                    "User description of the required work request:\n"
-                    "{user_query}\n\n"
-                    "Retrieved similar projects (scopes + metadata):\n"
-                    "{retrieved_context}\n\n"
-                    "Follow these format instructions exactly (do NOT repeat them):\n"
-                    "<FORMAT_START>\n"
-                    "{format_instructions}\n"
-                    "<FORMAT_END>\n\n"
-                    "Your reply MUST be only a single minified JSON object. "
-                    "Do NOT include code fences or any schema keys such as $defs, properties, required, type, additionalProperties."
-                ),
-            ),
-        ]
+    retrieved_context = (
+        "\n\n---\n\n".join(fitted.context)
+        if fitted.context
+        else "No similar projects found."
+    )
+    log.info(
+        "work_request_node: final retrieved_context length -> %s (%s/%s scopes within budget)",
+        len(retrieved_context),
+        len(fitted.context),
+        len(context_chunks),
     )
 
     # -------------------------
     #   Build chain (Runnable)
     # -------------------------
-    log.info("work_request_node: building LCEL chain with prompt -> llm -> parser")
+    log.info("work_request_node: building structured chain with prompt -> llm -> WorkRequestModel")
 
-    chain = prompt | llm | parser
+    chain = structured_chain(WORK_REQUEST_PROMPT, llm, WorkRequestModel, node="work_request")
 
     chain_input = {
         "user_query": user_query,
         "retrieved_context": retrieved_context,
-        "project_type_table": project_type_table_str,
-        "discipline_table": discipline_table_str,
-        "lumsum_table": lumsum_table_str,
-        "quotation_type_table": quotation_type_table_str,
-        "project_checklist_table": project_checklist_table_str,
-        "format_instructions": format_instructions,
-        "chat_history": state.get("chat_history") or [],
+        **tables,
+        "chat_history": fitted.history,
     }
 
     log.info(
@@ -165,8 +146,8 @@ async def work_request_node(state: Dict[str, Any]) -> Dict[str, Any]:
     )
 
     try:
-        model_obj: WorkRequestModel = chain.invoke(chain_input)
-        log.info("work_request_node: chain.invoke completed successfully")
+        model_obj: WorkRequestModel = await chain.ainvoke(chain_input)
+        log.info("work_request_node: chain.ainvoke completed successfully")
     except Exception as e:
         log.exception("work_request_node: LLM or parser failed")
         raise
@@ -231,11 +212,13 @@ async def work_request_node(state: Dict[str, Any]) -> Dict[str, Any]:
                 ("human", "User input:\n{user_query}"),
             ]
         )
-        llm_site = get_chain_llm(state.get("model_key"), state.get("model_id"))
+        llm_site = get_chain_llm(state.get("model_key"), state.get("model_id")).with_config(
+            metadata={"llm_cache_policy": "work_request_site_name"}
+        )
         site_chain = site_prompt | llm_site | StrOutputParser()
         extracted_site_name: str = ""
         try:
-            site_raw = (site_chain.invoke({"user_query": user_query or ""}) or "").strip()
+            site_raw = (await site_chain.ainvoke({"user_query": user_query or ""}) or "").strip()
             if site_raw.startswith("```"):
                 site_raw = re.sub(r"^```(?:json)?\s*", "", site_raw, flags=re.IGNORECASE)
                 site_raw = re.sub(r"\s*```$", "", site_raw)
@@ -243,6 +226,8 @@ async def work_request_node(state: Dict[str, Any]) -> Dict[str, Any]:
             val = obj.get("site_name")
             if isinstance(val, str) and val.strip():
                 extracted_site_name = val.strip()
+        except REQUEST_ABORTED:
+            raise
         except Exception:
             pass
         if extracted_site_name:
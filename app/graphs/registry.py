@@ -0,0 +1,147 @@
+# app/graphs/registry.py
+
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.telemetry.metrics import GRAPH_BUILD_SECONDS
+
+log = logging.getLogger("app.graphs.registry")
+
+
+# version -> "module:builder" (imported lazily so a broken graph module
+# cannot take the whole registry down with it)
+GRAPH_BUILDERS: Dict[str, str] = {
+    "horizon_brain_graph": "app.graphs.horizon_brain_graph:build_horizon_brain_graph",
+    "horizon_txt_to_sql": "app.graphs.horizon_txt_to_sql:build_horizon_txt_to_sql_graph",
+    "horizon_brain_graph_backup": "app.graphs.horizon_brain_graph_backup:build_horizon_brain_graph",
+}
+
+
+def _resolve_builder(target: str) -> Callable[[], Any]:
+    module_name, func_name = target.split(":", 1)
+    module = importlib.import_module(module_name)
+    return getattr(module, func_name)
+
+
+class GraphRegistry:
+    """
+    Process-wide registry of compiled LangGraph graphs.
+
+    Each graph version is compiled once (at startup or on first use) and the
+    compiled graph is shared by every request. Compiled LangGraph graphs are
+    stateless between invocations, so sharing them is safe.
+    """
+
+    def __init__(self, builders: Dict[str, str], active_version: str):
+        self._builders: Dict[str, Any] = dict(builders)
+        self._graphs: Dict[str, Any] = {}
+        self._active_version = active_version
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    # ---------- registration ----------
+
+    def register(self, version: str, builder: Any) -> None:
+        """Register (or replace) a builder; drops any previously compiled graph."""
+        with self._lock:
+            self._builders[version] = builder
+            self._graphs.pop(version, None)
+
+    @property
+    def active_version(self) -> str:
+        return self._active_version
+
+    def versions(self) -> list[str]:
+        return sorted(self._builders)
+
+    # ---------- compile / lookup ----------
+
+    def _stats_for(self, version: str) -> Dict[str, Any]:
+        return self._stats.setdefault(
+            version,
+            {"builds": 0, "build_ms": None, "hits": 0, "last_built_at": None, "last_error": None},
+        )
+
+    def _build(self, version: str) -> Any:
+        if version not in self._builders:
+            raise KeyError(f"Unknown graph version: {version}")
+
+        builder = self._builders[version]
+        if isinstance(builder, str):
+            builder = _resolve_builder(builder)
+
+        stats = self._stats_for(version)
+        started = time.perf_counter()
+        try:
+            graph = builder()
+        except Exception as e:
+            stats["last_error"] = str(e)
+            log.exception("Graph build failed for version=%s", version)
+            raise
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        GRAPH_BUILD_SECONDS.observe(elapsed_ms / 1000, version=version)
+
+        stats["builds"] += 1
+        stats["build_ms"] = round(elapsed_ms, 2)
+        stats["last_built_at"] = int(time.time())
+        stats["last_error"] = None
+        log.info("Compiled graph version=%s in %.1f ms", version, elapsed_ms)
+        return graph
+
+    def get(self, version: Optional[str] = None) -> Any:
+        """Return the compiled graph for `version` (default: the active version)."""
+        version = version or self._active_version
+        graph = self._graphs.get(version)
+        if graph is None:
+            with self._lock:
+                graph = self._graphs.get(version)
+                if graph is None:
+                    graph = self._build(version)
+                    self._graphs[version] = graph
+        self._stats_for(version)["hits"] += 1
+        return graph
+
+    def warmup(self, versions: Optional[list[str]] = None) -> None:
+        """Compile graphs ahead of traffic. Failures are logged, not raised."""
+        for version in versions or [self._active_version]:
+            try:
+                if version not in self._graphs:
+                    with self._lock:
+                        if version not in self._graphs:
+                            self._graphs[version] = self._build(version)
+            except Exception as e:
+                log.warning("Graph warmup failed for version=%s: %s", version, e)
+
+    def rebuild(self, version: Optional[str] = None) -> Any:
+        """Force a recompile, e.g. after node code was hot-reloaded."""
+        version = version or self._active_version
+        with self._lock:
+            graph = self._build(version)
+            self._graphs[version] = graph
+        return graph
+
+    def set_active(self, version: str) -> None:
+        """Swap the graph served by default. Compiles it first so the swap is atomic."""
+        graph = self.get(version)
+        if graph is not None:
+            self._active_version = version
+            log.info("Active graph version set to %s", version)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active_version": self._active_version,
+            "versions": self.versions(),
+            "compiled": sorted(self._graphs),
+            "graphs": {v: dict(s) for v, s in self._stats.items()},
+        }
+
+
+graph_registry = GraphRegistry(GRAPH_BUILDERS, settings.HORIZON_GRAPH_VERSION)
+
+
+def get_graph(version: Optional[str] = None) -> Any:
+    return graph_registry.get(version)
@@ -0,0 +1,244 @@
+"""
+Provider-aware admission control for LLM calls.
+
+Every BaseLLM.ainvoke goes through `admission.slot(provider, model, tokens)`:
+
+- a per-provider/model semaphore caps concurrent calls;
+- a token bucket (tokens per minute, using an estimate of prompt +
+  completion tokens) keeps us under the provider's rate limit;
+- callers that cannot start immediately wait in a bounded queue
+  (`horizon_llm_admission_queue_depth`);
+- when the queue is full, or the wait would exceed
+  ADMISSION_MAX_WAIT_SECONDS / the request deadline, the call is shed with
+  AdmissionRejected, which the API maps to 503 + Retry-After.
+
+Limits default to ADMISSION_DEFAULT_* and can be overridden per provider or
+per "provider:model" via ADMISSION_LIMITS (JSON), e.g.
+    {"openai": {"concurrency": 16, "tpm": 400000},
+     "do_serverless:llama3.3-70b-instruct": {"concurrency": 4, "queue": 16}}
+"""
+
+import asyncio
+import json
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.deadline import current_deadline
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.models.llm.admission")
+
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "horizon_llm_admission_queue_depth", "LLM calls waiting for admission per provider and model."
+)
+ADMISSION_INFLIGHT = REGISTRY.gauge(
+    "horizon_llm_admission_inflight", "LLM calls currently admitted per provider and model."
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "horizon_llm_admission_wait_seconds", "Time LLM calls spent waiting for admission."
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "horizon_llm_admission_rejected_total", "LLM calls shed by admission control, by reason."
+)
+
+
+class AdmissionRejected(Exception):
+    """The LLM call was shed; retry after `retry_after` seconds."""
+
+    def __init__(self, provider: str, model: str, reason: str, retry_after: float):
+        self.provider = provider
+        self.model = model
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        super().__init__(f"LLM admission rejected for {provider}:{model} ({reason}); retry after {self.retry_after}s")
+
+
+def estimate_tokens(input: Any, max_tokens: Optional[int] = None) -> int:
+    """Rough token estimate (~4 chars per token) of a prompt plus its completion budget."""
+    if hasattr(input, "to_messages"):
+        input = input.to_messages()
+    if isinstance(input, str):
+        chars = len(input)
+    elif isinstance(input, (list, tuple)):
+        chars = 0
+        for m in input:
+            content = getattr(m, "content", None)
+            if content is None and isinstance(m, dict):
+                content = m.get("content")
+            if content is None and isinstance(m, (list, tuple)) and len(m) == 2:
+                content = m[1]
+            chars += len(content) if isinstance(content, str) else len(str(content or ""))
+    else:
+        chars = len(str(input or ""))
+    return chars // 4 + 1 + (max_tokens or settings.ADMISSION_DEFAULT_COMPLETION_TOKENS)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute / 60` tokens per second."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take `amount` tokens (going into debt if needed) and return how long
+        the caller must wait before the reservation is covered.
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+
+class ProviderLimiter:
+    def __init__(self, provider: str, model: str, concurrency: int, tpm: float, queue: int):
+        self.provider = provider
+        self.model = model
+        self.concurrency = concurrency
+        self.max_queue = queue
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(tpm) if tpm > 0 else None
+        self.waiting = 0
+        self.inflight = 0
+
+    def _reject(self, reason: str, retry_after: float) -> AdmissionRejected:
+        ADMISSION_REJECTED.inc(provider=self.provider, model=self.model, reason=reason)
+        log.warning(f"Shedding LLM call to {self.provider}:{self.model}: {reason}")
+        return AdmissionRejected(self.provider, self.model, reason, retry_after)
+
+    def _max_wait(self) -> float:
+        max_wait = settings.ADMISSION_MAX_WAIT_SECONDS
+        deadline = current_deadline()
+        if deadline is not None:
+            max_wait = min(max_wait, deadline.remaining())
+        return max_wait
+
+    @asynccontextmanager
+    async def slot(self, tokens: int):
+        labels = {"provider": self.provider, "model": self.model}
+        started = time.perf_counter()
+        max_wait = self._max_wait()
+        acquired = False
+        try:
+            if not self.semaphore.locked() and self.waiting == 0:
+                # Free slot: acquire() completes without suspending
+                await self.semaphore.acquire()
+                acquired = True
+            else:
+                if self.waiting >= self.max_queue:
+                    raise self._reject("queue_full", settings.ADMISSION_MAX_WAIT_SECONDS)
+                self.waiting += 1
+                ADMISSION_QUEUE_DEPTH.set(self.waiting, **labels)
+                try:
+                    await asyncio.wait_for(self.semaphore.acquire(), timeout=max_wait)
+                    acquired = True
+                except asyncio.TimeoutError:
+                    raise self._reject("queue_timeout", max_wait)
+                finally:
+                    self.waiting -= 1
+                    ADMISSION_QUEUE_DEPTH.set(self.waiting, **labels)
+
+            if self.bucket is not None:
+                delay = self.bucket.reserve(tokens)
+                remaining_wait = max_wait - (time.perf_counter() - started)
+                if delay > remaining_wait:
+                    self.bucket.refund(tokens)
+                    raise self._reject("rate_limited", delay)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        except BaseException:
+            if acquired:
+                self.semaphore.release()
+            raise
+        finally:
+            ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started, **labels)
+
+        self.inflight += 1
+        ADMISSION_INFLIGHT.set(self.inflight, **labels)
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            ADMISSION_INFLIGHT.set(self.inflight, **labels)
+            self.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "tokens_available": round(self.bucket.tokens, 1) if self.bucket else None,
+        }
+
+
+class AdmissionController:
+    def __init__(self):
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self._overrides = self._parse_overrides(settings.ADMISSION_LIMITS)
+
+    @staticmethod
+    def _parse_overrides(raw: str) -> Dict[str, Dict[str, Any]]:
+        if not raw:
+            return {}
+        try:
+            data = json.loads(raw)
+            return data if isinstance(data, dict) else {}
+        except ValueError:
+            log.warning("ADMISSION_LIMITS is not valid JSON; using defaults")
+            return {}
+
+    def _limits_for(self, provider: str, model: str) -> Dict[str, Any]:
+        limits = {
+            "concurrency": settings.ADMISSION_DEFAULT_CONCURRENCY,
+            "tpm": settings.ADMISSION_DEFAULT_TPM,
+            "queue": settings.ADMISSION_MAX_QUEUE,
+        }
+        limits.update(self._overrides.get(provider) or {})
+        limits.update(self._overrides.get(f"{provider}:{model}") or {})
+        return limits
+
+    def limiter(self, provider: str, model: str) -> ProviderLimiter:
+        key = (provider, model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limits = self._limits_for(provider, model)
+            limiter = ProviderLimiter(
+                provider,
+                model,
+                concurrency=max(1, int(limits["concurrency"])),
+                tpm=float(limits["tpm"] or 0),
+                queue=max(0, int(limits["queue"])),
+            )
+            self._limiters[key] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, provider: str, model: str, tokens: int):
+        if not settings.ADMISSION_ENABLED:
+            yield
+            return
+        async with self.limiter(provider, model).slot(tokens):
+            yield
+
+    def stats(self) -> Dict[str, Any]:
+        return {f"{p}:{m}": limiter.stats() for (p, m), limiter in self._limiters.items()}
+
+
+admission = AdmissionController()
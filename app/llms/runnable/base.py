@@ -5,6 +5,11 @@ from typing import Any, Dict, List, Optional
 
 from langchain_core.runnables import Runnable
 from langchain_core.language_models.chat_models import BaseChatModel
+
+from app.core.deadline import with_deadline
+from .admission import admission, estimate_tokens
+from .hedging import hedger
+from .response_cache import cache_key, response_cache
  
 
 import logging
@@ -23,6 +28,25 @@ class BaseLLM(Runnable, ABC):
     
     chat_model: BaseChatModel
 
+    # Identify the provider/model for admission control and metrics;
+    # set by each provider's __init__.
+    provider_name: str = "llm"
+    model_id: Optional[str] = None
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+    # ---------- Response cache ----------
+
+    def _cache_entry(self, input: Any, config: Optional[dict], kwargs: Dict[str, Any]):
+        """(key, policy, ttl) when this call is cacheable, else None."""
+        policy, ttl = response_cache.policy_for(config, self.temperature)
+        if not ttl:
+            return None
+        messages = self.chat_model._convert_input(input).to_messages()
+        params = {"temperature": self.temperature, "max_tokens": self.max_tokens, **kwargs}
+        params["cache_policy"] = policy
+        return cache_key(messages, self.provider_name, self.model_id, params), policy, ttl
+
     # ---------- Runnable interface ----------
 
     def invoke(
@@ -31,8 +55,16 @@ class BaseLLM(Runnable, ABC):
         config: Optional[dict] = None,
         **kwargs: Any,
     ) -> Any:
-        """Sync invoke: delegate to underlying chat_model."""
-        return self.chat_model.invoke(input, config=config, **kwargs)
+        """Sync invoke: delegate to underlying chat_model (memory cache tier only)."""
+        entry = self._cache_entry(input, config, kwargs)
+        if entry is not None:
+            cached = response_cache.get(entry[0], entry[1])
+            if cached is not None:
+                return cached
+        result = self.chat_model.invoke(input, config=config, **kwargs)
+        if entry is not None:
+            response_cache.set(entry[0], result, entry[1], entry[2])
+        return result
 
     async def ainvoke(
         self,
@@ -43,12 +75,32 @@ class BaseLLM(Runnable, ABC):
         """
         Async invoke: use chat_model.ainvoke if available,
         otherwise fall back to Runnable's default implementation.
+        Served from the response cache when the call site opted in;
+        otherwise admitted through the provider's concurrency / rate limits
+        and bounded by the current request deadline, if any.
         """
-        ainvoke = getattr(self.chat_model, "ainvoke", None)
-        if callable(ainvoke):
-            return await ainvoke(input, config=config, **kwargs)  # type: ignore[arg-type]
-        # Fallback (should rarely be needed)
-        return await super().ainvoke(input, config=config, **kwargs)
+        entry = self._cache_entry(input, config, kwargs)
+        if entry is not None:
+            cached = await response_cache.aget(*entry)
+            if cached is not None:
+                return cached
+
+        # Slow or failing primaries are hedged / failed over to the secondary
+        result = await hedger.call(self, input, config, kwargs)
+
+        if entry is not None:
+            await response_cache.aset(entry[0], result, entry[1], entry[2])
+        return result
+
+    async def _ainvoke_admitted(self, input: Any, config: Optional[dict], kwargs: Dict[str, Any]) -> Any:
+        """One call to this provider through admission control and the request deadline."""
+        tokens = estimate_tokens(input, self.max_tokens)
+        async with admission.slot(self.provider_name, self.model_id or "default", tokens):
+            ainvoke = getattr(self.chat_model, "ainvoke", None)
+            if callable(ainvoke):
+                return await with_deadline(ainvoke(input, config=config, **kwargs))  # type: ignore[arg-type]
+            # Fallback (should rarely be needed)
+            return await with_deadline(super().ainvoke(input, config=config, **kwargs))
 
     @property
     def runnable(self) -> BaseChatModel:
@@ -7,7 +7,9 @@ from langchain_aws import ChatBedrockConverse
 from langchain_core.messages import AIMessage
 
 from app.core.config import settings
+from app.telemetry.callbacks import LLMMetricsCallback
 from .base import BaseLLM, LLMError
+from .provider_pool import get_bedrock_client
 
 log = logging.getLogger("app.models.llm.bedrock")
 
@@ -53,19 +55,22 @@ class BedrockProvider(BaseLLM):
             "model_id": mid,
             "region_name": region,
             "temperature": temp,
+            "callbacks": [LLMMetricsCallback("bedrock", mid)],
         }
 
-        # Optional — configure API keys manually
-        if getattr(settings, "BEDROCK_ACCESS_KEY", None):
-            kwargs["aws_access_key_id"] = settings.BEDROCK_ACCESS_KEY
-        if getattr(settings, "BEDROCK_SECRET_KEY", None):
-            kwargs["aws_secret_access_key"] = settings.BEDROCK_SECRET_KEY
+        # Shared bedrock-runtime client (credentials from settings are
+        # applied when it is created)
+        kwargs["client"] = get_bedrock_client(region)
 
         if max_out is not None:
             kwargs["max_tokens"] = max_out
 
         # The LangChain ChatModel
         self.chat_model = ChatBedrockConverse(**kwargs)
+        self.provider_name = "bedrock"
+        self.model_id = mid
+        self.temperature = temp
+        self.max_tokens = max_out
 
     # Optional: semantic alias for clarity
     async def chat(self, messages, tools=None):
@@ -8,7 +8,9 @@ from langchain_core.tools import BaseTool
 from langchain_core.messages import BaseMessage
 
 from app.core.config import settings
+from app.telemetry.callbacks import LLMMetricsCallback
 from .base import BaseLLM, LLMError
+from .provider_pool import get_http_async_client, get_http_client
 
 log = logging.getLogger("app.models.llm.do_llama")
 
@@ -62,6 +64,10 @@ class DOLlamaProvider(BaseLLM):
             "base_url": url,
             "temperature": temp,
             "timeout": req_timeout,
+            "callbacks": [LLMMetricsCallback("do_serverless", mid)],
+            # shared keep-alive connection pool across provider instances
+            "http_client": get_http_client(),
+            "http_async_client": get_http_async_client(),
         }
 
         # Only pass max_tokens if explicitly set; some backends are picky.
@@ -70,6 +76,10 @@ class DOLlamaProvider(BaseLLM):
 
         # LangChain ChatModel (OpenAI-compatible)
         self.chat_model = ChatOpenAI(**kwargs)
+        self.provider_name = "do_serverless"
+        self.model_id = mid
+        self.temperature = temp
+        self.max_tokens = max_out
 
     async def chat(self, messages: Sequence[BaseMessage], tools: Optional[Sequence[BaseTool]] = None):
         """
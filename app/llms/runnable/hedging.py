@@ -0,0 +1,282 @@
+"""
+Hedged LLM requests and cross-provider failover.
+
+For providers listed in LLM_HEDGE_PROVIDERS (DigitalOcean serverless by
+default), BaseLLM.ainvoke runs through `hedger.call(...)`:
+
+- the primary call starts as usual;
+- if it has not answered after the primary's dynamic p95 (EWMA of latency
+  mean and variance, clamped to LLM_HEDGE_MIN/MAX_DELAY_SECONDS), the same
+  request is fired at LLM_HEDGE_SECONDARY ("provider:model"); whichever
+  answers first wins and the other call is cancelled;
+- a hard failure of the primary (anything but the request deadline or a
+  cancellation) fails over to the secondary immediately, whether it comes
+  before or after the hedge delay.
+
+Streamed calls (astream_events, e.g. /horizon-engine/stream) are neither
+hedged nor failed over: their tokens already went to the client. Call
+kwargs are provider-specific, so the secondary only gets a call whose
+kwargs it can be given: none, or native structured output rebuilt for the
+secondary's provider.
+
+Hedges are paid for with a budget: every primary call earns
+LLM_HEDGE_MAX_RATE tokens (capped at LLM_HEDGE_BUDGET_BURST) and every
+hedge spends one, so in steady state at most that fraction of calls is
+duplicated. Failovers are not budgeted; the primary's answer is lost anyway.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.tracers._streaming import _StreamingCallbackHandler
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, current_deadline
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.models.llm.hedging")
+
+LLM_LATENCY_EWMA = REGISTRY.gauge(
+    "horizon_llm_latency_ewma_seconds", "EWMA of LLM call latency per provider and model (stat=mean|p95)."
+)
+LLM_HEDGES = REGISTRY.counter(
+    "horizon_llm_hedges_total",
+    "Hedging decisions per primary provider and model (fired, primary_won, secondary_won, skipped_budget).",
+)
+LLM_FAILOVERS = REGISTRY.counter(
+    "horizon_llm_failovers_total", "Failovers to the secondary after a primary hard failure, by result."
+)
+
+# z-score of the 95th percentile for a normal approximation
+_P95_Z = 1.645
+
+
+class LatencyEWMA:
+    """Exponentially weighted mean / variance of call latency."""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.mean = 0.0
+        self.var = 0.0
+        self.samples = 0
+
+    def observe(self, seconds: float) -> None:
+        if self.samples == 0:
+            self.mean = seconds
+        else:
+            diff = seconds - self.mean
+            incr = self.alpha * diff
+            self.mean += incr
+            self.var = (1 - self.alpha) * (self.var + diff * incr)
+        self.samples += 1
+
+    @property
+    def p95(self) -> float:
+        return self.mean + _P95_Z * math.sqrt(self.var)
+
+
+def parse_target(spec: str) -> Optional[Tuple[str, Optional[str]]]:
+    """'openai:gpt-4o-mini' -> ('openai', 'gpt-4o-mini'); '' -> None."""
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    provider, _, model = spec.partition(":")
+    return provider.strip(), (model.strip() or None)
+
+
+def _is_streaming(config: Optional[dict]) -> bool:
+    """True when the run streams tokens to a consumer (astream_events / astream_log)."""
+    callbacks = (config or {}).get("callbacks")
+    handlers = getattr(callbacks, "handlers", callbacks) or []
+    return any(isinstance(h, _StreamingCallbackHandler) for h in handlers)
+
+
+class Hedger:
+    def __init__(self):
+        self.providers = {p.strip() for p in settings.LLM_HEDGE_PROVIDERS.split(",") if p.strip()}
+        self.secondary = parse_target(settings.LLM_HEDGE_SECONDARY)
+        self._latency: Dict[Tuple[str, str], LatencyEWMA] = {}
+        self._budget = float(settings.LLM_HEDGE_BUDGET_BURST)
+        self._lock = threading.Lock()
+
+    # ---------- latency tracking ----------
+
+    def observe(self, provider: str, model: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._latency.get((provider, model))
+            if stats is None:
+                stats = self._latency[(provider, model)] = LatencyEWMA(settings.LLM_HEDGE_EWMA_ALPHA)
+            stats.observe(seconds)
+            mean, p95 = stats.mean, stats.p95
+        LLM_LATENCY_EWMA.set(round(mean, 4), provider=provider, model=model, stat="mean")
+        LLM_LATENCY_EWMA.set(round(p95, 4), provider=provider, model=model, stat="p95")
+
+    def hedge_delay(self, provider: str, model: str) -> float:
+        """Seconds to wait on the primary before hedging."""
+        stats = self._latency.get((provider, model))
+        if stats is None or stats.samples < settings.LLM_HEDGE_MIN_SAMPLES:
+            return settings.LLM_HEDGE_MAX_DELAY_SECONDS
+        return min(max(stats.p95, settings.LLM_HEDGE_MIN_DELAY_SECONDS), settings.LLM_HEDGE_MAX_DELAY_SECONDS)
+
+    # ---------- hedge budget ----------
+
+    def _earn(self) -> None:
+        with self._lock:
+            self._budget = min(float(settings.LLM_HEDGE_BUDGET_BURST), self._budget + settings.LLM_HEDGE_MAX_RATE)
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._budget < 1.0:
+                return False
+            self._budget -= 1.0
+            return True
+
+    # ---------- calls ----------
+
+    def _secondary_llm(self, llm) -> Optional[Any]:
+        if self.secondary is None:
+            return None
+        provider_key, model_id = self.secondary
+        # Imported lazily: llm_provider imports the providers, which import BaseLLM
+        from .llm_provider import _build_provider
+
+        try:
+            secondary = _build_provider(provider_key, model_id=model_id, temperature=llm.temperature, max_tokens=llm.max_tokens)
+        except Exception as e:
+            log.warning(f"Hedge secondary {provider_key}:{model_id} unavailable: {e}")
+            return None
+        if secondary.provider_name == llm.provider_name and secondary.model_id == llm.model_id:
+            return None
+        return secondary
+
+    def _secondary_for(self, llm, config: Optional[dict], kwargs: Dict[str, Any]) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """(secondary llm, its call kwargs), or None when this call cannot go to the secondary."""
+        secondary_llm = self._secondary_llm(llm)
+        if secondary_llm is None or not kwargs:
+            return (secondary_llm, {}) if secondary_llm is not None else None
+        # Call kwargs are provider-specific; the only ones we can translate are
+        # native structured output (OpenAI response_format, tool calling, ...)
+        from .structured import native_kwargs, schema_by_name
+
+        schema = schema_by_name(((config or {}).get("metadata") or {}).get("structured_output"))
+        if schema is None or kwargs != native_kwargs(llm, schema):
+            return None
+        secondary_kwargs = native_kwargs(secondary_llm, schema)
+        if secondary_kwargs is None:
+            return None
+        return secondary_llm, secondary_kwargs
+
+    def applies_to(self, llm, config: Optional[dict] = None) -> bool:
+        # Streamed calls are never duplicated or retried: their tokens already
+        # reached the client, and a second run would interleave or repeat them.
+        return (
+            settings.LLM_HEDGE_ENABLED
+            and llm.provider_name in self.providers
+            and self.secondary is not None
+            and not _is_streaming(config)
+        )
+
+    async def _timed(self, llm, input: Any, config: Optional[dict], kwargs: Dict[str, Any]) -> Any:
+        model = llm.model_id or "default"
+        started = time.perf_counter()
+        try:
+            result = await llm._ainvoke_admitted(input, config, kwargs)
+        except asyncio.CancelledError:
+            # A cancelled slow call is still a (lower-bound) latency sample;
+            # dropping it would pull the p95 down exactly when it is rising.
+            self.observe(llm.provider_name, model, time.perf_counter() - started)
+            raise
+        self.observe(llm.provider_name, model, time.perf_counter() - started)
+        return result
+
+    async def call(self, llm, input: Any, config: Optional[dict], kwargs: Dict[str, Any]) -> Any:
+        if not self.applies_to(llm, config):
+            return await llm._ainvoke_admitted(input, config, kwargs)
+
+        labels = {"provider": llm.provider_name, "model": llm.model_id or "default"}
+        self._earn()
+        delay = self.hedge_delay(llm.provider_name, labels["model"])
+        deadline = current_deadline()
+        primary = asyncio.ensure_future(self._timed(llm, input, config, kwargs))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or (deadline is not None and deadline.expired):
+                return await self._primary_or_failover(primary, llm, input, config, kwargs, labels)
+            secondary = self._secondary_for(llm, config, kwargs)
+            if secondary is None:
+                return await self._primary_or_failover(primary, llm, input, config, kwargs, labels)
+            if not self._spend():
+                LLM_HEDGES.inc(outcome="skipped_budget", **labels)
+                return await self._primary_or_failover(primary, llm, input, config, kwargs, labels)
+            secondary_llm, secondary_kwargs = secondary
+            LLM_HEDGES.inc(outcome="fired", **labels)
+            log.info(
+                f"Hedging {llm.provider_name}:{llm.model_id} after {delay:.2f}s "
+                f"-> {secondary_llm.provider_name}:{secondary_llm.model_id}"
+            )
+            pending.add(asyncio.ensure_future(self._timed(secondary_llm, input, config, secondary_kwargs)))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        LLM_HEDGES.inc(outcome="primary_won" if task is primary else "secondary_won", **labels)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in (primary, *pending):
+                if not task.done():
+                    task.cancel()
+
+    async def _primary_or_failover(self, primary: "asyncio.Future", llm, input: Any, config: Optional[dict], kwargs: Dict[str, Any], labels: Dict[str, str]) -> Any:
+        # Hard failures fail over whenever they arrive, before or after the hedge delay
+        try:
+            return await primary
+        except (DeadlineExceeded, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            return await self._failover(llm, input, config, kwargs, e, labels)
+
+    async def _failover(self, llm, input: Any, config: Optional[dict], kwargs: Dict[str, Any], error: Exception, labels: Dict[str, str]) -> Any:
+        secondary = self._secondary_for(llm, config, kwargs)
+        if secondary is None:
+            raise error
+        secondary_llm, secondary_kwargs = secondary
+        log.warning(
+            f"{llm.provider_name}:{llm.model_id} failed ({type(error).__name__}: {error}); "
+            f"failing over to {secondary_llm.provider_name}:{secondary_llm.model_id}"
+        )
+        try:
+            result = await self._timed(secondary_llm, input, config, secondary_kwargs)
+        except Exception:
+            LLM_FAILOVERS.inc(result="failed", **labels)
+            raise
+        LLM_FAILOVERS.inc(result="success", **labels)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latency = {
+                f"{p}:{m}": {"mean": round(s.mean, 4), "p95": round(s.p95, 4), "samples": s.samples}
+                for (p, m), s in self._latency.items()
+            }
+            budget = round(self._budget, 2)
+        return {
+            "enabled": settings.LLM_HEDGE_ENABLED,
+            "providers": sorted(self.providers),
+            "secondary": ":".join(filter(None, self.secondary)) if self.secondary else None,
+            "max_rate": settings.LLM_HEDGE_MAX_RATE,
+            "budget": budget,
+            "latency": latency,
+            "hedges": [{**labels, "count": n} for labels, n in LLM_HEDGES.samples()],
+            "failovers": [{**labels, "count": n} for labels, n in LLM_FAILOVERS.samples()],
+        }
+
+
+hedger = Hedger()
@@ -6,25 +6,65 @@ from app.core.config import settings
 from .base import BaseLLM
 from .openai_provider import OpenAIProvider
 from .bedrock_provider import BedrockProvider
+from .replay_provider import ReplayProvider
+from .simulated_provider import SimulatedProvider
+from .provider_pool import provider_pool
+from app.bench.cassette import cassette, cassette_recorder
 
 log = logging.getLogger("app.models.llm.factory")
 
 _instance: Optional[BaseLLM] = None
 
 
-def _build_provider(provider_key: str, model_id: Optional[str] = None) -> BaseLLM:
-    """Internal helper to map provider key -> provider."""
-    key = provider_key.lower()
-    log.info("Building LLM provider for key=%s", key)
-
+def _provider_family(key: str) -> str:
+    if key in {"replay", "cassette"} or cassette.replaying:
+        return "replay"
+    if key in {"simulated", "mock"}:
+        return "simulated"
     if key == "openai":
-        return OpenAIProvider(model_id=model_id)
+        return "openai"
     if key in {"do_serverless", "digitalocean", "digitalocean_llama", "gradient"}:
-        return DOLlamaProvider(model_id=model_id)
+        return "do_serverless"
     if key in {"bedrock", "bedrock_provider", "bedrock_llama"}:
-        return BedrockProvider(model_id=model_id)
-
-    raise ValueError(f"Unsupported LLM provider: {provider_key}")
+        return "bedrock"
+    raise ValueError(f"Unsupported LLM provider: {key}")
+
+
+def _new_provider(family: str, model_id: Optional[str], temperature: Optional[float], max_tokens: Optional[int]) -> BaseLLM:
+    log.info("Building LLM provider family=%s model_id=%s", family, model_id)
+    # Offline benchmarks: every call is answered from the cassette
+    if family == "replay":
+        return ReplayProvider(model_id=model_id)
+    # Load / soak tests: fabricated replies, simulated latency and errors
+    if family == "simulated":
+        return SimulatedProvider(model_id=model_id, temperature=temperature, max_tokens=max_tokens)
+
+    if family == "openai":
+        provider = OpenAIProvider(model_id=model_id, temperature=temperature, max_tokens=max_tokens)
+    elif family == "do_serverless":
+        provider = DOLlamaProvider(model_id=model_id, temperature=temperature, max_tokens=max_tokens)
+    else:
+        provider = BedrockProvider(model_id=model_id, temperature=temperature, max_tokens=max_tokens)
+
+    if cassette.recording:
+        provider.chat_model.callbacks = [*(provider.chat_model.callbacks or []), cassette_recorder]
+    return provider
+
+
+def _build_provider(
+    provider_key: str,
+    model_id: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+) -> BaseLLM:
+    """
+    Internal helper to map provider key -> provider. Instances are pooled by
+    (provider, model_id, temperature, max_tokens) so connection pools
+    survive across requests.
+    """
+    family = _provider_family(provider_key.lower())
+    key = (family, model_id, temperature, max_tokens)
+    return provider_pool.get(key, lambda: _new_provider(family, model_id, temperature, max_tokens))
 
 
 def get_chain_llm(llm_name: Optional[str] = None, model_id: Optional[str] = None) -> BaseLLM:
@@ -37,7 +77,7 @@ def get_chain_llm(llm_name: Optional[str] = None, model_id: Optional[str] = None
         # provider key, treat it as a model_id and use the configured provider.
         known_keys = {
             "openai", "do_serverless", "digitalocean", "digitalocean_llama", "gradient",
-            "bedrock", "bedrock_provider", "bedrock_llama"
+            "bedrock", "bedrock_provider", "bedrock_llama", "replay", "cassette", "simulated", "mock"
         }
         if llm_name and llm_name.lower() not in known_keys and model_id is None:
             model_id = llm_name
@@ -7,7 +7,9 @@ from langchain_openai import ChatOpenAI
 from langchain_core.messages import AIMessage
 
 from app.core.config import settings
+from app.telemetry.callbacks import LLMMetricsCallback
 from .base import BaseLLM, LLMError
+from .provider_pool import get_http_async_client, get_http_client
 
 log = logging.getLogger("app.models.llm.openai")
 
@@ -60,6 +62,10 @@ class OpenAIProvider(BaseLLM):
             "model": mid,
             "temperature": temp,
             "api_key": api_key,  # ✅ tell ChatOpenAI which key to use
+            "callbacks": [LLMMetricsCallback("openai", mid)],
+            # shared keep-alive connection pool across provider instances
+            "http_client": get_http_client(),
+            "http_async_client": get_http_async_client(),
         }
 
         if max_out is not None:
@@ -67,6 +73,10 @@ class OpenAIProvider(BaseLLM):
 
         # critical: BaseLLM needs this attribute
         self.chat_model = ChatOpenAI(**kwargs)
+        self.provider_name = "openai"
+        self.model_id = mid
+        self.temperature = temp
+        self.max_tokens = max_out
 
     async def chat(self, messages, tools: Sequence[Any] | None = None):
         cm = self.chat_model
@@ -0,0 +1,199 @@
+"""
+Token-budgeted prompt assembly.
+
+Nodes used to pass the full chat history and every retrieved chunk to the
+model. `fit_prompt(node, ...)` fills the node's input-token budget
+(PROMPT_BUDGETS, JSON) in priority order:
+
+1. fixed parts (system prompt, schema, templates): always kept;
+2. the user turn: always kept;
+3. retrieved context, in rank order: the chunk that crosses the budget is
+   truncated, later chunks are dropped;
+4. chat history, newest first: every message is first capped at
+   PROMPT_HISTORY_MESSAGE_MAX_TOKENS (assistant turns are often JSON dumps
+   of rows or summaries), older turns that no longer fit are replaced by a
+   one-line digest of the user questions they contained.
+
+Tokens are counted with tiktoken (encoding cached per process) and fall
+back to a ~4 chars/token estimate when the tokenizer is unavailable (e.g.
+no network to fetch the BPE file). Counts are a close proxy for
+non-OpenAI models too, which is all a budget needs.
+"""
+
+import json
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.models.llm.prompt_budget")
+
+PROMPT_TOKENS = REGISTRY.histogram(
+    "horizon_prompt_budget_tokens",
+    "Estimated input tokens of budgeted prompts per node.",
+    buckets=(250, 500, 1000, 2000, 4000, 6000, 8000, 12000, 16000, 32000),
+)
+PROMPT_TRUNCATIONS = REGISTRY.counter(
+    "horizon_prompt_budget_truncations_total", "Prompt parts truncated or dropped to fit the budget, by node and part."
+)
+
+# Per-message framing overhead in chat formats (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_MARKER = " …[truncated]"
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(settings.PROMPT_TOKENIZER_ENCODING)
+    except Exception as e:
+        log.warning(f"tiktoken unavailable, estimating tokens from characters: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to about `max_tokens` tokens, marking the cut."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _encoding()
+    if encoding is None:
+        return text[: max_tokens * 4] + TRUNCATION_MARKER
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]) + TRUNCATION_MARKER
+
+
+def _content_text(message: BaseMessage) -> str:
+    content = message.content
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+
+
+def message_tokens(message: BaseMessage) -> int:
+    return count_tokens(_content_text(message)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def template_text(prompt) -> str:
+    """Static text of a ChatPromptTemplate's messages (placeholders unfilled)."""
+    parts: List[str] = []
+    for message in getattr(prompt, "messages", []):
+        template = getattr(getattr(message, "prompt", None), "template", None)
+        if isinstance(template, str):
+            parts.append(template)
+        elif isinstance(message, BaseMessage):
+            parts.append(_content_text(message))
+    return "\n".join(parts)
+
+
+def budget_for(node: str) -> int:
+    try:
+        budgets: Dict[str, int] = json.loads(settings.PROMPT_BUDGETS or "{}")
+    except ValueError:
+        budgets = {}
+    return int(budgets.get(node) or budgets.get("default") or 0)
+
+
+class BudgetedPrompt(BaseModel):
+    context: List[str]
+    history: List[BaseMessage]
+    tokens: int
+    budget: int
+    truncated: bool
+
+
+def _cap_message(message: BaseMessage, max_tokens: int) -> BaseMessage:
+    text = _content_text(message)
+    if count_tokens(text) <= max_tokens:
+        return message
+    return message.__class__(content=truncate_to_tokens(text, max_tokens))
+
+
+def _history_digest(dropped: Sequence[BaseMessage], max_tokens: int) -> Optional[SystemMessage]:
+    questions = [_content_text(m).strip().replace("\n", " ")[:120] for m in dropped if isinstance(m, HumanMessage)]
+    if not questions or max_tokens <= MESSAGE_OVERHEAD_TOKENS:
+        return None
+    text = f"Earlier in this conversation ({len(dropped)} older messages omitted) the user asked: " + "; ".join(questions)
+    return SystemMessage(content=truncate_to_tokens(text, max_tokens - MESSAGE_OVERHEAD_TOKENS))
+
+
+def fit_prompt(
+    node: str,
+    *,
+    fixed: Sequence[str] = (),
+    user: str = "",
+    context: Sequence[str] = (),
+    history: Sequence[BaseMessage] = (),
+) -> BudgetedPrompt:
+    """
+    Select the retrieved `context` chunks and `history` messages that fit
+    the node's budget next to the `fixed` prompt parts and the `user` turn.
+    A node without a budget gets everything back unchanged.
+    """
+    budget = budget_for(node)
+    history = list(history or [])
+    context = list(context or [])
+    used = sum(count_tokens(text) for text in fixed) + count_tokens(user) + MESSAGE_OVERHEAD_TOKENS * 2
+    if budget <= 0:
+        return BudgetedPrompt(context=context, history=history, tokens=used, budget=0, truncated=False)
+
+    truncated = False
+
+    kept_context: List[str] = []
+    for index, chunk in enumerate(context):
+        remaining = budget - used
+        tokens = count_tokens(chunk)
+        if tokens <= remaining:
+            kept_context.append(chunk)
+            used += tokens
+            continue
+        # Partial chunk only when a useful amount still fits
+        if remaining >= settings.PROMPT_MIN_CHUNK_TOKENS:
+            kept_context.append(truncate_to_tokens(chunk, remaining))
+            used = budget
+        PROMPT_TRUNCATIONS.inc(len(context) - index, node=node, part="context")
+        truncated = True
+        break
+
+    kept_history: List[BaseMessage] = []
+    cap = settings.PROMPT_HISTORY_MESSAGE_MAX_TOKENS
+    for index in range(len(history) - 1, -1, -1):
+        message = _cap_message(history[index], cap)
+        if message is not history[index]:
+            PROMPT_TRUNCATIONS.inc(node=node, part="history_message")
+            truncated = True
+        tokens = message_tokens(message)
+        if used + tokens > budget:
+            dropped = history[: index + 1]
+            PROMPT_TRUNCATIONS.inc(len(dropped), node=node, part="history")
+            truncated = True
+            digest = _history_digest(dropped, budget - used)
+            if digest is not None:
+                kept_history.append(digest)
+                used += message_tokens(digest)
+            break
+        kept_history.append(message)
+        used += tokens
+    kept_history.reverse()
+    # Chat templates expect alternating turns; never start on a dangling assistant reply
+    while len(kept_history) > 1 and isinstance(kept_history[0], AIMessage):
+        used -= message_tokens(kept_history.pop(0))
+
+    PROMPT_TOKENS.observe(used, node=node)
+    if truncated:
+        log.info(f"{node}: prompt fitted to {used}/{budget} tokens ({len(kept_context)}/{len(context)} chunks, {len(kept_history)}/{len(history)} history)")
+    return BudgetedPrompt(context=kept_context, history=kept_history, tokens=used, budget=budget, truncated=truncated)
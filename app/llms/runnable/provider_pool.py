@@ -0,0 +1,154 @@
+"""
+Process-wide pool of LLM provider instances and their transport clients.
+
+Building a ChatOpenAI / ChatBedrockConverse per request throws away the
+HTTP connection pool and TLS sessions. Providers are therefore kept in an
+LRU keyed by (provider, model_id, temperature, max_tokens), and every
+OpenAI-compatible client (ChatOpenAI for OpenAI and DigitalOcean, plus the
+raw `openai` SDK clients) shares one keep-alive httpx client pair, while
+Bedrock shares one boto3 bedrock-runtime client per region.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+import logging
+
+log = logging.getLogger("app.models.llm.pool")
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+_bedrock_clients: Dict[str, Any] = {}
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """Shared keep-alive sync client for OpenAI-compatible APIs."""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(limits=_http_limits(), timeout=httpx.Timeout(600.0, connect=10.0))
+    return _http_client
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    """Shared keep-alive async client for OpenAI-compatible APIs."""
+    global _http_async_client
+    if _http_async_client is None:
+        with _lock:
+            if _http_async_client is None:
+                _http_async_client = httpx.AsyncClient(limits=_http_limits(), timeout=httpx.Timeout(600.0, connect=10.0))
+    return _http_async_client
+
+
+def get_bedrock_client(region: Optional[str] = None):
+    """Shared boto3 bedrock-runtime client (boto3 clients are thread-safe)."""
+    region = region or settings.BEDROCK_REGION
+    client = _bedrock_clients.get(region)
+    if client is None:
+        import boto3
+        from botocore.config import Config
+
+        with _lock:
+            client = _bedrock_clients.get(region)
+            if client is None:
+                kwargs: Dict[str, Any] = {
+                    "service_name": "bedrock-runtime",
+                    "region_name": region,
+                    "config": Config(max_pool_connections=settings.LLM_HTTP_MAX_CONNECTIONS),
+                }
+                if getattr(settings, "BEDROCK_ACCESS_KEY", None):
+                    kwargs["aws_access_key_id"] = settings.BEDROCK_ACCESS_KEY
+                if getattr(settings, "BEDROCK_SECRET_KEY", None):
+                    kwargs["aws_secret_access_key"] = settings.BEDROCK_SECRET_KEY
+                client = boto3.client(**kwargs)
+                _bedrock_clients[region] = client
+    return client
+
+
+async def aclose_clients() -> None:
+    """Close shared HTTP clients (application shutdown)."""
+    global _http_client, _http_async_client
+    if _http_async_client is not None:
+        await _http_async_client.aclose()
+        _http_async_client = None
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
+
+
+PoolKey = Tuple[Hashable, ...]
+
+
+class ProviderPool:
+    """Thread-safe LRU of provider instances."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[PoolKey, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: PoolKey, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item
+        # Build outside the lock; a concurrent build of the same key just
+        # loses the race and is discarded.
+        built = factory()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self.hits += 1
+                return item
+            self.misses += 1
+            self._items[key] = built
+            while len(self._items) > self.max_size:
+                evicted, _ = self._items.popitem(last=False)
+                self.evictions += 1
+                log.info(f"LLM provider pool evicted {evicted}")
+        return built
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = [list(k) for k in self._items]
+        lookups = self.hits + self.misses
+        return {
+            "size": len(keys),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "providers": keys,
+            "http_clients": {
+                "sync": _http_client is not None,
+                "async": _http_async_client is not None,
+            },
+            "bedrock_clients": sorted(_bedrock_clients),
+        }
+
+
+provider_pool = ProviderPool(settings.LLM_PROVIDER_POOL_SIZE)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import logging
+from typing import Any, List, Optional, Sequence
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.bench.cassette import Cassette, cassette, llm_key
+from app.telemetry.callbacks import LLMMetricsCallback
+from .base import BaseLLM
+
+log = logging.getLogger("app.models.llm.replay")
+
+
+class CassetteChatModel(BaseChatModel):
+    """Chat model that answers from a recorded cassette (no network)."""
+
+    cassette: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-replay"
+
+    def _entry(self, messages: List[BaseMessage], run_manager) -> dict:
+        node = (getattr(run_manager, "metadata", None) or {}).get("langgraph_node")
+        return self.cassette.lookup("llm", llm_key(node, messages), node)
+
+    @staticmethod
+    def _result(entry: dict) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=entry.get("response") or ""))])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        entry = self._entry(messages, run_manager)
+        delay = self.cassette.delay_for(entry)
+        if delay:
+            time.sleep(delay)
+        return self._result(entry)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        entry = self._entry(messages, run_manager)
+        delay = self.cassette.delay_for(entry)
+        if delay:
+            await asyncio.sleep(delay)
+        return self._result(entry)
+
+
+class ReplayProvider(BaseLLM):
+    """
+    Provider backed by the record/replay cassette. Selected with the
+    "replay" provider key, or for every call when CASSETTE_MODE=replay.
+    """
+
+    def __init__(self, model_id: Optional[str] = None, source: Optional[Cassette] = None):
+        mid = model_id or "cassette"
+        self.provider_name = "replay"
+        self.model_id = mid
+        self.chat_model = CassetteChatModel(
+            cassette=source or cassette,
+            callbacks=[LLMMetricsCallback("replay", mid)],
+        )
+
+    async def chat(self, messages, tools: Sequence[Any] | None = None):
+        return await self.chat_model.ainvoke(messages)
+
+    async def complete(self, prompt: str) -> str:
+        resp = await self.chat_model.ainvoke([{"role": "user", "content": prompt}])
+        return resp.content or ""
@@ -0,0 +1,228 @@
+"""
+Exact-match LLM response cache used by BaseLLM.
+
+Opt-in per call site. A call is cached when its policy has a TTL in
+LLM_CACHE_TTLS (JSON, seconds). The policy name is the
+`llm_cache_policy` config metadata when a node sets one, e.g.
+
+    llm.with_config(metadata={"llm_cache_policy": "sqlgen_modules"})
+
+and otherwise the LangGraph node name (`langgraph_node`). Temperature-0
+calls can additionally be cached everywhere via
+LLM_CACHE_DETERMINISTIC_TTL.
+
+Keys are a SHA-256 over the canonical messages, provider, model and
+generation params. Lookups go to an in-process LRU first and Redis
+(REDIS_URL) second; a Redis hit is promoted into the LRU. Redis failures
+only disable the second tier for a short while.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from app.core.config import settings
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.models.llm.cache")
+
+LLM_CACHE_LOOKUPS = REGISTRY.counter(
+    "horizon_llm_cache_lookups_total", "LLM response cache lookups by policy and result (memory, redis, miss)."
+)
+LLM_CACHE_STORES = REGISTRY.counter(
+    "horizon_llm_cache_stores_total", "LLM responses written to the cache by policy."
+)
+
+REDIS_KEY_PREFIX = "horizon:llmcache:"
+REDIS_RETRY_SECONDS = 30.0
+
+
+def _parse_ttls(raw: str) -> Dict[str, int]:
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        log.warning("LLM_CACHE_TTLS is not valid JSON; LLM response cache disabled")
+        return {}
+    return {str(k): int(v) for k, v in data.items() if v}
+
+
+def _canonical_message(m: BaseMessage) -> Dict[str, Any]:
+    item: Dict[str, Any] = {"type": m.type, "content": m.content}
+    tool_calls = getattr(m, "tool_calls", None)
+    if tool_calls:
+        item["tool_calls"] = [{"name": c.get("name"), "args": c.get("args")} for c in tool_calls]
+    if getattr(m, "tool_call_id", None):
+        item["tool_call_id"] = m.tool_call_id
+    return item
+
+
+def cache_key(messages: List[BaseMessage], provider: str, model: Optional[str], params: Dict[str, Any]) -> str:
+    payload = {
+        "provider": provider,
+        "model": model,
+        "params": params,
+        "messages": [_canonical_message(m) for m in messages],
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _dump(message: AIMessage) -> str:
+    return json.dumps(
+        {
+            "content": message.content,
+            "additional_kwargs": message.additional_kwargs,
+            "response_metadata": message.response_metadata,
+            "tool_calls": message.tool_calls,
+            "usage_metadata": message.usage_metadata,
+        },
+        default=str,
+    )
+
+
+def _load(raw: str) -> AIMessage:
+    data = json.loads(raw)
+    if not data.get("usage_metadata"):
+        data.pop("usage_metadata", None)
+    return AIMessage(**data)
+
+
+class LLMResponseCache:
+    def __init__(self, max_entries: int, ttls: Dict[str, int], deterministic_ttl: int = 0):
+        self.max_entries = max_entries
+        self.ttls = ttls
+        self.deterministic_ttl = deterministic_ttl
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_down_until = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "LLMResponseCache":
+        return cls(
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+            ttls=_parse_ttls(settings.LLM_CACHE_TTLS),
+            deterministic_ttl=settings.LLM_CACHE_DETERMINISTIC_TTL,
+        )
+
+    # ---------- policy ----------
+
+    def policy_for(self, config: Optional[dict], temperature: Optional[float]) -> Tuple[Optional[str], int]:
+        """(policy name, ttl seconds); ttl 0 means do not cache."""
+        if not settings.LLM_CACHE_ENABLED:
+            return None, 0
+        metadata = (config or {}).get("metadata") or {}
+        policy = metadata.get("llm_cache_policy") or metadata.get("langgraph_node")
+        ttl = self.ttls.get(policy, 0) if policy else 0
+        if not ttl and self.deterministic_ttl and temperature == 0:
+            return policy or "deterministic", self.deterministic_ttl
+        return policy, ttl
+
+    # ---------- memory tier ----------
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, raw = entry
+            if expires_at < time.time():
+                self._memory.pop(key, None)
+                return None
+            self._memory.move_to_end(key)
+            return raw
+
+    def _memory_set(self, key: str, raw: str, ttl: int) -> None:
+        with self._lock:
+            self._memory[key] = (time.time() + ttl, raw)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # ---------- redis tier ----------
+
+    def _redis_client(self):
+        if not settings.LLM_CACHE_REDIS_ENABLED or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(settings.REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self._redis
+
+    def _redis_failed(self, e: Exception) -> None:
+        log.warning(f"LLM cache: Redis unavailable, using memory tier only for {REDIS_RETRY_SECONDS:.0f}s: {e}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    # ---------- public API ----------
+
+    def get(self, key: str, policy: str) -> Optional[AIMessage]:
+        """Memory tier only (sync callers)."""
+        raw = self._memory_get(key)
+        if raw is None:
+            return None
+        LLM_CACHE_LOOKUPS.inc(policy=policy, result="memory")
+        return _load(raw)
+
+    async def aget(self, key: str, policy: str, ttl: int) -> Optional[AIMessage]:
+        raw = self._memory_get(key)
+        if raw is not None:
+            LLM_CACHE_LOOKUPS.inc(policy=policy, result="memory")
+            return _load(raw)
+        client = self._redis_client()
+        if client is not None:
+            try:
+                raw = await client.get(REDIS_KEY_PREFIX + key)
+            except Exception as e:
+                self._redis_failed(e)
+                raw = None
+            if raw is not None:
+                raw = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+                self._memory_set(key, raw, ttl)
+                LLM_CACHE_LOOKUPS.inc(policy=policy, result="redis")
+                return _load(raw)
+        LLM_CACHE_LOOKUPS.inc(policy=policy, result="miss")
+        return None
+
+    def set(self, key: str, message: Any, policy: str, ttl: int) -> Optional[str]:
+        if not isinstance(message, AIMessage) or not (message.content or message.tool_calls):
+            return None
+        raw = _dump(message)
+        self._memory_set(key, raw, ttl)
+        LLM_CACHE_STORES.inc(policy=policy)
+        return raw
+
+    async def aset(self, key: str, message: Any, policy: str, ttl: int) -> None:
+        raw = self.set(key, message, policy, ttl)
+        client = self._redis_client() if raw is not None else None
+        if client is None:
+            return
+        try:
+            await client.set(REDIS_KEY_PREFIX + key, raw, ex=ttl)
+        except Exception as e:
+            self._redis_failed(e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.LLM_CACHE_ENABLED,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttls": self.ttls,
+            "deterministic_ttl": self.deterministic_ttl,
+            "redis": settings.LLM_CACHE_REDIS_ENABLED and time.monotonic() >= self._redis_down_until,
+        }
+
+
+response_cache = LLMResponseCache.from_settings()
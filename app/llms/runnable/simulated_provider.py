@@ -0,0 +1,348 @@
+"""
+Simulated LLM provider for load and soak tests (no network).
+
+Selected with the "simulated" / "mock" provider key. Every call is answered
+locally after a sampled delay, so the FastAPI app, the graphs and the
+memory layer can be driven at high request rates while the provider side
+stays cheap and predictable.
+
+Replies:
+
+- structured calls (the "structured_output" run metadata set by
+  `structured_chain`, or format instructions in the messages) get a JSON
+  instance of the requested schema, synthesized from the JSON schema
+  itself (defaults, first enum value, one item per required list), so it
+  validates against IntentResult, SchemaArgsModel, WorkRequestModel,
+  ProjectSummaryModel, MaterialExtractionResult, ProjectIntentLLM, ...;
+- plain-text calls get the text fixture of the current graph node, or a
+  filler answer of SIMULATED_LLM_OUTPUT_TOKENS words.
+
+SIMULATED_LLM_FIXTURES (a JSON file path or inline JSON) overrides replies,
+keyed by schema name (partial objects are merged over the synthesized one)
+or by graph node name (text). A list value picks one entry at random per
+call, e.g. to spread load over graph routes:
+
+    {"IntentResult": [{"intent": "app_info"}, {"intent": "text_to_sql"}],
+     "humanize": "Here is your answer."}
+
+Timing: time to first token is lognormal around SIMULATED_LLM_LATENCY_MS
+(shape SIMULATED_LLM_LATENCY_SIGMA, 0 = constant), then
+SIMULATED_LLM_TOKEN_MS per output token; streaming yields the tokens with
+that pacing. SIMULATED_LLM_ERROR_RATE of the calls fail with LLMError after
+the first-token delay. Admission control still applies; raise the
+"simulated" entry of ADMISSION_LIMITS (or disable admission) when the
+provider limits themselves are not what is being measured.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.core.config import settings
+from app.telemetry.callbacks import LLMMetricsCallback
+from .base import BaseLLM, LLMError
+from .structured import schema_by_name
+import logging
+
+log = logging.getLogger("app.models.llm.simulated")
+
+# Text replies the graph parses as JSON; everything else gets filler text.
+DEFAULT_TEXT_FIXTURES: Dict[str, Any] = {
+    "sqlgen": '{"sql": "SELECT 1"}',
+    "work_request_generation": '{"site_name": null}',
+}
+
+_SCHEMA_RE = re.compile(r"Here is the output schema:\s*```\s*(\{.*?\})\s*```", re.S)
+_TOKEN_RE = re.compile(r"\S+\s*")
+_FILLER = "This is a simulated answer used for load testing the Horizon assistant pipeline".split()
+
+
+# ---------- schema instances ----------
+
+
+@lru_cache(maxsize=1)
+def _schema_defaults() -> Dict[str, Dict[str, Any]]:
+    """Field values for models whose validators go beyond their JSON schema."""
+    from app.models.parsers.work_request_models import DISCIPLINE_ENUMS, PROJECT_CHECKLIST_ENUMS
+
+    return {
+        "WorkRequestModel": {
+            "discipline_name": DISCIPLINE_ENUMS[0]["name"],
+            "discipline_id": DISCIPLINE_ENUMS[0]["id"],
+            "project_checklists": [
+                {"id": e["id"], "label": e["name"], "is_applicable": True} for e in PROJECT_CHECKLIST_ENUMS
+            ],
+        },
+    }
+
+
+def _resolve(node: Dict[str, Any], root: Dict[str, Any]) -> Dict[str, Any]:
+    ref = node.get("$ref")
+    if not isinstance(ref, str) or not ref.startswith("#/"):
+        return node
+    target: Any = root
+    for part in ref[2:].split("/"):
+        target = target.get(part, {})
+    return {**target, **{k: v for k, v in node.items() if k != "$ref"}}
+
+
+def schema_instance(node: Dict[str, Any], root: Optional[Dict[str, Any]] = None, name: str = "value") -> Any:
+    """A minimal value that validates against JSON schema `node`."""
+    root = root if root is not None else node
+    node = _resolve(node, root)
+    if "default" in node:
+        return node["default"]
+    if "const" in node:
+        return node["const"]
+    if node.get("enum"):
+        return node["enum"][0]
+    for key in ("anyOf", "oneOf"):
+        if node.get(key):
+            options = [o for o in node[key] if _resolve(o, root).get("type") != "null"] or node[key]
+            return schema_instance(options[0], root, name)
+    if node.get("allOf"):
+        return schema_instance(node["allOf"][0], root, name)
+
+    kind = node.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object" or "properties" in node:
+        required = set(node.get("required") or [])
+        obj = {}
+        for prop, sub in (node.get("properties") or {}).items():
+            # Optional lists (default_factory=list has no schema default) stay empty
+            optional_list = prop not in required and _resolve(sub, root).get("type") == "array"
+            obj[prop] = [] if optional_list else schema_instance(sub, root, prop)
+        return obj
+    if kind == "array":
+        count = max(1, int(node.get("minItems") or 1))
+        return [schema_instance(node.get("items") or {}, root, name) for _ in range(count)]
+    if kind == "integer":
+        return int(node.get("minimum") or 1)
+    if kind == "number":
+        return float(node.get("minimum") or 1.0)
+    if kind == "boolean":
+        return False
+    if kind == "null":
+        return None
+    fmt = node.get("format")
+    if fmt == "date":
+        return date.today().isoformat()
+    if fmt == "date-time":
+        return datetime.now(timezone.utc).isoformat()
+    text = f"simulated {name.replace('_', ' ')}"
+    return text[: node["maxLength"]] if node.get("maxLength") else text
+
+
+# ---------- chat model ----------
+
+
+class SimulatedChatModel(BaseChatModel):
+    """Chat model that fabricates schema-valid replies after a simulated delay."""
+
+    latency_ms: float = 800.0
+    latency_sigma: float = 0.5
+    token_ms: float = 5.0
+    error_rate: float = 0.0
+    output_tokens: int = 120
+    fixtures: Dict[str, Any] = {}
+    rng: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulated"
+
+    # ----- reply -----
+
+    def _pick(self, value: Any) -> Any:
+        return self.rng.choice(value) if isinstance(value, list) and value else value
+
+    def _reply(self, messages: List[BaseMessage], run_manager) -> str:
+        metadata = getattr(run_manager, "metadata", None) or {}
+        schema, schema_name = self._requested_schema(messages, metadata.get("structured_output"))
+        if schema is not None:
+            obj = schema_instance(schema)
+            if schema_name and isinstance(obj, dict):
+                obj.update(_schema_defaults().get(schema_name, {}))
+                override = self._pick(self.fixtures.get(schema_name))
+                if isinstance(override, dict):
+                    obj.update(override)
+            return json.dumps(obj, ensure_ascii=False)
+
+        node = metadata.get("langgraph_node")
+        text = self._pick(self.fixtures.get(node or "", self.fixtures.get("default")))
+        if text is not None:
+            return text if isinstance(text, str) else json.dumps(text, ensure_ascii=False)
+        words = [_FILLER[i % len(_FILLER)] for i in range(max(1, self.output_tokens))]
+        return " ".join(words) + "."
+
+    @staticmethod
+    def _requested_schema(messages: List[BaseMessage], name: Optional[str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """JSON schema (and model name) the caller will parse the reply with, if any."""
+        model = schema_by_name(name)
+        if model is not None:
+            return model.model_json_schema(), name
+        # Ad-hoc PydanticOutputParser chains: read the schema off the format instructions
+        for message in reversed(messages):
+            content = message.content if isinstance(message.content, str) else ""
+            match = _SCHEMA_RE.search(content)
+            if match is None:
+                continue
+            try:
+                schema = json.loads(match.group(1))
+            except ValueError:
+                continue
+            return schema, None
+        return None, None
+
+    # ----- timing -----
+
+    def _first_token_delay(self) -> float:
+        base = max(0.0, self.latency_ms) / 1000.0
+        if self.latency_sigma <= 0:
+            return base
+        return base * math.exp(self.rng.gauss(0.0, self.latency_sigma))
+
+    def _fails(self) -> bool:
+        return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+    @staticmethod
+    def _usage(messages: List[BaseMessage], text: str) -> Dict[str, int]:
+        prompt_chars = sum(len(m.content) if isinstance(m.content, str) else 0 for m in messages)
+        input_tokens, output_tokens = prompt_chars // 4 + 1, len(text) // 4 + 1
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _result(self, messages: List[BaseMessage], text: str) -> ChatResult:
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    # ----- BaseChatModel -----
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self._first_token_delay())
+        if self._fails():
+            raise LLMError("Simulated provider error")
+        text = self._reply(messages, run_manager)
+        time.sleep(len(_TOKEN_RE.findall(text)) * self.token_ms / 1000.0)
+        return self._result(messages, text)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self._first_token_delay())
+        if self._fails():
+            raise LLMError("Simulated provider error")
+        text = self._reply(messages, run_manager)
+        await asyncio.sleep(len(_TOKEN_RE.findall(text)) * self.token_ms / 1000.0)
+        return self._result(messages, text)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._first_token_delay())
+        if self._fails():
+            raise LLMError("Simulated provider error")
+        for token in _TOKEN_RE.findall(self._reply(messages, run_manager)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            time.sleep(self.token_ms / 1000.0)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._first_token_delay())
+        if self._fails():
+            raise LLMError("Simulated provider error")
+        for token in _TOKEN_RE.findall(self._reply(messages, run_manager)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(self.token_ms / 1000.0)
+
+
+def load_fixtures(source: str) -> Dict[str, Any]:
+    """SIMULATED_LLM_FIXTURES: a JSON file path or an inline JSON object."""
+    fixtures: Dict[str, Any] = dict(DEFAULT_TEXT_FIXTURES)
+    source = (source or "").strip()
+    if not source:
+        return fixtures
+    try:
+        if source.startswith("{"):
+            fixtures.update(json.loads(source))
+        else:
+            with open(os.path.expanduser(source), "r", encoding="utf-8") as fh:
+                fixtures.update(json.load(fh))
+    except (OSError, ValueError) as e:
+        log.warning(f"Simulated provider: ignoring fixtures {source!r}: {e}")
+    return fixtures
+
+
+class SimulatedProvider(BaseLLM):
+    """
+    Provider answering locally with fabricated, schema-valid replies.
+    Selected with the "simulated" or "mock" provider key.
+    """
+
+    def __init__(
+        self,
+        model_id: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        mid = model_id or "simulated"
+        self.provider_name = "simulated"
+        self.model_id = mid
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.chat_model = SimulatedChatModel(
+            latency_ms=settings.SIMULATED_LLM_LATENCY_MS,
+            latency_sigma=settings.SIMULATED_LLM_LATENCY_SIGMA,
+            token_ms=settings.SIMULATED_LLM_TOKEN_MS,
+            error_rate=settings.SIMULATED_LLM_ERROR_RATE,
+            output_tokens=settings.SIMULATED_LLM_OUTPUT_TOKENS,
+            fixtures=load_fixtures(settings.SIMULATED_LLM_FIXTURES),
+            rng=random.Random(settings.SIMULATED_LLM_SEED or None),
+            callbacks=[LLMMetricsCallback("simulated", mid)],
+        )
+
+    async def chat(self, messages, tools: Sequence[Any] | None = None):
+        return await self.chat_model.ainvoke(messages)
+
+    async def complete(self, prompt: str) -> str:
+        resp = await self.chat_model.ainvoke([{"role": "user", "content": prompt}])
+        return resp.content or ""
@@ -0,0 +1,327 @@
+"""
+Structured (Pydantic) output for LLM chains.
+
+Two modes, selectable per node:
+
+- "prompt": the classic approach, PydanticOutputParser format instructions
+  (a full JSON schema plus boilerplate) are injected into the prompt and
+  the reply text is parsed;
+- "native": the provider's own structured-output mechanism is used
+  (OpenAI `response_format` JSON schema, tool calling for DigitalOcean and
+  Bedrock), so the prompt only carries a one-line note instead of the
+  schema.
+
+Both modes parse with `TolerantOutputParser`, which accepts tool-call
+arguments, fenced JSON, JSON surrounded by prose and trailing commas before
+validating against the schema. A native call that fails to parse, or that
+the backend rejects, is retried once in prompt mode; a rejected provider /
+model is remembered and goes straight to prompt mode afterwards.
+
+Usage in a node:
+
+    chain = structured_chain(prompt, llm, WorkRequestModel, node="work_request")
+    obj = await chain.ainvoke(inputs)   # without "format_instructions"
+
+The mode comes from STRUCTURED_OUTPUT_NODE_MODES[node], falling back to
+STRUCTURED_OUTPUT_MODE. See app/bench/structured_output_bench.py for a
+prompt-token / latency / parse-failure comparison of the two modes.
+"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import BaseOutputParser, PydanticOutputParser
+from langchain_core.outputs import ChatGeneration, Generation
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableBinding, RunnableLambda
+from pydantic import BaseModel, ValidationError
+
+from app.core.config import settings
+from app.telemetry.metrics import REGISTRY
+from .base import BaseLLM
+import logging
+
+log = logging.getLogger("app.models.llm.structured")
+
+STRUCTURED_OUTPUT_CALLS = REGISTRY.counter(
+    "horizon_structured_output_total", "Structured-output parses by node, mode and result (ok, parse_error, fallback)."
+)
+
+MODES = ("native", "prompt")
+
+# Provider-level structured-output method used in native mode; providers
+# not listed (e.g. cassette replay) always use prompt mode.
+NATIVE_METHODS = {
+    "openai": "json_schema",
+    "do_serverless": "function_calling",
+    "bedrock": "function_calling",
+}
+
+NATIVE_FORMAT_NOTE = "Return the result through the provided structured output format; no prose."
+
+# Schemas requested through build_structured, by name; the chat model run
+# carries the name as "structured_output" metadata (tracing, simulation).
+_schemas: Dict[str, Type[BaseModel]] = {}
+_native_kwargs_cache: Dict[Tuple[str, Optional[str], str, str], Dict[str, Any]] = {}
+_native_unsupported: set = set()
+_lock = threading.Lock()
+
+
+# ---------- tolerant parsing ----------
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.I)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def _balanced_json(text: str) -> Optional[str]:
+    """First balanced {...} / [...] block in `text`, ignoring brackets inside strings."""
+    start = next((i for i, ch in enumerate(text) if ch in "{["), None)
+    if start is None:
+        return None
+    stack: List[str] = []
+    in_string = escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if not stack or stack.pop() != ch:
+                return None
+            if not stack:
+                return text[start : i + 1]
+    return None
+
+
+def parse_json_tolerant(text: str) -> Any:
+    """Best-effort JSON extraction from an LLM reply; raises ValueError."""
+    text = _FENCE_RE.sub("", (text or "").strip())
+    candidates = [text]
+    block = _balanced_json(text)
+    if block and block != text:
+        candidates.append(block)
+    for candidate in candidates:
+        for attempt in (candidate, _TRAILING_COMMA_RE.sub(r"\1", candidate)):
+            try:
+                return json.loads(attempt)
+            except ValueError:
+                continue
+    raise ValueError("no JSON object found in model output")
+
+
+def _unwrap(data: Any, schema: Type[BaseModel]) -> Any:
+    """Undo common wrappers: {"SchemaName": {...}} and echoed {"properties": {...}}."""
+    if not isinstance(data, dict) or len(data) != 1:
+        return data
+    (key, value), = data.items()
+    if isinstance(value, dict) and key in {schema.__name__, "properties", "result", "output"} and key not in schema.model_fields:
+        return value
+    return data
+
+
+class TolerantOutputParser(BaseOutputParser):
+    """Parse tool-call args or (messy) JSON text into `pydantic_object`."""
+
+    pydantic_object: Type[BaseModel]
+    node: str = "unknown"
+    mode: str = "prompt"
+
+    @property
+    def _type(self) -> str:
+        return "tolerant_pydantic"
+
+    def parse_result(self, result: List[Generation], *, partial: bool = False) -> Any:
+        generation = result[0]
+        tool_calls = getattr(generation.message, "tool_calls", None) if isinstance(generation, ChatGeneration) else None
+        if tool_calls:
+            return self._validate(tool_calls[0].get("args") or {}, json.dumps(tool_calls[0].get("args")))
+        return self.parse(generation.text)
+
+    def parse(self, text: str) -> Any:
+        try:
+            data = parse_json_tolerant(text)
+        except ValueError as e:
+            STRUCTURED_OUTPUT_CALLS.inc(node=self.node, mode=self.mode, result="parse_error")
+            raise OutputParserException(f"{self.node}: {e}", llm_output=text) from e
+        return self._validate(data, text)
+
+    def _validate(self, data: Any, raw: str) -> Any:
+        try:
+            obj = self.pydantic_object.model_validate(_unwrap(data, self.pydantic_object))
+        except ValidationError as e:
+            STRUCTURED_OUTPUT_CALLS.inc(node=self.node, mode=self.mode, result="parse_error")
+            raise OutputParserException(f"{self.node}: output does not match {self.pydantic_object.__name__}: {e}", llm_output=raw) from e
+        STRUCTURED_OUTPUT_CALLS.inc(node=self.node, mode=self.mode, result="ok")
+        return obj
+
+
+# ---------- native mode ----------
+
+
+def _base_llm(llm: Runnable) -> Optional[BaseLLM]:
+    while isinstance(llm, RunnableBinding):
+        llm = llm.bound
+    return llm if isinstance(llm, BaseLLM) else None
+
+
+def native_kwargs(llm: Runnable, schema: Type[BaseModel]) -> Optional[Dict[str, Any]]:
+    """
+    Call kwargs that make the provider return `schema`-shaped output, taken
+    from the chat model's own `with_structured_output` binding; None when
+    the provider has no native mode.
+    """
+    base = _base_llm(llm)
+    method = NATIVE_METHODS.get(base.provider_name) if base is not None else None
+    if method is None:
+        return None
+    key = (base.provider_name, base.model_id, schema.__name__, method)
+    if key in _native_unsupported:
+        return None
+    cached = _native_kwargs_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        # JSON schema dict rather than the class: keeps OpenAI off the strict
+        # `beta.parse` path, which rejects optional fields with defaults.
+        structured = base.chat_model.with_structured_output(schema.model_json_schema(), method=method)
+    except (NotImplementedError, ValueError) as e:
+        log.info(f"No native structured output for {base.provider_name}:{base.model_id}: {e}")
+        return None
+    steps = getattr(structured, "steps", [structured])
+    binding = next((s for s in steps if isinstance(s, RunnableBinding)), None)
+    if binding is None:
+        return None
+    kwargs = dict(binding.kwargs)
+    with _lock:
+        _native_kwargs_cache[key] = kwargs
+    return kwargs
+
+
+def _request_errors() -> Tuple[Type[BaseException], ...]:
+    """Provider errors meaning 'this backend does not accept the structured-output request'."""
+    errors: List[Type[BaseException]] = []
+    try:
+        from openai import BadRequestError, UnprocessableEntityError
+
+        errors += [BadRequestError, UnprocessableEntityError]
+    except ImportError:
+        pass
+    try:
+        from botocore.exceptions import ClientError
+
+        errors.append(ClientError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+# ---------- chains ----------
+
+
+def schema_by_name(name: Optional[str]) -> Optional[Type[BaseModel]]:
+    return _schemas.get(name) if name else None
+
+
+def structured_mode(node: str) -> str:
+    try:
+        overrides = json.loads(settings.STRUCTURED_OUTPUT_NODE_MODES or "{}")
+    except ValueError:
+        overrides = {}
+    mode = overrides.get(node) or settings.STRUCTURED_OUTPUT_MODE
+    return mode if mode in MODES else "prompt"
+
+
+def format_instructions(schema: Type[BaseModel]) -> str:
+    """
+    Format instructions prompt mode injects for `schema`. Also the size to
+    budget for in native mode: the provider receives the same JSON schema
+    as the tool / response format, and failures are retried in prompt mode.
+    """
+    return PydanticOutputParser(pydantic_object=schema).get_format_instructions()
+
+
+def _with_format(prompt: BasePromptTemplate, format_var: str, text: str) -> BasePromptTemplate:
+    return prompt.partial(**{format_var: text}) if format_var in prompt.input_variables else prompt
+
+
+def build_structured(
+    prompt: BasePromptTemplate,
+    llm: Runnable,
+    schema: Type[BaseModel],
+    node: str,
+    mode: str,
+    format_var: str = "format_instructions",
+) -> Optional[Tuple[BasePromptTemplate, Runnable, TolerantOutputParser]]:
+    """(prompt, llm, parser) for one mode; None if native mode is unavailable."""
+    parser = TolerantOutputParser(pydantic_object=schema, node=node, mode=mode)
+    _schemas.setdefault(schema.__name__, schema)
+    llm = llm.with_config(metadata={"structured_output": schema.__name__})
+    if mode == "prompt":
+        return _with_format(prompt, format_var, format_instructions(schema)), llm, parser
+    kwargs = native_kwargs(llm, schema)
+    if kwargs is None:
+        return None
+    return _with_format(prompt, format_var, NATIVE_FORMAT_NOTE), llm.bind(**kwargs), parser
+
+
+def structured_chain(
+    prompt: BasePromptTemplate,
+    llm: Runnable,
+    schema: Type[BaseModel],
+    node: str,
+    format_var: str = "format_instructions",
+    mode: Optional[str] = None,
+) -> Runnable:
+    """
+    prompt -> llm -> `schema` instance, in the node's configured mode. The
+    prompt's `format_var` placeholder (if any) is filled in here; callers
+    no longer pass format instructions.
+    """
+    p_prompt, p_llm, p_parser = build_structured(prompt, llm, schema, node, "prompt", format_var)
+    prompt_chain = p_prompt | p_llm | p_parser
+    native = build_structured(prompt, llm, schema, node, "native", format_var) if (mode or structured_mode(node)) == "native" else None
+    if native is None:
+        return prompt_chain
+    n_prompt, n_llm, n_parser = native
+    native_chain = n_prompt | n_llm | n_parser
+    base = _base_llm(llm)
+    unsupported_key = (base.provider_name, base.model_id, schema.__name__, NATIVE_METHODS.get(base.provider_name))
+    request_errors = _request_errors()
+
+    def _on_error(e: Exception) -> None:
+        STRUCTURED_OUTPUT_CALLS.inc(node=node, mode="native", result="fallback")
+        if isinstance(e, request_errors):
+            log.warning(f"{node}: native structured output rejected by {base.provider_name}:{base.model_id}, using prompt mode: {e}")
+            with _lock:
+                _native_unsupported.add(unsupported_key)
+        else:
+            log.warning(f"{node}: native structured output unparseable, retrying in prompt mode: {e}")
+
+    def _run(inputs: Dict[str, Any], config=None) -> Any:
+        if unsupported_key not in _native_unsupported:
+            try:
+                return native_chain.invoke(inputs, config)
+            except (OutputParserException, *request_errors) as e:
+                _on_error(e)
+        return prompt_chain.invoke(inputs, config)
+
+    async def _arun(inputs: Dict[str, Any], config=None) -> Any:
+        if unsupported_key not in _native_unsupported:
+            try:
+                return await native_chain.ainvoke(inputs, config)
+            except (OutputParserException, *request_errors) as e:
+                _on_error(e)
+        return await prompt_chain.ainvoke(inputs, config)
+
+    return RunnableLambda(_run, afunc=_arun, name=f"structured_{node}")
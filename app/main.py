@@ -5,10 +5,21 @@ from app.db.base import Base  # noqa: F401 - ensures models are registered
 # from app.db.session import engine
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.core.config import settings
-from app.core.errors import unhandled_exception_handler
+from app.core.errors import admission_rejected_handler, unhandled_exception_handler
+from app.core.loop_monitor import loop_monitor
+from app.db.replica import replica
+from app.llms.runnable.admission import AdmissionRejected
+from app.llms.runnable.prompt_budget import count_tokens
+from app.llms.runnable.provider_pool import aclose_clients
 from app.mcp.server import start_mcp_server_if_needed
+from app.graphs.registry import graph_registry
+from app.services.intent_classifier import intent_classifier
+from app.services.schema_cache import schema_cache
+from app.services.sql_example_store import sql_examples
+from app.telemetry.metrics import CONTENT_TYPE_LATEST, render_latest
 from app.core.logging import setup_logging
 from app.api.routers.horizon_routes import router as horizon_router
 from app.api.routers.preprocess_router import router as preprocess_router
@@ -17,6 +28,7 @@ from app.api.routers.capital_plan_routes import router as capital_router
 
 import os
 import asyncio
+import logging
 import uvicorn
 
 # --- Logging / env cleanup ---
@@ -40,11 +52,39 @@ app.add_middleware(
 )
 
 app.add_exception_handler(Exception, unhandled_exception_handler)
+app.add_exception_handler(AdmissionRejected, admission_rejected_handler)
 
 
 @app.on_event("startup")
 async def on_startup():
     start_mcp_server_if_needed()
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    graph_registry.warmup(settings.graph_warmup_list)
+    # First use downloads the tokenizer BPE file; keep that off the request path.
+    asyncio.get_running_loop().run_in_executor(None, count_tokens, "warmup")
+    if settings.SCHEMA_CACHE_ENABLED and settings.SCHEMA_CACHE_WARMUP:
+        schema_cache.start_warmup()
+    if settings.SQL_EXAMPLES_ENABLED:
+        # Reads (or re-embeds) the example store before the first SQL question
+        asyncio.get_running_loop().run_in_executor(None, sql_examples.load)
+    if settings.INTENT_FAST_PATH_ENABLED and settings.INTENT_CENTROID_ENABLED:
+        # Embedding the Mongo history takes a while; don't hold up startup.
+        asyncio.get_running_loop().run_in_executor(None, _train_intent_centroids)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await loop_monitor.stop()
+    await aclose_clients()
+    await replica.dispose()
+
+
+def _train_intent_centroids():
+    try:
+        intent_classifier.train_from_mongo()
+    except Exception as e:
+        logging.getLogger("app.main").warning("Intent centroid training skipped: %s", e)
 
 
 # Health endpoint for RunPod (will be used on PORT_HEALTH)
@@ -53,6 +93,12 @@ async def ping():
     return {"status": "ok"}
 
 
+# Prometheus scrape endpoint
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 # Routers
 app.include_router(horizon_router)
 app.include_router(preprocess_router)
@@ -1,3 +1,5 @@
+import asyncio
+
 from app.memory.mongo_memory import MongoChatMemory
 from app.memory.redis_memory import RedisChatMemory
 import logging
@@ -80,3 +82,15 @@ class MemoryManager:
             return self.mongo.load_history(chat_id, limit=0, include_payload=True)
         except Exception:
             return []
+
+    # pymongo / redis-py are blocking clients; async callers go through a
+    # worker thread so a slow Mongo or Redis never stalls the event loop.
+
+    async def asave(self, chat_id, role, content, payload=None):
+        return await asyncio.to_thread(self.save, chat_id, role, content, payload)
+
+    async def aload_context_messages(self, chat_id, limit=20) -> list[BaseMessage]:
+        return await asyncio.to_thread(self.load_context_messages, chat_id, limit)
+
+    async def aload_full(self, chat_id):
+        return await asyncio.to_thread(self.load_full, chat_id)
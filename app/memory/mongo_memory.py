@@ -81,6 +81,29 @@ class MongoChatMemory:
             slim.append({"role": role, "content": content})
         return slim
 
+    def iter_labelled_turns(self, max_chats: int = 2000):
+        """
+        Yield (user_text, intent) pairs: each user message paired with the
+        intent recorded in the payload of the assistant reply that follows it.
+        Used to train the local intent classifier.
+        """
+        if not self.enabled or self.collection is None:
+            return
+        cursor = self.collection.find(
+            {"tool": self.tool_name}, {"messages.role": 1, "messages.content": 1, "messages.payload.intent": 1}
+        ).sort("_id", -1).limit(max_chats)
+        for doc in cursor:
+            pending_user = None
+            for m in doc.get("messages", []):
+                role = m.get("role")
+                if role == "user":
+                    pending_user = m.get("content")
+                elif role == "assistant" and pending_user:
+                    intent = (m.get("payload") or {}).get("intent")
+                    if intent:
+                        yield pending_user, intent
+                    pending_user = None
+
     def delete_chat(self, chat_id: str):
         if not self.enabled or self.collection is None:
             return
@@ -1,7 +1,21 @@
+from functools import lru_cache
 from typing import List
 
+from app.core.config import settings
+
 
 class MockEmbedder:
     def embed_query(self, text: str) -> List[float]:
     # Deterministic toy embedding for mocks
-     return [float((sum(map(ord, text)) % 97) / 97.0)] * 8   
\ No newline at end of file
+     return [float((sum(map(ord, text)) % 97) / 97.0)] * 8
+
+
+@lru_cache(maxsize=4)
+def get_embeddings(model_name: str | None = None):
+    """
+    Process-wide HuggingFace embedding model (loaded once; loading
+    sentence-transformers weights per request costs seconds).
+    """
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=model_name or settings.HG_EMBEDDING_MODEL)
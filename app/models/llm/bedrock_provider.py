@@ -1,22 +1,17 @@
-import boto3
 import json
 import logging
 import asyncio
 from functools import partial
 from app.core.config import settings
 from .base import BaseLLM, LLMError
+from app.llms.runnable.provider_pool import get_bedrock_client
 
 log = logging.getLogger("app.models.llm.bedrock")
 
 class BedrockProvider(BaseLLM):
     def __init__(self):
         try:
-            self.client = boto3.client(
-                service_name="bedrock-runtime",
-                region_name=settings.BEDROCK_REGION,
-                aws_access_key_id=settings.BEDROCK_ACCESS_KEY,
-                aws_secret_access_key=settings.BEDROCK_SECRET_KEY,
-            )
+            self.client = get_bedrock_client(settings.BEDROCK_REGION)
             self.model_id = settings.BEDROCK_MODEL_ID
         except Exception as e:
             log.error(f"Failed to initialize Bedrock client: {e}")
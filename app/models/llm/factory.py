@@ -3,6 +3,7 @@ from .openai_provider import OpenAIProvider
 from .base import BaseLLM
 
 from .bedrock_provider import BedrockProvider
+from app.llms.runnable.provider_pool import provider_pool
 import logging
 log = logging.getLogger("app.models.llm.factory")
 
@@ -13,10 +14,11 @@ def get_llm(llm_name: str | None = None) -> BaseLLM:
     log.info(f"llm_name from param----{llm_name}")
     
     if llm_name:
+        # Pooled: these providers only wrap shared clients
         if llm_name.lower() == "meta":
-            return BedrockProvider()
+            return provider_pool.get((__name__, "meta"), BedrockProvider)
         elif llm_name.lower() == "openai":
-            return OpenAIProvider()
+            return provider_pool.get((__name__, "openai"), OpenAIProvider)
         else:
             raise ValueError(f"Unsupported LLM provider: {llm_name}")
 
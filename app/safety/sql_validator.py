@@ -1,32 +1,529 @@
-import re
-import sqlparse
+"""
+Pre-execution checks for LLM-generated SQL (sqlglot AST, MySQL dialect).
+
+sqlexec_node runs every query through `sql_guard.check(sql)` before it is
+sent to Laravel execute-sql:
+
+Always rejected (SqlRejected): anything that does not parse, more than one
+statement, statements other than SELECT / set operations, write or DDL
+nodes anywhere in the tree, locking reads, system schemas
+(information_schema, mysql, performance_schema, sys), functions such as
+SLEEP / BENCHMARK / LOAD_FILE, and a non-literal LIMIT.
+
+Always rewritten:
+- a missing LIMIT is added and a larger one clamped to MAX_LIMIT;
+- `SELECT *` / `alias.*` is expanded to the columns of the schema;
+- `YEAR(col) = 2024`, `YEAR(col) BETWEEN a AND b` and `DATE(col) = 'd'`
+  on large tables become range predicates on the bare column.
+
+Policy violations, rejected when SQL_GUARD_MODE="enforce" and only logged
+in "report" mode (the default, until the catalog is checked against the
+live schema):
+- columns missing from their table in the text-to-SQL schema (all
+  modules, via the schema cache over tool_get_schema). The catalog is
+  read heuristically from that payload, so tables it does not contain
+  are only warned about, never rejected. It is built in a worker thread
+  once per schema version;
+- cartesian joins: a join without ON / USING whose table is not linked to
+  another one by an equality in WHERE;
+- non-sargable predicates on SQL_GUARD_LARGE_TABLES: a column of such a
+  table wrapped in a function or arithmetic inside a comparison. LIKE
+  '%term%' stays allowed; the SQL prompt requires it for text filters.
+
+SQL that needs no rewrite is passed through unchanged (not re-rendered).
+"""
+
+import asyncio
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import sqlglot
+from pydantic import BaseModel
+from sqlglot import exp
+from sqlglot.errors import ParseError
+from sqlglot.optimizer.scope import Scope, traverse_scope
+
 from app.core.config import settings
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.safety.sql_validator")
+
+SQL_GUARD_RESULTS = REGISTRY.counter(
+    "horizon_sql_guard_total", "Pre-execution SQL checks by outcome (passed, rewritten, rejected, reported, warned) and reason kind."
+)
+
+SQL_GUARD_MODES = ("off", "report", "enforce")
+DIALECT = "mysql"
+
+SYSTEM_SCHEMAS = {"information_schema", "mysql", "performance_schema", "sys"}
+FORBIDDEN_FUNCTIONS = {
+    "SLEEP", "BENCHMARK", "LOAD_FILE", "GET_LOCK", "RELEASE_LOCK", "RELEASE_ALL_LOCKS", "IS_FREE_LOCK",
+    "IS_USED_LOCK", "MASTER_POS_WAIT", "SOURCE_POS_WAIT", "SYS_EXEC", "SYS_EVAL",
+}
+_WRITE_NODES = tuple(
+    getattr(exp, name)
+    for name in (
+        "Insert", "Update", "Delete", "Merge", "Drop", "Create", "Alter", "AlterTable", "TruncateTable",
+        "Command", "Grant", "Revoke", "Set", "Use", "Into", "Lock", "LoadData", "Copy", "Transaction",
+        "Commit", "Rollback", "Pragma", "Describe", "Show",
+    )
+    if hasattr(exp, name)
+)
+_COMPARISONS = (exp.EQ, exp.NEQ, exp.GT, exp.GTE, exp.LT, exp.LTE, exp.Between, exp.In, exp.Like)
+_DATE_WRAPPERS = tuple(getattr(exp, n) for n in ("TsOrDsToDate", "Date", "TimeToDate") if hasattr(exp, n))
+
+# table -> its columns in schema order
+Catalog = Dict[str, List[str]]
+
+
+class SqlRejected(ValueError):
+    """The query must not be sent to the reporting database."""
+
+    def __init__(self, reasons: Sequence[str]):
+        self.reasons = list(reasons)
+        super().__init__("; ".join(self.reasons))
+
+
+class ValidatedSql(BaseModel):
+    # None only when the guard is off and there was no SQL to check
+    sql: Optional[str]
+    rewrites: List[str] = []
+    # policy violations that were only reported (SQL_GUARD_MODE="report")
+    violations: List[str] = []
+    # findings never enforced: tables missing from the catalog, unexpandable stars
+    warnings: List[str] = []
+
+
+def _parse(sql: str) -> exp.Expression:
+    if not sql or not sql.strip():
+        raise SqlRejected(["empty SQL"])
+    try:
+        statements = [s for s in sqlglot.parse(sql, read=DIALECT) if s is not None]
+    except ParseError as e:
+        raise SqlRejected([f"unparseable SQL: {str(e).splitlines()[0]}"])
+    if len(statements) != 1:
+        raise SqlRejected([f"expected one statement, got {len(statements)}"])
+    root = statements[0]
+    if not isinstance(root, (exp.Select, exp.Union, exp.Intersect, exp.Except)):
+        raise SqlRejected([f"only SELECT statements are allowed, got {root.key.upper()}"])
+    return root
+
+
+def _safety_reasons(root: exp.Expression) -> List[str]:
+    reasons = []
+    for node in root.walk():
+        if isinstance(node, _WRITE_NODES):
+            reasons.append(f"{node.key.upper()} is not allowed")
+        elif isinstance(node, exp.Table) and (node.db or "").lower() in SYSTEM_SCHEMAS:
+            reasons.append(f"system schema {node.db} is not allowed")
+        elif isinstance(node, exp.Func) and _func_name(node) in FORBIDDEN_FUNCTIONS:
+            reasons.append(f"function {_func_name(node)} is not allowed")
+    return sorted(set(reasons))
+
+
+def _func_name(node: exp.Expression) -> str:
+    return (node.name if isinstance(node, exp.Anonymous) else node.key).upper()
+
+
+# ---------- LIMIT ----------
+
+
+def _clamp(root: exp.Expression, max_limit: int) -> Tuple[exp.Expression, Optional[str]]:
+    limit = root.args.get("limit")
+    if limit is None:
+        return root.limit(max_limit, copy=False), f"added LIMIT {max_limit}"
+    value = limit.expression if isinstance(limit, exp.Limit) else None
+    if not isinstance(value, exp.Literal) or value.is_string:
+        raise SqlRejected(["LIMIT must be a number"])
+    if int(value.this) > max_limit:
+        limit.set("expression", exp.Literal.number(max_limit))
+        return root, f"clamped LIMIT {value.this} to {max_limit}"
+    return root, None
+
+
+# ---------- scope helpers ----------
+
+
+def _table_name(table: exp.Table) -> str:
+    return table.name.lower()
+
+
+def _source_columns(source: Any, catalog: Optional[Catalog]) -> Optional[List[str]]:
+    """Output columns of a FROM source (None when unknown)."""
+    if isinstance(source, exp.Table):
+        if catalog is None:
+            return None
+        return catalog.get(_table_name(source))
+    if isinstance(source, Scope):
+        # Inner scopes come first in traverse_scope, so their stars are already expanded
+        selects = getattr(source.expression, "named_selects", None)
+        if not selects or "*" in selects:
+            return None
+        return list(selects)
+    return None
+
+
+def _resolve(scope: Scope, column: exp.Column, catalog: Optional[Catalog]) -> Optional[Tuple[str, Any]]:
+    """(alias, source) a column reads from, if it can be told; correlated columns resolve in outer scopes."""
+    while scope is not None:
+        if column.table:
+            source = scope.sources.get(column.table)
+            if source is not None:
+                return column.table, source
+        else:
+            owners = []
+            for alias, source in scope.sources.items():
+                columns = _source_columns(source, catalog)
+                if columns is not None and column.name.lower() in {c.lower() for c in columns}:
+                    owners.append((alias, source))
+            if len(owners) == 1:
+                return owners[0]
+            if len(owners) > 1:
+                return None
+            if len(scope.sources) == 1 and scope.parent is None:
+                return next(iter(scope.sources.items()))
+        scope = scope.parent
+    return None
+
+
+def _own_columns(scope: Scope) -> List[exp.Column]:
+    # Scope.columns of a query also lists the columns of its subqueries
+    return [c for c in scope.columns if c.find_ancestor(exp.Select, exp.Union) is scope.expression]
+
+
+def _large_table_column(scope: Scope, column: exp.Column, catalog: Optional[Catalog], large: set) -> Optional[str]:
+    resolved = _resolve(scope, column, catalog)
+    if resolved and isinstance(resolved[1], exp.Table) and _table_name(resolved[1]) in large:
+        return _table_name(resolved[1])
+    return None
+
+
+# ---------- SELECT * ----------
+
+
+def _expand_stars(scope: Scope, catalog: Optional[Catalog]) -> Tuple[List[str], List[str]]:
+    """Expand `*` / `alias.*` in a scope's SELECT list; (rewrites, warnings)."""
+    select = scope.expression
+    if not isinstance(select, exp.Select):
+        return [], []
+    rewrites: List[str] = []
+    warnings: List[str] = []
+    expanded: List[exp.Expression] = []
+    changed = False
+    for projection in select.expressions:
+        if isinstance(projection, exp.Star):
+            targets = [(alias, source) for alias, (_, source) in scope.selected_sources.items()]
+        elif isinstance(projection, exp.Column) and isinstance(projection.this, exp.Star):
+            source = scope.sources.get(projection.table)
+            targets = [(projection.table, source)] if source is not None else []
+        else:
+            expanded.append(projection)
+            continue
+        columns: List[exp.Expression] = []
+        for alias, source in targets:
+            names = _source_columns(source, catalog)
+            if not names:
+                warnings.append(f"cannot expand {projection.sql(dialect=DIALECT)}: columns of {alias} unknown")
+                columns = []
+                break
+            columns.extend(exp.column(name, table=alias) for name in names)
+        if not columns:
+            expanded.append(projection)
+            continue
+        expanded.extend(columns)
+        changed = True
+        rewrites.append(f"expanded {projection.sql(dialect=DIALECT)} to {len(columns)} columns")
+    if changed:
+        select.set("expressions", expanded)
+    return rewrites, warnings
+
+
+# ---------- schema ----------
+
+
+def _schema_violations(scope: Scope, catalog: Catalog) -> Tuple[List[str], List[str]]:
+    """
+    (violations, warnings). The catalog is read heuristically from the
+    schema payload, so a table missing from it is only a warning, and so
+    are columns that might belong to such a table; columns of tables the
+    catalog does know are checked strictly.
+    """
+    violations, warnings = [], []
+    missing = [
+        source.name
+        for source in scope.sources.values()
+        if isinstance(source, exp.Table) and _table_name(source) not in catalog
+    ]
+    warnings += [f"table {name} not in the schema catalog" for name in missing]
+    aliases = {name.lower() for name in getattr(scope.expression, "named_selects", [])}
+    for column in _own_columns(scope):
+        if isinstance(column.this, exp.Star):
+            continue
+        name = column.name.lower()
+        resolved = _resolve(scope, column, catalog)
+        if resolved is None:
+            if column.table:
+                violations.append(f"unknown table alias {column.table} for column {column.name}")
+            elif name not in aliases:
+                (warnings if missing else violations).append(f"unknown or ambiguous column {column.name}")
+            continue
+        columns = _source_columns(resolved[1], catalog)
+        if columns is not None and name not in {c.lower() for c in columns}:
+            owner = resolved[1].name if isinstance(resolved[1], exp.Table) else resolved[0]
+            violations.append(f"unknown column {owner}.{column.name}")
+    return violations, warnings
+
+
+# ---------- joins ----------
+
+
+def _linked_in_where(select: exp.Select, alias: str) -> bool:
+    where = select.args.get("where")
+    if where is None:
+        return False
+    for eq in where.find_all(exp.EQ):
+        left, right = eq.this, eq.expression
+        if isinstance(left, exp.Column) and isinstance(right, exp.Column) and left.table and right.table:
+            if left.table != right.table and alias in (left.table, right.table):
+                return True
+    return False
+
+
+def _cartesian_joins(scope: Scope) -> List[str]:
+    select = scope.expression
+    if not isinstance(select, exp.Select):
+        return []
+    violations = []
+    for join in select.args.get("joins") or []:
+        if join.args.get("on") is not None or join.args.get("using"):
+            continue
+        alias = join.this.alias_or_name
+        if not _linked_in_where(select, alias):
+            violations.append(f"cartesian join with {join.this.sql(dialect=DIALECT)} (no ON / USING / WHERE link)")
+    return violations
+
+
+# ---------- sargability ----------
+
+
+def _date_column(node: exp.Expression) -> Optional[exp.Column]:
+    while isinstance(node, _DATE_WRAPPERS):
+        node = node.this
+    return node if isinstance(node, exp.Column) else None
+
+
+def _range(column: exp.Column, start: datetime.date, end: datetime.date) -> exp.Expression:
+    return exp.Paren(
+        this=exp.and_(
+            exp.GTE(this=column.copy(), expression=exp.Literal.string(start.isoformat())),
+            exp.LT(this=column.copy(), expression=exp.Literal.string(end.isoformat())),
+        )
+    )
+
+
+def _sargable_rewrite(predicate: exp.Expression) -> Optional[exp.Expression]:
+    """Range form of YEAR(col) = n, YEAR(col) BETWEEN a AND b and DATE(col) = 'd'."""
+    try:
+        if isinstance(predicate, exp.EQ) and isinstance(predicate.this, exp.Year):
+            column, value = _date_column(predicate.this.this), predicate.expression
+            if column is not None and isinstance(value, exp.Literal):
+                year = int(value.this)
+                return _range(column, datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1))
+        if isinstance(predicate, exp.Between) and isinstance(predicate.this, exp.Year):
+            column = _date_column(predicate.this.this)
+            low, high = predicate.args.get("low"), predicate.args.get("high")
+            if column is not None and isinstance(low, exp.Literal) and isinstance(high, exp.Literal):
+                return _range(column, datetime.date(int(low.this), 1, 1), datetime.date(int(high.this) + 1, 1, 1))
+        if isinstance(predicate, exp.EQ) and isinstance(predicate.this, _DATE_WRAPPERS):
+            column, value = _date_column(predicate.this), predicate.expression
+            if column is not None and isinstance(value, exp.Literal) and value.is_string:
+                day = datetime.date.fromisoformat(value.this)
+                return _range(column, day, day + datetime.timedelta(days=1))
+    except ValueError:
+        return None
+    return None
+
+
+def _predicates(select: exp.Select) -> Iterable[exp.Expression]:
+    clauses = [select.args.get("where")] + [j.args.get("on") for j in select.args.get("joins") or []]
+    for clause in clauses:
+        if clause is None:
+            continue
+        for node in clause.find_all(*_COMPARISONS):
+            # Predicates of nested subqueries are checked in their own scope
+            if node.find_ancestor(exp.Select) is select:
+                yield node
+
+
+def _non_sargable(scope: Scope, catalog: Optional[Catalog], large: set) -> Tuple[List[str], List[str]]:
+    select = scope.expression
+    if not isinstance(select, exp.Select) or not large:
+        return [], []
+    rewrites, violations = [], []
+    for predicate in list(_predicates(select)):
+        sides = [predicate.this] if isinstance(predicate, (exp.In, exp.Between, exp.Like)) else [
+            predicate.this, predicate.expression
+        ]
+        for side in sides:
+            if side is None or isinstance(side, (exp.Column, exp.Literal, exp.Subquery, exp.Select, exp.Null)):
+                continue
+            tables = {
+                t for t in (_large_table_column(scope, c, catalog, large) for c in side.find_all(exp.Column)) if t
+            }
+            if not tables:
+                continue
+            replacement = _sargable_rewrite(predicate)
+            if replacement is not None:
+                before = predicate.sql(dialect=DIALECT)
+                predicate.replace(replacement)
+                rewrites.append(f"rewrote {before} as a range")
+                break
+            violations.append(
+                f"non-sargable predicate on large table {', '.join(sorted(tables))}: {predicate.sql(dialect=DIALECT)}"
+            )
+            break
+    return rewrites, violations
+
+
+# ---------- entry points ----------
+
+
+def validate_sql(
+    sql: str,
+    catalog: Optional[Catalog] = None,
+    max_limit: Optional[int] = None,
+    large_tables: Sequence[str] = (),
+    enforce: bool = True,
+) -> ValidatedSql:
+    """
+    Check and rewrite one query. Raises SqlRejected for safety failures,
+    and for policy violations when `enforce`. `catalog` (table -> columns)
+    enables schema checks and SELECT * expansion.
+    """
+    root = _parse(sql)
+    reasons = _safety_reasons(root)
+    if reasons:
+        raise SqlRejected(reasons)
+
+    large = {t.lower() for t in large_tables}
+    catalog = {t.lower(): list(c) for t, c in catalog.items()} if catalog else None
+    rewrites: List[str] = []
+    violations: List[str] = []
+    warnings: List[str] = []
+    for scope in traverse_scope(root):
+        r, w = _expand_stars(scope, catalog)
+        rewrites += r
+        warnings += w
+        if catalog:
+            v, w = _schema_violations(scope, catalog)
+            violations += v
+            warnings += w
+        violations += _cartesian_joins(scope)
+        r, v = _non_sargable(scope, catalog, large)
+        rewrites += r
+        violations += v
+
+    root, clamped = _clamp(root, max_limit or settings.MAX_LIMIT)
+    if clamped:
+        rewrites.append(clamped)
+    violations = list(dict.fromkeys(violations))
+    if violations and enforce:
+        raise SqlRejected(violations)
+    return ValidatedSql(
+        sql=root.sql(dialect=DIALECT) if rewrites else sql,
+        rewrites=rewrites,
+        violations=violations,
+        warnings=list(dict.fromkeys(warnings)),
+    )
 
-FORBIDDEN = re.compile(r"\\b(drop|delete|update|insert|alter|create|truncate|grant|revoke)\\b", re.I)
 
 def is_safe_sql(sql: str) -> bool:
+    """Single read-only SELECT with a LIMIT."""
     if not sql:
         return False
-    if FORBIDDEN.search(sql):
+    try:
+        root = _parse(sql)
+    except SqlRejected:
         return False
-    parsed = sqlparse.parse(sql)
-    if len(parsed) != 1:
-        return False
-    stmt = parsed[0]
-    if stmt.get_type() != 'SELECT':
-        return False
-    # crude LIMIT guard
-    if "limit" not in sql.lower():
-        return False
-    return True
+    return not _safety_reasons(root) and root.args.get("limit") is not None
+
 
 def clamp_limit(sql: str) -> str:
-    # best-effort: if LIMIT > MAX_LIMIT, clamp it
-    m = re.search(r"limit\\s+(\\d+)", sql, flags=re.I)
-    if m:
-        n = int(m.group(1))
-        if n > settings.MAX_LIMIT:
-            return re.sub(r"limit\\s+\\d+", f"LIMIT {settings.MAX_LIMIT}", sql, flags=re.I)
-        return sql
-    return f"{sql.rstrip(';')} LIMIT {settings.MAX_LIMIT};"
-  
\ No newline at end of file
+    # LIMIT added when missing, clamped to MAX_LIMIT when larger
+    root, clamped = _clamp(_parse(sql), settings.MAX_LIMIT)
+    return root.sql(dialect=DIALECT) if clamped else sql
+
+
+def _reason_kind(reason: str) -> str:
+    for prefix, kind in (
+        ("unknown", "schema"),
+        ("table", "schema"),
+        ("cartesian", "cartesian_join"),
+        ("non-sargable", "non_sargable"),
+        ("cannot expand", "select_star"),
+    ):
+        if reason.startswith(prefix):
+            return kind
+    return "unsafe"
+
+
+def _build_catalog(schema: Any) -> Optional[Catalog]:
+    from app.services.schema_index import schema_index
+
+    tables = schema_index.index_for(schema).tables
+    return {table: list(columns) for table, columns in tables.items()} or None
+
+
+class SqlGuard:
+    def __init__(self):
+        # (schema bundle version, catalog) of the last catalog built
+        self._catalog: Optional[Tuple[str, Optional[Catalog]]] = None
+
+    async def catalog(self) -> Optional[Catalog]:
+        """Tables and columns of every schema module, or None when the schema is unavailable."""
+        from app.services.schema_cache import SCHEMA_MODULES, schema_cache
+
+        try:
+            bundle = await schema_cache.get(SCHEMA_MODULES)
+        except Exception as e:
+            log.warning(f"SQL guard: schema unavailable, skipping schema checks: {e}")
+            return None
+        cached = self._catalog
+        if cached is not None and bundle.version is not None and cached[0] == bundle.version:
+            return cached[1]
+        # Hashing and indexing the full schema is CPU work: off the event loop, once per schema version
+        catalog = await asyncio.to_thread(_build_catalog, bundle.content)
+        if bundle.version is not None:
+            self._catalog = (bundle.version, catalog)
+        return catalog
+
+    async def check(self, sql: Optional[str]) -> ValidatedSql:
+        mode = (settings.SQL_GUARD_MODE or "report").lower()
+        if mode not in SQL_GUARD_MODES:
+            mode = "report"
+        if mode == "off":
+            return ValidatedSql(sql=sql)
+        large = [t.strip() for t in (settings.SQL_GUARD_LARGE_TABLES or "").split(",") if t.strip()]
+        try:
+            result = validate_sql(sql, await self.catalog(), settings.MAX_LIMIT, large, enforce=mode == "enforce")
+        except SqlRejected as e:
+            for reason in e.reasons:
+                SQL_GUARD_RESULTS.inc(outcome="rejected", reason=_reason_kind(reason))
+            log.warning(f"SQL guard rejected query: {e}\n{sql}")
+            raise
+        for violation in result.violations:
+            SQL_GUARD_RESULTS.inc(outcome="reported", reason=_reason_kind(violation))
+        if result.violations:
+            log.warning(f"SQL guard (report mode) violations: {result.violations}\n{sql}")
+        for warning in result.warnings:
+            SQL_GUARD_RESULTS.inc(outcome="warned", reason=_reason_kind(warning))
+        if result.warnings:
+            log.info(f"SQL guard warnings: {result.warnings}")
+        SQL_GUARD_RESULTS.inc(outcome="rewritten" if result.rewrites else "passed")
+        if result.rewrites:
+            log.info(f"SQL guard rewrites: {result.rewrites}")
+        return result
+
+
+sql_guard = SqlGuard()
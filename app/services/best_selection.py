@@ -1,10 +1,9 @@
 import logging
 import json
-from openai import OpenAI
+from app.llm.openai_client import get_async_client
 from app.core.config import settings
 
 log = logging.getLogger("app.services.best_selection")
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 
 
 def build_best_selection_payload(raw_data: dict) -> dict:
@@ -143,10 +142,10 @@ Your entire response MUST be valid JSON and MUST be exactly this array structure
 """
 
 
-def call_best_selection_llm(raw_data: dict):
+async def call_best_selection_llm(raw_data: dict):
     payload = raw_data
 
-    completion = client.chat.completions.create(
+    completion = await get_async_client().chat.completions.create(
         model="gpt-5.1",
         messages=[
             {"role": "system", "content": BEST_PRICE_SELECTION_SYSTEM_PROMPT},
@@ -9,7 +9,7 @@ from pydantic import BaseModel, Field, conint, confloat, validator
 from zoneinfo import ZoneInfo
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+from app.llms.runnable.structured import structured_chain
 from app.llms.runnable.llm_provider import get_chain_llm
 from app.graphs.nodes.prompts.capital_request_generation_prompt import CAPITAL_REQUEST_GENERATION_PROMPT
 log = logging.getLogger("capital_planning")
@@ -263,24 +263,23 @@ def compute_project_dates(
 
 
 # ============================================================
-# LLM CHAIN (LangChain + PydanticOutputParser)
+# LLM CHAIN (LangChain + structured output)
 # ============================================================
 
 
 def create_project_intent_chain(model_key: Optional[str] = None, model_id: Optional[str] = None):
-    parser = PydanticOutputParser[ProjectIntentLLM](pydantic_object=ProjectIntentLLM)
-
     log.info("before LLM CALL")
     prompt = ChatPromptTemplate.from_messages(
         [
             ("system", CAPITAL_REQUEST_GENERATION_PROMPT),
             ("human", "User command:\n{user_command}"),
         ]
-    ).partial(format_instructions=parser.get_format_instructions())
+    )
 
     llm = get_chain_llm(model_key, model_id)
 
-    chain = prompt | llm | parser
+    # format_instructions is filled in by structured_chain
+    chain = structured_chain(prompt, llm, ProjectIntentLLM, node="capital_intent")
     return chain
 
 
@@ -2,7 +2,6 @@ from app.services.price_summarization import summarize_tavily_results_with_llm
 from app.services.pricing import parse_price_candidates
 import json
 
-from openai import OpenAI
 from app.core.config import settings
 from app.models.capital.cost_estimator import MaterialExtractionResult, ScopeRequest
 import logging
@@ -12,12 +11,11 @@ from app.core.config import settings
 from app.graphs.nodes.prompts.material_extraction_system_prompt import MATERIAL_EXTRACTION_SYSTEM_PROMPT
 log = logging.getLogger("app.services.cost_estimator")
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 import re
 from typing import List, Tuple, Optional
 from statistics import median
 
-from tavily import TavilyClient
+from tavily import AsyncTavilyClient
 from app.models.capital.cost_estimator import (
     ScopeRequest,
     PurchaseItem,
@@ -27,7 +25,7 @@ from app.models.capital.cost_estimator import (
 
 from app.llms.runnable.llm_provider import get_chain_llm
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+from app.llms.runnable.structured import structured_chain
 class CostEstimatorService:
     async def llm_extract_materials(
         self, req: ScopeRequest, model_key: Optional[str] = None, model_id: Optional[str] = None
@@ -49,8 +47,7 @@ class CostEstimatorService:
         )
         log.info(f"user_prompt: {user_prompt}")
 
-        # Build LCEL chain with prompt -> llm -> parser
-        parser = PydanticOutputParser(pydantic_object=MaterialExtractionResult)
+        # Build LCEL chain with prompt -> llm -> MaterialExtractionResult
         prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", "{system_text}"),
@@ -58,7 +55,7 @@ class CostEstimatorService:
             ]
         )
         llm = get_chain_llm(model_key, model_id)
-        chain = prompt | llm | parser
+        chain = structured_chain(prompt, llm, MaterialExtractionResult, node="material_extraction")
 
         result: MaterialExtractionResult = await chain.ainvoke(
             {
@@ -94,7 +91,7 @@ Return ONLY the extracted items as a JSON object according to the schema describ
 TAVILY_API_KEY = os.getenv(
     "TAVILY_API_KEY", "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"
 )
-tavily_client = TavilyClient(api_key=TAVILY_API_KEY)
+tavily_client = AsyncTavilyClient(api_key=TAVILY_API_KEY)
 
 
 def build_tavily_query(item: PurchaseItem, req: ScopeRequest):
@@ -113,10 +110,10 @@ def build_tavily_query(item: PurchaseItem, req: ScopeRequest):
     return " ".join(p for p in parts if p).strip()
 
 
-def estimate_price_for_item(
+async def estimate_price_for_item(
     item: PurchaseItem,
     req: ScopeRequest,
-    client: TavilyClient | None = None,
+    client: AsyncTavilyClient | None = None,
 ):
     """
     Calls Tavily, extracts numeric prices from snippets, and returns an ItemEstimate
@@ -130,7 +127,7 @@ def estimate_price_for_item(
     log.info(f"Tavily query: {query}")
 
     # Tavily search parameters – adjust as needed
-    response = tvly.search(
+    response = await tvly.search(
         query=query,
         search_depth="advanced",  # better recall
         max_results=5,
@@ -145,7 +142,7 @@ def estimate_price_for_item(
     price_sources: list[PriceSource] = []
     prices_list: list[float] = []
     candidate_currencies: list[str] = []
-    prices_data = summarize_tavily_results_with_llm(
+    prices_data = await summarize_tavily_results_with_llm(
         results, req["location_country"], req["location_city"]
     )
     prices_data_composed = {
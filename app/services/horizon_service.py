@@ -1,56 +1,209 @@
-from app.graphs.horizon_brain_graph import build_horizon_brain_graph
-from typing import Any, Dict, List, Optional
+from app.graphs.registry import graph_registry
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
 import json
+from app.core.deadline import Deadline, DeadlineExceeded
+from app.llms.runnable.admission import AdmissionRejected
 from app.memory.memory_manager import MemoryManager
+from app.services.retrieval import RetrievalPrefetch
+from app.bench.cassette import cassette, exchange_key
 import logging
 from langchain_core.messages import AIMessage, HumanMessage, BaseMessage
 
 log = logging.getLogger("app.services.horizon")
 
+# Nodes whose LLM output is user-facing text; other nodes (intent, sqlgen, ...)
+# produce JSON that is not worth streaming token by token.
+STREAM_TOKEN_NODES = {"app_info", "humanize"}
+
 
 class HorizonService:
     def __init__(self):
         self.memory_manager = MemoryManager()
         self.chat_id = None
 
-    async def process_horizon_engine_request(self, user_input: str, chat_id: str, model_id: str | None = None, model_key: str | None = None) -> dict:
+    async def process_horizon_engine_request(self, user_input: str, chat_id: str, model_id: str | None = None, model_key: str | None = None, deadline_seconds: float | None = None) -> dict:
+        deadline = Deadline.from_request(deadline_seconds)
+        init_state = await self._prepare_request(user_input, chat_id, model_id, model_key, deadline)
+
+        # GRAPH ENGINE (compiled once, served from the registry)
+        graph = graph_registry.get()
+
+        log.info(f"the init state--->{init_state}")
+        # Track the latest state and finished nodes so that running out of
+        # budget still yields a partial result.
+        latest: Dict[str, Any] = dict(init_state)
+        completed: List[str] = []
+
+        async def _run() -> None:
+            nonlocal latest
+            async for mode, chunk in graph.astream(init_state, stream_mode=["updates", "values"]):
+                if mode == "values":
+                    latest = chunk
+                else:
+                    completed.extend(n for n in chunk if not n.startswith("__"))
+
+        try:
+            timeout = deadline.timeout()
+            await asyncio.wait_for(_run(), timeout=timeout)
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            log.warning(f"Deadline of {deadline.budget:g}s exceeded after nodes {completed}")
+            return self._build_partial_response(latest, completed, deadline)
+        finally:
+            self._cancel_prefetch(init_state)
+        final_state = latest
+        log.info(f"the final state--->{final_state}")
+
+        await self._save_assistant_response(chat_id, final_state)
+        return self._build_response(final_state)
+
+    async def stream_horizon_engine_request(self, user_input: str, chat_id: str, model_id: str | None = None, model_key: str | None = None, deadline_seconds: float | None = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of process_horizon_engine_request built on
+        LangGraph astream_events. Yields event dicts:
+          - {"event": "node_start", "node": ...}
+          - {"event": "token", "node": ..., "content": ...}
+          - {"event": "node_end", "node": ...}
+          - {"event": "final", "data": <same shape as the non-streaming response>}
+          - {"event": "partial", "data": ...} when the request deadline runs out
+          - {"event": "error", "detail": ...}
+        Memory persistence runs once the graph has produced its final state.
+        Closing the generator (client disconnect) cancels the running graph.
+        """
+        yield {"event": "start", "chat_id": chat_id}
+
+        deadline = Deadline.from_request(deadline_seconds)
+        init_state = await self._prepare_request(user_input, chat_id, model_id, model_key, deadline)
+        graph = graph_registry.get()
+
+        final_state: Optional[Dict[str, Any]] = None
+        latest: Dict[str, Any] = dict(init_state)
+        completed: List[str] = []
+        # Each step is bounded by what is left of the budget (a timeout
+        # around the whole generator would fire while it is suspended at a yield).
+        events = graph.astream_events(init_state, version="v2").__aiter__()
+        try:
+            while True:
+                try:
+                    ev = await asyncio.wait_for(events.__anext__(), timeout=deadline.timeout())
+                except StopAsyncIteration:
+                    break
+                kind = ev.get("event")
+                name = ev.get("name")
+                node = (ev.get("metadata") or {}).get("langgraph_node")
+                if node and node.startswith("__"):
+                    # LangGraph internals such as __start__
+                    node = None
+
+                if kind == "on_chain_start" and node and node == name:
+                    yield {"event": "node_start", "node": node}
+                elif kind == "on_chain_end" and node and node == name:
+                    output = (ev.get("data") or {}).get("output")
+                    if isinstance(output, dict):
+                        latest.update(output)
+                    completed.append(node)
+                    yield {"event": "node_end", "node": node}
+                elif kind == "on_chat_model_stream" and node in STREAM_TOKEN_NODES:
+                    chunk = (ev.get("data") or {}).get("chunk")
+                    content = getattr(chunk, "content", None)
+                    if isinstance(content, str) and content:
+                        yield {"event": "token", "node": node, "content": content}
+                elif kind == "on_chain_end" and not ev.get("parent_ids"):
+                    output = (ev.get("data") or {}).get("output")
+                    if isinstance(output, dict):
+                        final_state = output
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            log.warning(f"Deadline of {deadline.budget:g}s exceeded after nodes {completed} (stream)")
+            yield {"event": "partial", "data": self._build_partial_response(latest, completed, deadline)}
+            return
+        except AdmissionRejected as e:
+            yield {"event": "error", "status": 503, "detail": str(e), "retry_after": e.retry_after}
+            return
+        except Exception as e:
+            log.exception("Streaming graph execution failed")
+            yield {"event": "error", "detail": str(e)}
+            return
+        finally:
+            await events.aclose()
+            self._cancel_prefetch(init_state)
+
+        if final_state is None:
+            yield {"event": "error", "detail": "No result produced."}
+            return
+
+        log.info(f"the final state (stream)--->{final_state}")
+        try:
+            yield {"event": "final", "data": self._build_response(final_state)}
+        finally:
+            await self._save_assistant_response(chat_id, final_state)
+
+    async def _prepare_request(self, user_input: str, chat_id: str, model_id: str | None, model_key: str | None, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         self.chat_id = chat_id
 
+        if cassette.recording:
+            request = {"user_input": user_input, "model_id": model_id, "model_key": model_key}
+            cassette.record("request", exchange_key("request", request), request)
+
+        # Kick off Pinecone retrieval for the RAG intents now so it overlaps
+        # with history loading and intent classification.
+        prefetch = RetrievalPrefetch.start(user_input)
+
         # Build structured chat history (latest last) via memory manager helper
-        chat_history = self.memory_manager.load_context_messages(self.chat_id, limit=6)
-        
+        chat_history = await self.memory_manager.aload_context_messages(chat_id, limit=6)
+
         # Save user input
         try:
-            self.memory_manager.save(self.chat_id, "user", user_input)
+            await self.memory_manager.asave(chat_id, "user", user_input)
             log.info(f"Memory Save With Role User Succeeded: {user_input}")
         except Exception as e:
             log.warning(f"Memory Save With Role User Failed: {e}")
 
-        # GRAPH ENGINE
-        graph = build_horizon_brain_graph()
-
-        init_state = {
+        return {
             "user_input": user_input,
             "chat_history": chat_history,
-            "chat_id": self.chat_id,
+            "chat_id": chat_id,
             "model_id": model_id,
             "model_key": model_key,
+            "retrieval_prefetch": prefetch,
+            "deadline": deadline,
         }
 
-        log.info(f"the init state--->{init_state}")
-        final_state = await graph.ainvoke(init_state)
-        log.info(f"the final state--->{final_state}")
+    def _cancel_prefetch(self, state: Dict[str, Any]) -> None:
+        prefetch = state.get("retrieval_prefetch")
+        if prefetch is not None:
+            prefetch.cancel()
 
+    async def _save_assistant_response(self, chat_id: str, final_state: Dict[str, Any]) -> None:
         try:
             assistant_text = self._get_assistant_text(final_state)
 
             payload_data = self._get_payload(final_state)
 
             if assistant_text:
-                self.memory_manager.save(self.chat_id, "assistant", assistant_text, payload=payload_data)
+                await self.memory_manager.asave(chat_id, "assistant", assistant_text, payload=payload_data)
         except Exception as e:
             log.warning(f"Memory Save (Assistant Exact Response) Failed: {e}")
 
+    def _build_partial_response(self, state: Dict[str, Any], completed_nodes: List[str], deadline: Deadline) -> dict:
+        """Structured result for a request that ran out of time budget."""
+        partial = {
+            key: state.get(key)
+            for key in ("intent", "sql", "rows_data", "work_request_payload", "project_summary_data", "response")
+            if state.get(key) is not None
+        }
+        return {
+            "user_input": state.get("user_input", ""),
+            "type": "partial",
+            "status": "deadline_exceeded",
+            "message": "The request did not finish within its time budget; returning what was completed.",
+            "deadline_seconds": deadline.budget,
+            "elapsed_seconds": round(deadline.elapsed(), 3),
+            "completed_nodes": completed_nodes,
+            "partial": partial,
+            "human_summary_json": "",
+        }
+
+    def _build_response(self, final_state: Dict[str, Any]) -> dict:
         if final_state.get("intent") == "work_request_generation":
             return {
                 "user_input": final_state.get("user_input", ""),
@@ -0,0 +1,347 @@
+"""
+Tiered intent classification in front of the LLM intent_node.
+
+  1. RulesTier     – compiled regexes (keywords, ref-id patterns). Microseconds.
+  2. CentroidTier  – nearest-centroid over local embeddings, trained from the
+                     intents recorded in Mongo chat payloads. Milliseconds.
+  3. LLM           – the existing IntentResult parser in intent_node, used only
+                     when neither tier clears its confidence threshold.
+
+Every decision (including LLM fallbacks) is counted per tier so thresholds
+can be tuned from /metrics or /horizon/intent-classifier.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.models.parsers.chat_node_parsers import IntentResult
+from app.telemetry.metrics import REGISTRY
+
+log = logging.getLogger("app.services.intent_classifier")
+
+INTENT_DECISIONS = REGISTRY.counter(
+    "horizon_intent_classifier_decisions_total", "Intent decisions per classifier tier."
+)
+INTENT_CONFIDENCE = REGISTRY.histogram(
+    "horizon_intent_classifier_confidence",
+    "Best confidence produced by each fast-path tier (accepted or not).",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0),
+)
+
+KNOWN_INTENTS = {
+    "work_request_generation",
+    "project_summary",
+    "text_to_sql",
+    "rag_query",
+    "app_info",
+    "irrelevant",
+}
+
+# Same shape project_summary_node asks the LLM to detect (AA-EW-ddMMyyyy-xxxxx)
+REF_ID_RE = re.compile(r"\b[A-Z]{2}-EW-\d{8}-\d+\b", re.I)
+EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b")
+
+
+class TieredIntent(BaseModel):
+    result: IntentResult
+    confidence: float
+    tier: str
+
+
+# ============================================================
+# Tier 1 — compiled rules
+# ============================================================
+
+_FOLLOW_UP_RE = re.compile(
+    r"\b(same|previous|above|earlier|last one|that one|instead|again|also|update|change|revise|modify)\b"
+    r"|^(and|but|now|then|what about|how about)\b",
+    re.I,
+)
+
+
+def is_follow_up(text: str, has_history: bool) -> bool:
+    """True when `text` reads as a follow-up that only makes sense with the chat history."""
+    return bool(has_history and _FOLLOW_UP_RE.search(text or ""))
+
+
+_GREETING_RE = re.compile(
+    r"^\s*(hi|hello|hey|hiya|thanks|thank you|thx|good (morning|afternoon|evening)|how are you)\b[\s!.?]*$",
+    re.I,
+)
+_HOW_TO_RE = re.compile(
+    r"^\s*(how (do|can|should|would) (i|we|you|one)|how to|where (do|can) i|steps to|what are the steps)\b",
+    re.I,
+)
+_DEFINITION_RE = re.compile(
+    r"^\s*(what (is|are|does)|define|meaning of)\b", re.I
+)
+_CREATE_WR_RE = re.compile(
+    r"\b(create|raise|generate|draft|open|make|prepare|log)\b.{0,40}"
+    r"\b(work request|wr|sow|scope of works?|ticket)\b",
+    re.I,
+)
+_SUMMARY_RE = re.compile(r"\b(summar(y|ize|ise)|overview|brief me|tell me about|status of)\b", re.I)
+_DATA_VERB_RE = re.compile(
+    r"\b(list|show|display|give me|find|fetch|top \d+|bottom \d+|count|how many|total|sum of|average|"
+    r"avg|compare|rank|highest|lowest|most|least|breakdown|group(ed)? by)\b",
+    re.I,
+)
+_DATA_NOUN_RE = re.compile(
+    r"\b(projects?|vendors?|suppliers?|labou?rs?|revenue|margins?|costs?|rfqs?|quotes?|"
+    r"sites?|clients?|approvals?|statuses)\b",
+    re.I,
+)
+_SINGLE_PROJECT_RE = re.compile(r"\bproject\b", re.I)
+_MULTI_PROJECT_RE = re.compile(r"\b(projects|top \d+|all|each|every|per)\b", re.I)
+_EXPORT_RE = re.compile(r"\b(export|download|excel|xlsx|csv|pdf)\b", re.I)
+_EMAIL_ACTION_RE = re.compile(r"\b(e-?mail|mail it|send (it|this|them) to)\b", re.I)
+_FILE_FORMAT_RE = re.compile(r"\b(csv|excel|xlsx|pdf)\b", re.I)
+
+
+class RulesTier:
+    name = "rules"
+
+    def classify(self, text: str, has_history: bool = False) -> Optional[TieredIntent]:
+        q = (text or "").strip()
+        if not q:
+            return None
+
+        # Follow-ups need the chat history to resolve → leave them to the LLM.
+        if has_history and _FOLLOW_UP_RE.search(q):
+            return None
+
+        candidates: List[Tuple[str, float]] = []
+        if _GREETING_RE.match(q):
+            candidates.append(("irrelevant", 0.97))
+
+        how_to = bool(_HOW_TO_RE.match(q))
+        if how_to:
+            candidates.append(("app_info", 0.93))
+        elif _CREATE_WR_RE.search(q):
+            candidates.append(("work_request_generation", 0.94))
+
+        has_ref_id = bool(REF_ID_RE.search(q))
+        single_project_summary = bool(
+            _SUMMARY_RE.search(q) and _SINGLE_PROJECT_RE.search(q) and not _MULTI_PROJECT_RE.search(q)
+        )
+        if has_ref_id:
+            candidates.append(("project_summary", 0.96 if _SUMMARY_RE.search(q) else 0.88))
+        elif single_project_summary:
+            candidates.append(("project_summary", 0.9))
+
+        if (
+            not how_to
+            and not has_ref_id
+            and not single_project_summary
+            and _DATA_VERB_RE.search(q)
+            and _DATA_NOUN_RE.search(q)
+        ):
+            candidates.append(("text_to_sql", 0.92))
+
+        if not candidates and _DEFINITION_RE.match(q):
+            # The intent prompt strongly prefers app_info for definitions.
+            candidates.append(("app_info", 0.82))
+
+        if not candidates:
+            return None
+
+        candidates.sort(key=lambda c: c[1], reverse=True)
+        intent, confidence = candidates[0]
+        # Two strong, different matches → ambiguous.
+        if len(candidates) > 1 and candidates[1][0] != intent and candidates[1][1] >= 0.85:
+            confidence = min(confidence, 0.5)
+
+        post_actions, params = _extract_post_actions(q)
+        if post_actions:
+            # Post-actions are extracted heuristically; trust the match a bit less.
+            confidence -= 0.05
+
+        result = IntentResult(
+            intent=intent,
+            post_actions=post_actions,
+            params=params,
+            requires_multistep=bool(post_actions),
+        )
+        return TieredIntent(result=result, confidence=round(confidence, 4), tier=self.name)
+
+
+def _extract_post_actions(text: str) -> Tuple[List[str], Dict[str, Any]]:
+    post_actions: List[str] = []
+    params: Dict[str, Any] = {}
+    email = EMAIL_RE.search(text)
+    if email or _EMAIL_ACTION_RE.search(text):
+        post_actions.append("email")
+        if email:
+            params["email_to"] = email.group(0)
+    if _EXPORT_RE.search(text):
+        post_actions.append("export")
+        fmt = _FILE_FORMAT_RE.search(text)
+        if fmt:
+            params["file_format"] = fmt.group(1).lower()
+    return post_actions, params
+
+
+# ============================================================
+# Tier 2 — embedding nearest-centroid
+# ============================================================
+
+
+class CentroidTier:
+    name = "centroid"
+
+    def __init__(self, min_samples: int = 5):
+        self.min_samples = min_samples
+        self._labels: List[str] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None and len(self._labels) > 1
+
+    def _embed(self, texts: Sequence[str]) -> np.ndarray:
+        from app.models.embeddings import get_embeddings
+
+        vectors = np.asarray(get_embeddings().embed_documents(list(texts)), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def train(self, samples: Sequence[Tuple[str, str]]) -> Dict[str, int]:
+        by_intent: Dict[str, List[str]] = {}
+        for text, intent in samples:
+            intent = (intent or "").lower()
+            if intent not in KNOWN_INTENTS or not text or not text.strip():
+                continue
+            by_intent.setdefault(intent, []).append(text.strip())
+
+        labels: List[str] = []
+        centroids: List[np.ndarray] = []
+        counts: Dict[str, int] = {}
+        for intent, texts in sorted(by_intent.items()):
+            # de-duplicate exact repeats so one chatty user doesn't dominate
+            texts = list(dict.fromkeys(texts))
+            if len(texts) < self.min_samples:
+                continue
+            vectors = self._embed(texts)
+            centroid = vectors.mean(axis=0)
+            norm = np.linalg.norm(centroid)
+            centroids.append(centroid / (norm or 1.0))
+            labels.append(intent)
+            counts[intent] = len(texts)
+
+        with self._lock:
+            if len(labels) > 1:
+                self._labels = labels
+                self._centroids = np.vstack(centroids)
+                self._counts = counts
+        log.info("Intent centroid tier trained: %s", counts)
+        return counts
+
+    def classify(self, text: str, min_margin: float = 0.05) -> Optional[TieredIntent]:
+        if not self.trained or not (text or "").strip():
+            return None
+        with self._lock:
+            labels, centroids = self._labels, self._centroids
+        vector = self._embed([text])[0]
+        sims = centroids @ vector
+        order = np.argsort(sims)[::-1]
+        best, second = float(sims[order[0]]), float(sims[order[1]])
+        confidence = best if (best - second) >= min_margin else min(best, 0.5)
+        return TieredIntent(
+            result=IntentResult(intent=labels[order[0]]),
+            confidence=round(confidence, 4),
+            tier=self.name,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"trained": self.trained, "samples_per_intent": dict(self._counts)}
+
+
+# ============================================================
+# Orchestrator
+# ============================================================
+
+
+class TieredIntentClassifier:
+    def __init__(self):
+        self.rules = RulesTier()
+        self.centroid = CentroidTier(min_samples=settings.INTENT_CENTROID_MIN_SAMPLES)
+
+    async def classify(self, text: str, chat_history: Optional[list] = None) -> Optional[TieredIntent]:
+        """
+        Return a confident fast-path decision, or None when the caller should
+        fall back to the LLM classifier.
+        """
+        if not settings.INTENT_FAST_PATH_ENABLED:
+            return None
+        has_history = bool(chat_history)
+
+        decision = self.rules.classify(text, has_history=has_history)
+        if decision is not None:
+            INTENT_CONFIDENCE.observe(decision.confidence, tier=self.rules.name)
+            if decision.confidence >= settings.INTENT_RULES_MIN_CONFIDENCE:
+                self.record(decision.tier, decision.result.intent)
+                return decision
+
+        # Follow-ups are ambiguous without history; the centroid tier is context-free.
+        if settings.INTENT_CENTROID_ENABLED and self.centroid.trained and not is_follow_up(text, has_history):
+            try:
+                decision = await asyncio.to_thread(
+                    self.centroid.classify, text, settings.INTENT_CENTROID_MIN_MARGIN
+                )
+            except Exception as e:
+                log.warning("Centroid intent tier failed: %s", e)
+                decision = None
+            if decision is not None:
+                INTENT_CONFIDENCE.observe(decision.confidence, tier=self.centroid.name)
+                if decision.confidence >= settings.INTENT_CENTROID_MIN_CONFIDENCE:
+                    # The centroid tier only predicts the intent; post-actions
+                    # still come from the cheap regex extractor.
+                    post_actions, params = _extract_post_actions(text)
+                    decision.result.post_actions = post_actions
+                    decision.result.params = params
+                    decision.result.requires_multistep = bool(post_actions)
+                    self.record(decision.tier, decision.result.intent)
+                    return decision
+        return None
+
+    def record(self, tier: str, intent: str) -> None:
+        INTENT_DECISIONS.inc(tier=tier, intent=intent or "unknown")
+
+    def train_from_mongo(self) -> Dict[str, int]:
+        from app.memory.mongo_memory import MongoChatMemory
+
+        memory = MongoChatMemory()
+        samples = list(memory.iter_labelled_turns(max_chats=settings.INTENT_CENTROID_TRAINING_CHATS))
+        log.info("Training intent centroids from %d labelled turns", len(samples))
+        return self.centroid.train(samples)
+
+    def stats(self) -> Dict[str, Any]:
+        totals: Dict[str, float] = {}
+        for labels, value in INTENT_DECISIONS.samples():
+            tier = labels.get("tier", "unknown")
+            totals[tier] = totals.get(tier, 0.0) + value
+        grand_total = sum(totals.values()) or 1.0
+        return {
+            "enabled": settings.INTENT_FAST_PATH_ENABLED,
+            "thresholds": {
+                "rules": settings.INTENT_RULES_MIN_CONFIDENCE,
+                "centroid": settings.INTENT_CENTROID_MIN_CONFIDENCE,
+                "centroid_margin": settings.INTENT_CENTROID_MIN_MARGIN,
+            },
+            "decisions": totals,
+            "hit_rates": {tier: round(n / grand_total, 4) for tier, n in totals.items()},
+            "centroid": self.centroid.stats(),
+        }
+
+
+intent_classifier = TieredIntentClassifier()
@@ -1,7 +1,6 @@
 from app.core.config import settings
 import json
 from typing import List, Dict, Any
-from openai import OpenAI
 import logging
 from datetime import date
 from app.graphs.nodes.prompts.price_summary_system_prompt import PRICE_SUMMARY_SYSTEM_PROMPT
@@ -10,10 +9,9 @@ from langchain_core.output_parsers import StrOutputParser
 from app.llms.runnable.llm_provider import get_chain_llm
 log = logging.getLogger("app.services.price_summarization")
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 
 
-def summarize_tavily_results_with_llm(
+async def summarize_tavily_results_with_llm(
     tavily_results: List[Dict[str, Any]],
     country: str,
     city: str
@@ -41,7 +39,7 @@ def summarize_tavily_results_with_llm(
     llm = get_chain_llm()
     chain = prompt | llm | StrOutputParser()
 
-    content = chain.invoke(
+    content = await chain.ainvoke(
         {
             "system_text": PRICE_SUMMARY_SYSTEM_PROMPT,
             "payload_json": json.dumps(payload, ensure_ascii=False)
@@ -0,0 +1,179 @@
+"""
+Pinecone retrieval shared by the RAG nodes, plus speculative prefetch.
+
+`RetrievalPrefetch` is started by HorizonService before the graph runs: it
+embeds the user query once and searches every intent's index concurrently
+while intent_node is still classifying. intent_node then keeps the search
+for the chosen intent and cancels the rest; work_request_node and
+app_info_node consume the prefetched documents and only fall back to a
+fresh retrieval when nothing usable was prefetched.
+"""
+
+import asyncio
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from app.bench.cassette import cassette, documents_from_json, documents_to_json, exchange_key
+from app.core.config import settings
+from app.core.deadline import with_deadline
+from app.models.embeddings import get_embeddings
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.services.retrieval")
+
+# intent -> (pinecone index, text key)
+RETRIEVAL_INDEXES: Dict[str, tuple] = {
+    "work_request_generation": ("horizon-work-order-scopes", "project_title"),
+    "app_info": ("horizon-app-flow", "text"),
+}
+RETRIEVAL_K = 5
+
+RETRIEVAL_SECONDS = REGISTRY.histogram(
+    "horizon_retrieval_duration_seconds", "Pinecone retrieval latency per index and mode."
+)
+PREFETCH_OUTCOMES = REGISTRY.counter(
+    "horizon_retrieval_prefetch_total", "Speculative retrieval outcomes (hit, miss, cancelled, error)."
+)
+
+
+@lru_cache(maxsize=8)
+def get_vectorstore(index_name: str, text_key: str):
+    from langchain_pinecone import PineconeVectorStore
+
+    return PineconeVectorStore(
+        index_name=index_name,
+        embedding=get_embeddings(),
+        text_key=text_key,
+        pinecone_api_key=settings.PINECONE_API_KEY,
+    )
+
+
+def get_retriever(intent: str, k: int = RETRIEVAL_K):
+    index_name, text_key = RETRIEVAL_INDEXES[intent]
+    return get_vectorstore(index_name, text_key).as_retriever(search_kwargs={"k": k})
+
+
+async def retrieve(intent: str, query: str, k: int = RETRIEVAL_K) -> List[Document]:
+    """Embed `query` and search the index mapped to `intent`."""
+    index_name, _ = RETRIEVAL_INDEXES[intent]
+    started = time.perf_counter()
+    docs = await with_deadline(get_retriever(intent, k).ainvoke(query))
+    RETRIEVAL_SECONDS.observe(time.perf_counter() - started, index=index_name, mode="direct")
+    return docs
+
+
+async def _search_by_vector(intent: str, vector: List[float], k: int) -> List[Document]:
+    index_name, text_key = RETRIEVAL_INDEXES[intent]
+    started = time.perf_counter()
+    docs = await asyncio.to_thread(
+        get_vectorstore(index_name, text_key).similarity_search_by_vector, vector, k=k
+    )
+    RETRIEVAL_SECONDS.observe(time.perf_counter() - started, index=index_name, mode="prefetch")
+    return docs
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    # Speculative work that nobody awaits must not log "exception never retrieved".
+    if not task.cancelled():
+        task.exception()
+
+
+class RetrievalPrefetch:
+    """
+    In-flight speculative searches for one request. Never raises to the
+    caller: any failure simply means the node retrieves on its own.
+    """
+
+    def __init__(self, query: str, intents: Optional[List[str]] = None, k: int = RETRIEVAL_K):
+        self.query = query
+        self.k = k
+        self._embedding: Optional[asyncio.Task] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._intents = [i for i in (intents or RETRIEVAL_INDEXES) if i in RETRIEVAL_INDEXES]
+
+    @classmethod
+    def start(cls, query: str) -> Optional["RetrievalPrefetch"]:
+        if not settings.SPECULATIVE_RETRIEVAL_ENABLED or cassette.replaying or not (query or "").strip():
+            return None
+        prefetch = cls(query)
+        prefetch._launch()
+        return prefetch
+
+    def _launch(self) -> None:
+        # One embedding shared by every index search.
+        self._embedding = asyncio.create_task(
+            asyncio.to_thread(get_embeddings().embed_query, self.query)
+        )
+        self._embedding.add_done_callback(_consume_exception)
+        for intent in self._intents:
+            task = asyncio.create_task(self._run(intent))
+            task.add_done_callback(_consume_exception)
+            self._tasks[intent] = task
+
+    async def _run(self, intent: str) -> List[Document]:
+        vector = await asyncio.shield(self._embedding)
+        return await _search_by_vector(intent, vector, self.k)
+
+    def keep(self, intent: Optional[str]) -> None:
+        """Cancel every speculative search except the one for `intent`."""
+        for name, task in self._tasks.items():
+            if name != intent and not task.done():
+                task.cancel()
+                PREFETCH_OUTCOMES.inc(outcome="cancelled", intent=name)
+        if intent not in self._tasks and self._embedding and not self._embedding.done():
+            self._embedding.cancel()
+
+    def cancel(self) -> None:
+        self.keep(None)
+
+    async def take(self, intent: str, query: str) -> Optional[List[Document]]:
+        """Prefetched docs for `intent`, or None when the caller should retrieve itself."""
+        task = self._tasks.pop(intent, None)
+        if task is None or query != self.query:
+            PREFETCH_OUTCOMES.inc(outcome="miss", intent=intent)
+            return None
+        try:
+            docs = await with_deadline(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            PREFETCH_OUTCOMES.inc(outcome="miss", intent=intent)
+            return None
+        except Exception as e:
+            log.warning(f"Speculative retrieval for {intent} failed, retrieving again: {e}")
+            PREFETCH_OUTCOMES.inc(outcome="error", intent=intent)
+            return None
+        PREFETCH_OUTCOMES.inc(outcome="hit", intent=intent)
+        return docs
+
+    def __repr__(self) -> str:
+        return f"RetrievalPrefetch(intents={list(self._tasks)})"
+
+
+async def get_documents(state: dict, intent: str) -> List[Document]:
+    """
+    Documents for a RAG node: prefetched ones when available, otherwise a
+    fresh retrieval.
+    """
+    query = state.get("user_input") or ""
+    key = exchange_key("retrieval", intent, query)
+    if cassette.replaying:
+        return documents_from_json(await cassette.replay("retrieval", key, node=intent))
+
+    started = time.perf_counter()
+    docs = None
+    prefetch: Optional[RetrievalPrefetch] = state.get("retrieval_prefetch")
+    if prefetch is not None:
+        docs = await prefetch.take(intent, query)
+    if docs is None:
+        docs = await retrieve(intent, query)
+    if cassette.recording:
+        cassette.record(
+            "retrieval", key, {"intent": intent, "query": query}, documents_to_json(docs),
+            time.perf_counter() - started, node=intent,
+        )
+    return docs
@@ -0,0 +1,253 @@
+"""
+Cache of the Laravel text-to-SQL schema modules.
+
+sqlgen_node used to POST /schema for the selected modules on every
+question, although the modules almost never change. Schemas are now kept
+per module:
+
+- a module is fetched on its own (`{"modules": [module]}`) and reused for
+  SCHEMA_CACHE_TTL_SECONDS;
+- after the TTL it is revalidated: with If-None-Match when the API sent an
+  ETag (304 keeps the entry), otherwise by refetching and comparing the
+  content digest. Concurrent misses for a module share one request;
+- a module whose revalidation fails keeps being served stale (and is
+  retried after a short back-off) rather than failing the SQL question;
+- the modules of a question are merged on demand. The merged schema and
+  its `json.dumps(indent=2)` string are cached per module combination
+  until one of its modules changes.
+
+All modules are fetched at startup (SCHEMA_CACHE_WARMUP). Entries can be
+dropped with `schema_cache.invalidate(...)` or
+POST /horizon/schema-cache/invalidate, e.g. after a migration.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, get_args
+
+from pydantic import BaseModel
+
+from app.controllers.tool_impl import call_laravel_conditional, tool_get_schema
+from app.core.config import settings
+from app.models.parsers.text_to_sql_models import SchemaArgsModel
+from app.services.singleflight import SingleFlight
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.services.schema_cache")
+
+SCHEMA_CACHE_REQUESTS = REGISTRY.counter(
+    "horizon_schema_cache_requests_total",
+    "Schema module lookups by module and outcome (hit, fetched, not_modified, unchanged, changed, stale).",
+)
+
+# Literal values of SchemaArgsModel.modules, in their canonical order
+SCHEMA_MODULES: Tuple[str, ...] = get_args(get_args(SchemaArgsModel.model_fields["modules"].annotation)[0])
+
+# Back-off before retrying a module whose revalidation failed
+STALE_RETRY_SECONDS = 60.0
+
+
+def _digest(schema: Any) -> str:
+    raw = json.dumps(schema, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def merge_schemas(parts: Sequence[Any]) -> Any:
+    """
+    Deep-merge module schemas: objects key by key, lists concatenated
+    without duplicates, anything else from the later module.
+    """
+    merged: Any = None
+    for part in parts:
+        merged = part if merged is None else _merge(merged, part)
+    return merged
+
+
+def _merge(left: Any, right: Any) -> Any:
+    if isinstance(left, dict) and isinstance(right, dict):
+        out = dict(left)
+        for key, value in right.items():
+            out[key] = _merge(out[key], value) if key in out else value
+        return out
+    if isinstance(left, list) and isinstance(right, list):
+        seen = {_digest(item) for item in left}
+        return left + [item for item in right if _digest(item) not in seen]
+    return right
+
+
+class SchemaEntry(BaseModel):
+    module: str
+    content: Any = None
+    etag: Optional[str] = None
+    digest: str
+    fetched_at: float
+    expires_at: float
+
+
+class SchemaBundle(BaseModel):
+    modules: List[str]
+    content: Any = None
+    # json.dumps(indent=2), as sent in the two-step prompt
+    serialized: str
+    # Whitespace-free JSON for the single-call prompt (all modules)
+    compact: str
+    # Module digests; same version, same content. None for uncached bundles
+    version: Optional[str] = None
+
+
+def _bundle(modules: Sequence[str], content: Any, version: Optional[str] = None) -> SchemaBundle:
+    return SchemaBundle(
+        modules=list(modules),
+        content=content,
+        serialized=json.dumps(content, indent=2),
+        compact=json.dumps(content, ensure_ascii=False, separators=(",", ":")),
+        version=version,
+    )
+
+
+class SchemaCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, SchemaEntry] = {}
+        # module combination -> (module digests, bundle)
+        self._bundles: Dict[Tuple[str, ...], Tuple[Tuple[str, ...], SchemaBundle]] = {}
+        self._flight = SingleFlight("schema_cache")
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _ordered(modules: Sequence[str]) -> Tuple[str, ...]:
+        unique = set(modules)
+        known = [m for m in SCHEMA_MODULES if m in unique]
+        return tuple(known + sorted(unique.difference(known)))
+
+    async def get(self, modules: Sequence[str], prefetched: Optional[Dict[str, SchemaEntry]] = None) -> SchemaBundle:
+        """
+        Merged schema (and its serialized JSON) for the given modules.
+        Modules found in `prefetched` (see `prefetch`) are not looked up again.
+        """
+        key = self._ordered(modules)
+        prefetched = prefetched or {}
+        if not settings.SCHEMA_CACHE_ENABLED and not all(module in prefetched for module in key):
+            return _bundle(key, await tool_get_schema(list(key)))
+
+        missing = [module for module in key if module not in prefetched]
+        found = {**prefetched, **dict(zip(missing, await asyncio.gather(*(self._entry(m) for m in missing))))}
+        entries = [found[module] for module in key]
+        digests = tuple(entry.digest for entry in entries)
+        cached = self._bundles.get(key)
+        if cached is not None and cached[0] == digests:
+            return cached[1]
+
+        bundle = _bundle(key, merge_schemas([entry.content for entry in entries]), ":".join(digests))
+        if settings.SCHEMA_CACHE_ENABLED:
+            self._bundles[key] = (digests, bundle)
+        return bundle
+
+    async def prefetch(self, modules: Sequence[str] = SCHEMA_MODULES) -> Dict[str, SchemaEntry]:
+        """
+        Load `modules` concurrently, each on its own; modules that fail are
+        left out. Through the cache when it is enabled (usually all hits),
+        straight from Laravel otherwise.
+        """
+        load = self._entry if settings.SCHEMA_CACHE_ENABLED else self._load
+        results = await asyncio.gather(*(load(module) for module in modules), return_exceptions=True)
+        for module, result in zip(modules, results):
+            if isinstance(result, Exception):
+                log.warning(f"Schema prefetch for {module} failed: {result}")
+        return {module: result for module, result in zip(modules, results) if not isinstance(result, Exception)}
+
+    @staticmethod
+    async def _load(module: str) -> SchemaEntry:
+        """Uncached single-module fetch."""
+        content = await tool_get_schema([module])
+        now = time.time()
+        return SchemaEntry(module=module, content=content, digest=_digest(content), fetched_at=now, expires_at=now)
+
+    async def _entry(self, module: str) -> SchemaEntry:
+        entry = self._entries.get(module)
+        if entry is not None and entry.expires_at > time.time():
+            SCHEMA_CACHE_REQUESTS.inc(module=module, outcome="hit")
+            return entry
+        return await self._flight.do(module, lambda: self._fetch(module))
+
+    async def _fetch(self, module: str) -> SchemaEntry:
+        stale = self._entries.get(module)
+        now = time.time()
+        try:
+            schema, etag = await call_laravel_conditional(
+                "schema", {"modules": [module]}, stale.etag if stale is not None else None
+            )
+        except Exception as e:
+            if stale is None:
+                raise
+            log.warning(f"Schema revalidation for {module} failed, serving stale copy: {e}")
+            SCHEMA_CACHE_REQUESTS.inc(module=module, outcome="stale")
+            stale.expires_at = now + min(self.ttl, STALE_RETRY_SECONDS)
+            return stale
+
+        if schema is None and stale is not None:
+            SCHEMA_CACHE_REQUESTS.inc(module=module, outcome="not_modified")
+            stale.expires_at = now + self.ttl
+            return stale
+
+        digest = _digest(schema)
+        if stale is None:
+            outcome = "fetched"
+        else:
+            outcome = "unchanged" if stale.digest == digest else "changed"
+        SCHEMA_CACHE_REQUESTS.inc(module=module, outcome=outcome)
+        if outcome == "changed":
+            log.info(f"Schema module {module} changed (digest {stale.digest} -> {digest})")
+        entry = SchemaEntry(
+            module=module, content=schema, etag=etag, digest=digest, fetched_at=now, expires_at=now + self.ttl
+        )
+        self._entries[module] = entry
+        return entry
+
+    # ---------- maintenance ----------
+
+    async def warmup(self, modules: Sequence[str] = SCHEMA_MODULES) -> int:
+        """Fetch `modules` ahead of the first question; returns how many loaded."""
+        loaded = len(await self.prefetch(modules))
+        log.info(f"Schema cache warmed: {loaded}/{len(modules)} modules")
+        return loaded
+
+    def start_warmup(self) -> None:
+        # Keep a reference: the event loop only holds tasks weakly
+        self._warmup_task = asyncio.get_running_loop().create_task(self.warmup())
+
+    def invalidate(self, modules: Optional[Sequence[str]] = None) -> int:
+        """Drop the given modules (all when None) and every merged bundle using them."""
+        targets = set(modules) if modules else set(self._entries)
+        removed = 0
+        for module in targets:
+            if self._entries.pop(module, None) is not None:
+                removed += 1
+        for key in [k for k in self._bundles if targets.intersection(k)]:
+            del self._bundles[key]
+        log.info(f"Schema cache invalidated {removed} module(s)")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "enabled": settings.SCHEMA_CACHE_ENABLED,
+            "ttl_seconds": self.ttl,
+            "modules": {
+                module: {
+                    "digest": entry.digest,
+                    "etag": entry.etag,
+                    "age_seconds": round(now - entry.fetched_at, 1),
+                    "expires_in_seconds": round(entry.expires_at - now, 1),
+                }
+                for module, entry in self._entries.items()
+            },
+            "bundles": len(self._bundles),
+            "inflight": self._flight.stats()["inflight"],
+        }
+
+
+schema_cache = SchemaCache(ttl=settings.SCHEMA_CACHE_TTL_SECONDS)
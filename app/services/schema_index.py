@@ -0,0 +1,426 @@
+"""
+Column-level schema pruning for the SQL generation prompt.
+
+The SQL prompt used to carry every table and column of the selected schema
+modules. `schema_index.prune(schema, question, top_n)` keeps only what the
+question needs:
+
+1. every table and column of the schema (Laravel modules, with the
+   descriptions of SCHEMA_REGISTRY folded in for tables it also knows) is
+   a small document: name parts, type and description;
+2. the question is scored against them with BM25 and, when the shared
+   embedding model loads, cosine similarity; both rankings are merged
+   with reciprocal rank fusion;
+3. the top-N columns are kept, plus their tables' primary keys, the
+   columns SECOND_SYSTEM_PROMPT always expects (SQL_SCHEMA_PINNED_COLUMNS)
+   and the join keys on the shortest path between the kept tables
+   (SCHEMA_REGISTRY relations, relations found in the schema, and
+   `<name>_id` -> `<name>s.id` by convention).
+
+The pruned schema keeps the layout of the original payload: unselected
+tables and columns are removed, everything else (notes, rules) stays. An
+index is built once per schema bundle. SQL_SCHEMA_PRUNE_TOP_N=0 disables
+pruning; app/bench/schema_prune_report.py measures token savings and
+accuracy for candidate values of N.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, deque
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.schemas.registry import SCHEMA_REGISTRY
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.services.schema_index")
+
+SCHEMA_PRUNE_COLUMNS = REGISTRY.histogram(
+    "horizon_schema_prune_kept_ratio",
+    "Share of schema columns kept in the pruned SQL prompt.",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0),
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+MAX_INDEXES = 16
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "by", "for", "from", "how", "i", "in", "is", "it", "list",
+    "me", "many", "of", "on", "or", "per", "show", "the", "to", "what", "which", "with", "all", "down",
+}
+_NAME_KEYS = ("name", "table", "table_name")
+_COLUMN_NAME_KEYS = ("name", "column", "column_name", "field")
+_DESCRIPTION_KEYS = ("description", "comment", "desc")
+
+
+def tokenize(text: str) -> List[str]:
+    words = _WORD_RE.findall((text or "").lower().replace("_", " "))
+    tokens = []
+    for word in words:
+        if word in _STOPWORDS:
+            continue
+        # crude plural folding: "labours" ~ "labour", "statuses" ~ "status"
+        if len(word) > 4 and word.endswith("es") and word[:-2].endswith(("s", "x", "ch", "sh")):
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def _short(name: str) -> str:
+    """`horizon_extra_work_tool.projects` -> `projects`"""
+    return str(name).split(".")[-1].strip("`")
+
+
+# ---------- schema layout ----------
+
+
+# (table name, table dict, containing dict/list, key in the container)
+_TableRef = Tuple[str, Dict[str, Any], Any, Any]
+
+
+def _walk_tables(node: Any, parent_key: Any = None, container: Any = None, key: Any = None) -> Iterator[_TableRef]:
+    """Every dict with a "columns" dict/list, wherever it sits in the payload (not copied)."""
+    if isinstance(node, dict):
+        columns = node.get("columns")
+        if isinstance(columns, (dict, list)):
+            name = next((node[k] for k in _NAME_KEYS if isinstance(node.get(k), str)), parent_key)
+            if isinstance(name, str):
+                yield _short(name), node, container, key
+                return
+        for k, v in node.items():
+            yield from _walk_tables(v, k, node, k)
+    elif isinstance(node, list):
+        for i, v in enumerate(node):
+            yield from _walk_tables(v, parent_key, node, i)
+
+
+def _columns(table: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    columns = table.get("columns")
+    out: List[Tuple[str, Dict[str, Any]]] = []
+    if isinstance(columns, dict):
+        for name, spec in columns.items():
+            out.append((str(name), spec if isinstance(spec, dict) else {"description": str(spec)}))
+    elif isinstance(columns, list):
+        for item in columns:
+            if isinstance(item, str):
+                out.append((item, {}))
+            elif isinstance(item, dict):
+                name = next((item[k] for k in _COLUMN_NAME_KEYS if isinstance(item.get(k), str)), None)
+                if name:
+                    out.append((name, item))
+    return out
+
+
+def _column_name(item: Any) -> Optional[str]:
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        return next((item[k] for k in _COLUMN_NAME_KEYS if isinstance(item.get(k), str)), None)
+    return None
+
+
+def _description(spec: Dict[str, Any]) -> str:
+    return " ".join(str(spec[k]) for k in _DESCRIPTION_KEYS if spec.get(k))
+
+
+def _relations(schema: Any) -> List[Tuple[str, str, str, str]]:
+    """(table, column, table, column) join keys from "from"/"to" relation entries."""
+    found: List[Tuple[str, str, str, str]] = []
+
+    def visit(node: Any) -> None:
+        if isinstance(node, dict):
+            left, right = node.get("from"), node.get("to")
+            if isinstance(left, str) and isinstance(right, str) and "." in left and "." in right:
+                lt, lc = left.rsplit(".", 1)
+                rt, rc = right.rsplit(".", 1)
+                found.append((_short(lt), lc, _short(rt), rc))
+            for v in node.values():
+                visit(v)
+        elif isinstance(node, list):
+            for v in node:
+                visit(v)
+
+    visit(schema)
+    return found
+
+
+# ---------- index ----------
+
+
+class SchemaDoc(BaseModel):
+    table: str
+    column: Optional[str] = None
+    text: str
+
+
+class PruneResult(BaseModel):
+    content: Any = None
+    tables: List[str]
+    columns: Dict[str, List[str]]
+    kept_columns: int
+    total_columns: int
+
+
+class SchemaIndex:
+    """BM25 (+ embeddings) over one schema payload's tables and columns."""
+
+    def __init__(self, schema: Any, registry: Dict[str, Any] = SCHEMA_REGISTRY):
+        self.schema = schema
+        self.tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.table_descriptions: Dict[str, str] = {}
+        registry_tables = {name: node for name, node, _, _ in _walk_tables(registry)}
+        for table, node, _, _ in _walk_tables(schema):
+            columns = self.tables.setdefault(table, {})
+            for name, spec in _columns(node):
+                columns[name] = spec
+            self.table_descriptions[table] = _description(node)
+        # SCHEMA_REGISTRY descriptions enrich the documents of tables the schema also has
+        self.extra_descriptions: Dict[Tuple[str, Optional[str]], str] = {}
+        for name, node in registry_tables.items():
+            if name not in self.tables:
+                continue
+            self.extra_descriptions[(name, None)] = _description(node)
+            for column, spec in _columns(node):
+                self.extra_descriptions[(name, column)] = _description(spec)
+
+        self.joins: Dict[str, List[Tuple[str, str, str]]] = {}
+        for lt, lc, rt, rc in _relations(schema) + _relations(registry) + self._conventional_joins():
+            if lt in self.tables and rt in self.tables and lt != rt:
+                self.joins.setdefault(lt, []).append((rt, lc, rc))
+                self.joins.setdefault(rt, []).append((lt, rc, lc))
+
+        self.docs: List[SchemaDoc] = []
+        for table, columns in self.tables.items():
+            self.docs.append(SchemaDoc(
+                table=table,
+                text=f"{table} {self.table_descriptions.get(table, '')} {self.extra_descriptions.get((table, None), '')}",
+            ))
+            for column, spec in columns.items():
+                extras = " ".join(str(spec[k]) for k in ("type", "units", "aggregation_hint") if spec.get(k))
+                self.docs.append(SchemaDoc(
+                    table=table,
+                    column=column,
+                    text=f"{table} {column} {extras} {_description(spec)} {self.extra_descriptions.get((table, column), '')}",
+                ))
+        self._doc_tokens = [tokenize(d.text) for d in self.docs]
+        self._avg_len = (sum(len(t) for t in self._doc_tokens) / len(self._doc_tokens)) if self._doc_tokens else 0.0
+        df: Counter = Counter()
+        for tokens in self._doc_tokens:
+            df.update(set(tokens))
+        n = len(self._doc_tokens)
+        self._idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+        self._tf = [Counter(tokens) for tokens in self._doc_tokens]
+        self._vectors: Optional[np.ndarray] = None
+        self._embedding_failed = False
+        self._lock = threading.Lock()
+
+    @property
+    def total_columns(self) -> int:
+        return sum(len(columns) for columns in self.tables.values())
+
+    def _conventional_joins(self) -> List[Tuple[str, str, str, str]]:
+        joins = []
+        for table, columns in self.tables.items():
+            for column in columns:
+                if not column.endswith("_id"):
+                    continue
+                stem = column[:-3]
+                for target in (stem + "s", stem + "es", stem):
+                    if target != table and "id" in self.tables.get(target, {}):
+                        joins.append((table, column, target, "id"))
+                        break
+        return joins
+
+    # ----- scoring -----
+
+    def bm25(self, query: str) -> np.ndarray:
+        terms = tokenize(query)
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        for i, tf in enumerate(self._tf):
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(self._doc_tokens[i]) / (self._avg_len or 1.0))
+            for term in terms:
+                f = tf.get(term)
+                if f:
+                    scores[i] += self._idf[term] * f * (BM25_K1 + 1) / (f + length_norm)
+        return scores
+
+    def _embed_docs(self) -> Optional[np.ndarray]:
+        with self._lock:
+            if self._vectors is None and not self._embedding_failed:
+                try:
+                    from app.models.embeddings import get_embeddings
+
+                    vectors = np.asarray(get_embeddings().embed_documents([d.text for d in self.docs]), dtype=np.float32)
+                    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                    self._vectors = vectors / np.where(norms == 0, 1, norms)
+                except Exception as e:
+                    self._embedding_failed = True
+                    log.warning(f"Schema index: embeddings unavailable, ranking with BM25 only: {e}")
+            return self._vectors
+
+    def dense(self, query: str) -> Optional[np.ndarray]:
+        vectors = self._embed_docs()
+        if vectors is None:
+            return None
+        from app.models.embeddings import get_embeddings
+
+        vector = np.asarray(get_embeddings().embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vectors @ (vector / norm if norm else vector)
+
+    def rank(self, query: str) -> np.ndarray:
+        """Reciprocal-rank-fused score per document."""
+        fused = np.zeros(len(self.docs), dtype=np.float32)
+        for scores in (self.bm25(query), self.dense(query)):
+            if scores is None:
+                continue
+            order = np.argsort(-scores, kind="stable")
+            ranks = np.empty(len(order), dtype=np.float32)
+            ranks[order] = np.arange(1, len(order) + 1)
+            # Documents without any lexical match get no BM25 credit
+            fused += np.where(scores > 0, 1.0 / (RRF_K + ranks), 0.0)
+        return fused
+
+    # ----- selection -----
+
+    def _join_path(self, start: str, goal: str) -> List[Tuple[str, str, str, str]]:
+        """Shortest join path as (table, column, table, column) edges."""
+        previous: Dict[str, Tuple[str, str, str]] = {start: ("", "", "")}
+        queue = deque([start])
+        while queue:
+            table = queue.popleft()
+            if table == goal:
+                break
+            for target, column, target_column in self.joins.get(table, []):
+                if target not in previous:
+                    previous[target] = (table, column, target_column)
+                    queue.append(target)
+        if goal not in previous:
+            return []
+        path = []
+        node = goal
+        while node != start:
+            source, column, target_column = previous[node]
+            path.append((source, column, node, target_column))
+            node = source
+        return path
+
+    def select(self, query: str, top_n: int, pinned: Sequence[str] = ()) -> Dict[str, Set[str]]:
+        """table -> kept columns for `query`."""
+        scores = self.rank(query)
+        order = [i for i in np.argsort(-scores, kind="stable") if scores[i] > 0]
+        keep: Dict[str, Set[str]] = OrderedDict()
+        for i in order:
+            doc = self.docs[i]
+            if doc.column is None:
+                keep.setdefault(doc.table, set())
+                continue
+            if sum(len(c) for c in keep.values()) >= top_n:
+                break
+            keep.setdefault(doc.table, set()).add(doc.column)
+        if not keep:
+            return {}
+
+        tables = list(keep)
+        anchor = tables[0]
+        for table in tables[1:]:
+            for source, column, target, target_column in self._join_path(anchor, table):
+                keep.setdefault(source, set()).add(column)
+                keep.setdefault(target, set()).add(target_column)
+
+        pinned_by_table: Dict[str, Set[str]] = {}
+        for item in pinned:
+            if "." in item:
+                table, column = item.rsplit(".", 1)
+                pinned_by_table.setdefault(_short(table), set()).add(column)
+        for table, columns in keep.items():
+            available = self.tables.get(table, {})
+            for column, spec in available.items():
+                if spec.get("pk") or spec.get("primary") or column == "id" or column in pinned_by_table.get(table, ()):
+                    columns.add(column)
+        return keep
+
+    def prune(self, query: str, top_n: int, pinned: Sequence[str] = ()) -> Optional[PruneResult]:
+        keep = self.select(query, top_n, pinned)
+        if not keep:
+            return None
+        content = copy.deepcopy(self.schema)
+        removals: List[Tuple[Any, Any]] = []
+        for table, node, container, key in _walk_tables(content):
+            if table not in keep:
+                if container is not None:
+                    removals.append((container, key))
+                continue
+            wanted = keep[table]
+            columns = node.get("columns")
+            if isinstance(columns, dict):
+                node["columns"] = {k: v for k, v in columns.items() if k in wanted}
+            else:
+                node["columns"] = [c for c in columns if _column_name(c) in wanted]
+        # Delete list items back to front so indexes stay valid
+        for container, key in sorted(removals, key=lambda r: r[1] if isinstance(r[1], int) else -1, reverse=True):
+            if isinstance(container, dict):
+                container.pop(key, None)
+            elif isinstance(container, list) and isinstance(key, int) and key < len(container):
+                container.pop(key)
+        kept = sum(len(c) for c in keep.values())
+        return PruneResult(
+            content=content,
+            tables=list(keep),
+            columns={t: sorted(c) for t, c in keep.items()},
+            kept_columns=kept,
+            total_columns=self.total_columns,
+        )
+
+
+class SchemaIndexCache:
+    """One SchemaIndex per schema payload (by content digest), LRU-bounded."""
+
+    def __init__(self, max_indexes: int = MAX_INDEXES):
+        self.max_indexes = max_indexes
+        self._indexes: "OrderedDict[str, SchemaIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index_for(self, schema: Any) -> SchemaIndex:
+        raw = json.dumps(schema, ensure_ascii=False, sort_keys=True, default=str)
+        key = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+        index = SchemaIndex(schema)
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def prune_sync(self, schema: Any, question: str, top_n: int) -> Optional[PruneResult]:
+        pinned = [c.strip() for c in (settings.SQL_SCHEMA_PINNED_COLUMNS or "").split(",") if c.strip()]
+        result = self.index_for(schema).prune(question, top_n, pinned)
+        if result is not None and result.total_columns:
+            SCHEMA_PRUNE_COLUMNS.observe(result.kept_columns / result.total_columns)
+        return result
+
+    async def prune(self, schema: Any, question: str, top_n: int) -> Optional[PruneResult]:
+        """Pruned schema for `question`, or None when nothing matched (send the full schema)."""
+        # Index building and embedding are CPU / model work: off the event loop
+        return await asyncio.to_thread(self.prune_sync, schema, question, top_n)
+
+
+schema_index = SchemaIndexCache()
@@ -0,0 +1,255 @@
+"""
+Semantic answer cache for FAQ-style traffic.
+
+Past (question, intent, answer) entries are embedded with the shared
+HG_EMBEDDING_MODEL and kept in a per-intent in-memory vector index. A new
+question whose normalized form is similar enough to a cached one (cosine
+similarity >= the intent's threshold) reuses its answer:
+
+- app_info: the final app_info_node response;
+- text_to_sql: the generated SQL (stored only after it executed
+  successfully), so sqlexec still runs against live data.
+
+Guards:
+- follow-ups that depend on the chat history are neither looked up nor
+  stored;
+- for text_to_sql, both questions must have the same content words (the
+  normalized question minus function words such as "the", "show", "of").
+  At a 0.95 similarity, "projects for tesco" / "projects for asda", "open"
+  / "closed" projects and "this month" / "last month" embed almost alike
+  but need different SQL; the embedding only bridges word order and
+  phrasing ("show me the open projects" ~ "list open projects").
+
+Thresholds, TTLs and capacity are per intent (SEMANTIC_CACHE_*). Stale
+entries can be dropped with `semantic_cache.invalidate(...)` or
+POST /horizon/semantic-cache/invalidate.
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, FrozenSet, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.services.intent_classifier import is_follow_up
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.services.semantic_cache")
+
+SEMANTIC_CACHE_LOOKUPS = REGISTRY.counter(
+    "horizon_semantic_cache_lookups_total", "Semantic cache lookups by intent and result (hit, miss, skipped)."
+)
+SEMANTIC_CACHE_SIMILARITY = REGISTRY.histogram(
+    "horizon_semantic_cache_similarity",
+    "Best cosine similarity found per semantic cache lookup.",
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.92, 0.94, 0.96, 0.98, 1.0),
+)
+
+# Intents whose answers depend on every content word of the question
+ENTITY_GUARDED_INTENTS = {"text_to_sql"}
+
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s'\"-]")
+# Words that do not change which rows a question asks for. Deliberately
+# short: anything that could be a filter or grouping ("this", "last",
+# "open", "not", "by", "and", numbers) must stay a content word.
+_STOPWORDS = frozenset(
+    """
+    a an the of in on at to for from about as is are was were be been do does did
+    me my i we our us you your please can could would will show list give get find display tell
+    what which who whom whose how there here that
+    """.split()
+)
+
+
+def normalize_question(text: str) -> str:
+    text = _PUNCT_RE.sub(" ", (text or "").lower())
+    return _WS_RE.sub(" ", text).strip()
+
+
+def content_words(text: str) -> FrozenSet[str]:
+    """Normalized words of a question that can change its answer (see module docstring)."""
+    words = (w.strip("'\"-") for w in normalize_question(text).split())
+    return frozenset(w for w in words if w and w not in _STOPWORDS)
+
+
+def _parse_map(raw: str, cast) -> Dict[str, Any]:
+    if not raw:
+        return {}
+    try:
+        return {str(k): cast(v) for k, v in json.loads(raw).items()}
+    except (ValueError, AttributeError, TypeError):
+        log.warning(f"Invalid semantic cache setting {raw!r}; ignoring")
+        return {}
+
+
+def _guard(intent: str, question: str) -> FrozenSet[str]:
+    return content_words(question) if intent in ENTITY_GUARDED_INTENTS else frozenset()
+
+
+class SemanticHit(BaseModel):
+    intent: str
+    question: str
+    answer: Any
+    similarity: float
+
+
+class _IntentIndex:
+    def __init__(self):
+        self.questions: List[str] = []
+        # content words of guarded intents, empty otherwise
+        self.guards: List[FrozenSet[str]] = []
+        self.answers: List[Any] = []
+        self.expires: List[float] = []
+        self.vectors: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def keep(self, mask: np.ndarray) -> int:
+        """Keep only entries where `mask` is True; returns number removed."""
+        removed = int((~mask).sum())
+        if removed:
+            idx = np.flatnonzero(mask)
+            self.questions = [self.questions[i] for i in idx]
+            self.guards = [self.guards[i] for i in idx]
+            self.answers = [self.answers[i] for i in idx]
+            self.expires = [self.expires[i] for i in idx]
+            self.vectors = self.vectors[idx] if self.vectors is not None and len(idx) else None
+        return removed
+
+
+class SemanticCache:
+    def __init__(self):
+        self.thresholds: Dict[str, float] = _parse_map(settings.SEMANTIC_CACHE_THRESHOLDS, float)
+        self.ttls: Dict[str, int] = _parse_map(settings.SEMANTIC_CACHE_TTLS, int)
+        self.max_entries = settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self._indexes: Dict[str, _IntentIndex] = {}
+        self._lock = threading.Lock()
+
+    def enabled_for(self, intent: str) -> bool:
+        return settings.SEMANTIC_CACHE_ENABLED and intent in self.thresholds and self.ttls.get(intent, 0) > 0
+
+    @staticmethod
+    def _embed(text: str) -> np.ndarray:
+        from app.models.embeddings import get_embeddings
+
+        vector = np.asarray(get_embeddings().embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _search(self, intent: str, vector: np.ndarray, guard: FrozenSet[str]) -> Optional[SemanticHit]:
+        with self._lock:
+            index = self._indexes.get(intent)
+            if index is None or not len(index):
+                return None
+            now = time.time()
+            index.keep(np.asarray([exp > now for exp in index.expires], dtype=bool))
+            if not len(index):
+                return None
+            sims = index.vectors @ vector
+            best = int(np.argmax(sims))
+            similarity = float(sims[best])
+            SEMANTIC_CACHE_SIMILARITY.observe(similarity, intent=intent)
+            if similarity < self.thresholds[intent]:
+                return None
+            if index.guards[best] != guard:
+                return None
+            return SemanticHit(
+                intent=intent, question=index.questions[best], answer=index.answers[best], similarity=round(similarity, 4)
+            )
+
+    async def lookup(self, intent: str, question: str, has_history: bool = False) -> Optional[SemanticHit]:
+        if not self.enabled_for(intent):
+            return None
+        if is_follow_up(question, has_history):
+            SEMANTIC_CACHE_LOOKUPS.inc(intent=intent, result="skipped")
+            return None
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        try:
+            vector = await asyncio.to_thread(self._embed, normalized)
+        except Exception as e:
+            log.warning(f"Semantic cache lookup skipped, embedding failed: {e}")
+            SEMANTIC_CACHE_LOOKUPS.inc(intent=intent, result="skipped")
+            return None
+        hit = self._search(intent, vector, _guard(intent, question))
+        SEMANTIC_CACHE_LOOKUPS.inc(intent=intent, result="hit" if hit else "miss")
+        if hit:
+            log.info(f"Semantic cache hit for {intent} (similarity={hit.similarity}): {question!r} ~ {hit.question!r}")
+        return hit
+
+    async def store(self, intent: str, question: str, answer: Any, has_history: bool = False) -> None:
+        if not self.enabled_for(intent) or answer in (None, "", [], {}):
+            return
+        if is_follow_up(question, has_history):
+            return
+        normalized = normalize_question(question)
+        if not normalized:
+            return
+        try:
+            vector = await asyncio.to_thread(self._embed, normalized)
+        except Exception as e:
+            log.warning(f"Semantic cache store skipped, embedding failed: {e}")
+            return
+        with self._lock:
+            index = self._indexes.setdefault(intent, _IntentIndex())
+            if normalized in index.questions:
+                # refresh the existing entry instead of duplicating it
+                index.keep(np.asarray([q != normalized for q in index.questions], dtype=bool))
+            index.questions.append(normalized)
+            index.guards.append(_guard(intent, question))
+            index.answers.append(answer)
+            index.expires.append(time.time() + self.ttls[intent])
+            index.vectors = vector[None, :] if index.vectors is None else np.vstack([index.vectors, vector])
+            if len(index) > self.max_entries:
+                overflow = len(index) - self.max_entries
+                index.keep(np.arange(len(index)) >= overflow)
+
+    def invalidate(self, intent: Optional[str] = None, match: Optional[str] = None) -> int:
+        """
+        Drop cached entries. With no arguments everything goes; `intent`
+        limits to one intent and `match` to questions or answers containing
+        that text (e.g. a table name after a schema change).
+        """
+        needle = (match or "").lower()
+        removed = 0
+        with self._lock:
+            for name, index in list(self._indexes.items()):
+                if intent and name != intent:
+                    continue
+                if not needle:
+                    removed += len(index)
+                    del self._indexes[name]
+                    continue
+                mask = np.asarray(
+                    [
+                        needle not in q and needle not in json.dumps(a, default=str).lower()
+                        for q, a in zip(index.questions, index.answers)
+                    ],
+                    dtype=bool,
+                )
+                removed += index.keep(mask)
+        log.info(f"Semantic cache invalidated {removed} entries (intent={intent}, match={match!r})")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = {name: len(index) for name, index in self._indexes.items()}
+        return {
+            "enabled": settings.SEMANTIC_CACHE_ENABLED,
+            "thresholds": self.thresholds,
+            "ttls": self.ttls,
+            "max_entries_per_intent": self.max_entries,
+            "entries": sizes,
+        }
+
+
+semantic_cache = SemanticCache()
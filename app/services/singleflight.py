@@ -0,0 +1,120 @@
+"""
+Single-flight coalescing for identical concurrent calls.
+
+While a call for a key is running, further calls with the same key await
+its result instead of starting their own execution. The execution runs in
+its own task, so a caller that disconnects does not cancel it for the
+others; it is cancelled once no caller is left. Successful results can optionally be kept for a while after
+completion (idempotency window), so client retries get the same answer
+without re-running anything.
+
+State is per process; workers do not share in-flight calls.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.services.singleflight")
+
+SINGLE_FLIGHT_CALLS = REGISTRY.counter(
+    "horizon_singleflight_calls_total", "Engine calls by single-flight outcome (executed, coalesced, replayed)."
+)
+SINGLE_FLIGHT_INFLIGHT = REGISTRY.gauge(
+    "horizon_singleflight_inflight", "Distinct engine executions currently in flight."
+)
+
+
+def request_key(*parts: Any) -> str:
+    raw = json.dumps(parts, ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self, name: str, max_completed: int = 1000):
+        self.name = name
+        self.max_completed = max_completed
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        # key -> (expires_at, result), oldest first
+        self._completed: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def _lookup_completed(self, key: str) -> Tuple[bool, Any]:
+        entry = self._completed.get(key)
+        if entry is None:
+            return False, None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            self._completed.pop(key, None)
+            return False, None
+        return True, result
+
+    def _remember(self, key: str, result: Any, ttl: float) -> None:
+        self._completed[key] = (time.monotonic() + ttl, result)
+        self._completed.move_to_end(key)
+        while len(self._completed) > self.max_completed:
+            self._completed.popitem(last=False)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], keep_for: Optional[float] = None) -> Any:
+        """
+        Run `fn()` once per `key` among concurrent callers. With `keep_for`
+        (seconds), a successful result is also returned to callers arriving
+        after completion until it expires.
+        """
+        found, result = self._lookup_completed(key)
+        if found:
+            SINGLE_FLIGHT_CALLS.inc(flight=self.name, outcome="replayed")
+            log.info(f"[{self.name}] replaying completed result for key={key[:12]}")
+            return result
+
+        task = self._inflight.get(key)
+        if task is not None:
+            SINGLE_FLIGHT_CALLS.inc(flight=self.name, outcome="coalesced")
+            log.info(f"[{self.name}] coalescing onto in-flight execution key={key[:12]}")
+            return await self._wait(key, task)
+
+        SINGLE_FLIGHT_CALLS.inc(flight=self.name, outcome="executed")
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        SINGLE_FLIGHT_INFLIGHT.set(len(self._inflight), flight=self.name)
+
+        def _done(t: asyncio.Task) -> None:
+            self._inflight.pop(key, None)
+            self._waiters.pop(key, None)
+            SINGLE_FLIGHT_INFLIGHT.set(len(self._inflight), flight=self.name)
+            if t.cancelled():
+                return
+            if t.exception() is None and keep_for:
+                self._remember(key, t.result(), keep_for)
+
+        task.add_done_callback(_done)
+        return await self._wait(key, task)
+
+    async def _wait(self, key: str, task: asyncio.Task) -> Any:
+        # Callers are shielded from each other; the execution is only
+        # cancelled once every caller waiting on it has gone away.
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            remaining = self._waiters.get(key, 1) - 1
+            self._waiters[key] = remaining
+            if remaining <= 0 and not task.done():
+                log.info(f"[{self.name}] last caller left, cancelling execution key={key[:12]}")
+                task.cancel()
+            raise
+        finally:
+            if task.done():
+                self._waiters.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": len(self._inflight),
+            "completed_cached": len(self._completed),
+        }
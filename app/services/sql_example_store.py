@@ -0,0 +1,398 @@
+"""
+Verified text-to-SQL examples, retrieved as few-shot examples for sqlgen.
+
+sqlgen_node used to send the same two static examples with every SQL
+prompt. Every question whose SQL executed and returned rows is now kept
+as an example (question, schema modules, SQL, row count) in a JSONL file
+with an embedding index next to it (HG_EMBEDDING_MODEL, `.npz`). For a
+new question the most similar examples (cosine >= SQL_EXAMPLES_MIN_SIMILARITY,
+written against modules the question also selected) replace the static
+block of the second SQL prompt; with none, the static block is kept.
+
+- dedup: an example replaces an older one with the same normalized
+  question, the same normalized SQL, or a near-identical question
+  (similarity >= SQL_EXAMPLES_DEDUP_SIMILARITY);
+- eviction: beyond SQL_EXAMPLES_CAPACITY the least recently used example
+  (retrieved or stored) goes;
+- follow-ups that only make sense with the chat history are not stored.
+
+The file is rewritten by the process that changes it; other workers see
+the change after a restart. Offline maintenance (dedup, re-embedding,
+seeding from curated questions) is
+
+    python -m app.services.sql_example_store rebuild [--seed FILE] [--verify]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.services.intent_classifier import is_follow_up
+from app.services.semantic_cache import normalize_question
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.services.sql_example_store")
+
+SQL_EXAMPLE_EVENTS = REGISTRY.counter(
+    "horizon_sql_examples_total",
+    "SQL example store events (added, replaced, evicted, skipped) and lookups (hit, miss).",
+)
+
+_SQL_WS_RE = re.compile(r"\s+")
+_SQL_TABLE_RE = re.compile(r"\b(?:from|join)\s+[`\w]+\.`?(\w+)`?|\b(?:from|join)\s+`?(\w+)`?", re.I)
+
+
+def normalize_sql(sql: str) -> str:
+    return _SQL_WS_RE.sub(" ", (sql or "").strip().rstrip(";")).lower()
+
+
+class SqlExample(BaseModel):
+    question: str
+    # normalize_question(question): dedup key and embedded text
+    normalized: str
+    modules: List[str] = []
+    sql: str
+    row_count: Optional[int] = None
+    created_at: float
+    last_used_at: float
+    uses: int = 0
+
+
+class ScoredExample(BaseModel):
+    example: SqlExample
+    similarity: float
+
+
+class SqlExampleStore:
+    def __init__(self, path: str, capacity: int):
+        self.path = path
+        self.capacity = capacity
+        self._examples: List[SqlExample] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.splitext(self.path)[0] + ".npz"
+
+    @staticmethod
+    def _embed(texts: Sequence[str]) -> np.ndarray:
+        from app.models.embeddings import get_embeddings
+
+        vectors = np.asarray(get_embeddings().embed_documents(list(texts)), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    # ---------- persistence ----------
+
+    def _read_examples(self) -> List[SqlExample]:
+        if not os.path.exists(self.path):
+            return []
+        examples = []
+        with open(self.path, encoding="utf-8") as fh:
+            for number, line in enumerate(fh, 1):
+                if not line.strip():
+                    continue
+                try:
+                    examples.append(SqlExample(**json.loads(line)))
+                except Exception as e:
+                    log.warning(f"Skipping invalid SQL example {self.path}:{number}: {e}")
+        return examples
+
+    def _read_index(self, examples: List[SqlExample]) -> Optional[np.ndarray]:
+        """Saved vectors, if they were built for these questions with the current model."""
+        try:
+            with np.load(self.index_path, allow_pickle=False) as saved:
+                if str(saved["model"]) != settings.HG_EMBEDDING_MODEL:
+                    return None
+                if list(saved["questions"]) != [e.normalized for e in examples]:
+                    return None
+                return saved["vectors"].astype(np.float32)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            examples = self._read_examples()
+            vectors = self._read_index(examples) if examples else None
+            if examples and vectors is None:
+                log.info(f"Embedding {len(examples)} SQL examples from {self.path}")
+                vectors = self._embed([e.normalized for e in examples])
+            self._examples, self._vectors = examples, vectors
+            self._loaded = True
+            log.info(f"SQL example store loaded {len(examples)} examples")
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            for example in self._examples:
+                fh.write(json.dumps(example.model_dump(), ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+        if self._vectors is not None and len(self._examples):
+            tmp_index = self.index_path + ".tmp.npz"
+            np.savez(
+                tmp_index,
+                vectors=self._vectors,
+                questions=np.asarray([e.normalized for e in self._examples]),
+                model=np.asarray(settings.HG_EMBEDDING_MODEL),
+            )
+            os.replace(tmp_index, self.index_path)
+        elif os.path.exists(self.index_path):
+            os.remove(self.index_path)
+
+    # ---------- write path ----------
+
+    def _add(self, example: SqlExample, vector: np.ndarray) -> str:
+        """Insert with dedup and eviction (lock held); returns the outcome."""
+        replaced = []
+        sql_key = normalize_sql(example.sql)
+        sims = self._vectors @ vector if self._vectors is not None and len(self._examples) else None
+        for i, existing in enumerate(self._examples):
+            if (
+                existing.normalized == example.normalized
+                or normalize_sql(existing.sql) == sql_key
+                or (sims is not None and sims[i] >= settings.SQL_EXAMPLES_DEDUP_SIMILARITY)
+            ):
+                replaced.append(i)
+        if replaced:
+            # A refreshed example carries over how often its predecessors were used
+            example.uses += sum(self._examples[i].uses for i in replaced)
+            self._keep([i for i in range(len(self._examples)) if i not in set(replaced)])
+        self._examples.append(example)
+        self._vectors = vector[None, :] if self._vectors is None else np.vstack([self._vectors, vector])
+        overflow = len(self._examples) - self.capacity
+        if overflow > 0:
+            by_recency = sorted(range(len(self._examples)), key=lambda i: self._examples[i].last_used_at)
+            evicted = set(by_recency[:overflow])
+            self._keep([i for i in range(len(self._examples)) if i not in evicted])
+            SQL_EXAMPLE_EVENTS.inc(event="evicted", amount=overflow)
+        return "replaced" if replaced else "added"
+
+    def _keep(self, indexes: List[int]) -> None:
+        self._examples = [self._examples[i] for i in indexes]
+        self._vectors = self._vectors[indexes] if self._vectors is not None and indexes else None
+
+    def record_sync(self, question: str, modules: Sequence[str], sql: str, row_count: Optional[int]) -> Optional[str]:
+        normalized = normalize_question(question)
+        if not normalized or not sql:
+            return None
+        self.load()
+        vector = self._embed([normalized])[0]
+        now = time.time()
+        example = SqlExample(
+            question=question.strip(),
+            normalized=normalized,
+            modules=sorted(set(modules)),
+            sql=sql.strip(),
+            row_count=row_count,
+            created_at=now,
+            last_used_at=now,
+        )
+        with self._lock:
+            outcome = self._add(example, vector)
+            self._save()
+        SQL_EXAMPLE_EVENTS.inc(event=outcome)
+        return outcome
+
+    async def record(
+        self,
+        question: str,
+        modules: Optional[Sequence[str]],
+        sql: Optional[str],
+        row_count: Optional[int],
+        has_history: bool = False,
+    ) -> None:
+        """Keep SQL that executed and returned rows as an example for similar questions."""
+        if not settings.SQL_EXAMPLES_ENABLED or not sql or modules is None:
+            return
+        if not row_count or is_follow_up(question, has_history):
+            SQL_EXAMPLE_EVENTS.inc(event="skipped")
+            return
+        try:
+            await asyncio.to_thread(self.record_sync, question, list(modules), sql, row_count)
+        except Exception as e:
+            log.warning(f"SQL example not stored: {e}")
+
+    # ---------- read path ----------
+
+    def search_sync(self, question: str, limit: int) -> List[ScoredExample]:
+        normalized = normalize_question(question)
+        self.load()
+        with self._lock:
+            if not normalized or self._vectors is None or not self._examples:
+                return []
+        vector = self._embed([normalized])[0]
+        with self._lock:
+            if self._vectors is None:
+                return []
+            sims = self._vectors @ vector
+            order = np.argsort(-sims)[:limit]
+            return [
+                ScoredExample(example=self._examples[i], similarity=round(float(sims[i]), 4))
+                for i in order
+                if sims[i] >= settings.SQL_EXAMPLES_MIN_SIMILARITY
+            ]
+
+    async def search(self, question: str) -> List[ScoredExample]:
+        """
+        Candidates for `question`, best first (a few more than
+        SQL_EXAMPLES_TOP_K, so `choose` can still filter by modules).
+        Started before module selection; failures just mean no examples.
+        """
+        if not settings.SQL_EXAMPLES_ENABLED or settings.SQL_EXAMPLES_TOP_K <= 0:
+            return []
+        try:
+            return await asyncio.to_thread(self.search_sync, question, settings.SQL_EXAMPLES_TOP_K * 4)
+        except Exception as e:
+            log.warning(f"SQL example lookup failed: {e}")
+            return []
+
+    def choose(self, candidates: List[ScoredExample], modules: Sequence[str]) -> List[SqlExample]:
+        """Top-k candidates written against modules the question also uses."""
+        available = set(modules)
+        chosen = [
+            c.example for c in candidates if not c.example.modules or available.issuperset(c.example.modules)
+        ][: settings.SQL_EXAMPLES_TOP_K]
+        SQL_EXAMPLE_EVENTS.inc(event="hit" if chosen else "miss")
+        now = time.time()
+        with self._lock:
+            for example in chosen:
+                example.last_used_at = now
+                example.uses += 1
+        return chosen
+
+    # ---------- maintenance ----------
+
+    def rebuild(self, seeds: Sequence[SqlExample] = ()) -> Dict[str, int]:
+        """Re-read the file, merge `seeds`, dedup and cap, re-embed everything and rewrite both files."""
+        with self._lock:
+            examples = sorted(self._read_examples() + list(seeds), key=lambda e: e.last_used_at)
+            self._examples, self._vectors = [], None
+            if examples:
+                vectors = self._embed([e.normalized for e in examples])
+                for example, vector in zip(examples, vectors):
+                    self._add(example, vector)
+            self._loaded = True
+            self._save()
+            return {"read": len(examples), "kept": len(self._examples)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": settings.SQL_EXAMPLES_ENABLED,
+                "loaded": self._loaded,
+                "path": self.path,
+                "examples": len(self._examples),
+                "capacity": self.capacity,
+            }
+
+
+def render_examples(examples: Sequence[SqlExample]) -> str:
+    """Examples block for sql_system_prompt()."""
+    lines = [
+        "====================",
+        "EXAMPLES",
+        "====================",
+        "",
+        "Verified queries for similar questions; they ran successfully on this database.",
+        "Follow their joins and columns where they fit, but only apply the filters, grouping",
+        "and limits the current question asks for.",
+        "",
+    ]
+    for example in examples:
+        lines.append(f"Question: {example.question}")
+        lines.append(json.dumps({"sql": example.sql}, ensure_ascii=False))
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def modules_for_sql(sql: str) -> List[str]:
+    """Best-effort schema modules of a seed query: `<table>_module` for every table that has one."""
+    from app.services.schema_cache import SCHEMA_MODULES
+
+    tables = {a or b for a, b in _SQL_TABLE_RE.findall(sql)}
+    return sorted(f"{t}_module" for t in tables if f"{t}_module" in SCHEMA_MODULES)
+
+
+sql_examples = SqlExampleStore(settings.SQL_EXAMPLES_PATH, settings.SQL_EXAMPLES_CAPACITY)
+
+
+# ---------- offline rebuild ----------
+
+
+async def _verify(seeds: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Seeds whose SQL runs through execute-sql and returns rows (row_count filled in)."""
+    from app.controllers.tool_impl import tool_execute_sql
+
+    verified = []
+    for seed in seeds:
+        try:
+            result = await tool_execute_sql(seed["sql"])
+        except Exception as e:
+            print(f"seed failed: {seed['question']!r}: {e!r}", file=sys.stderr)
+            continue
+        rows = result.get("rows", result.get("data")) if isinstance(result, dict) else result
+        if isinstance(result, dict) and result.get("error") or not isinstance(rows, list) or not rows:
+            print(f"seed returned no rows: {seed['question']!r}", file=sys.stderr)
+            continue
+        verified.append({**seed, "row_count": len(rows)})
+    return verified
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Maintain the SQL few-shot example store.")
+    sub = p.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="dedup, cap and re-embed the store (optionally adding seeds)")
+    rebuild.add_argument("--path", default=None, help="store JSONL (default: SQL_EXAMPLES_PATH)")
+    rebuild.add_argument("--seed", help="JSONL of {question, sql[, modules, row_count]} to add")
+    rebuild.add_argument("--verify", action="store_true", help="only add seeds whose SQL executes with rows")
+    sub.add_parser("stats", help="print the number of stored examples")
+    args = p.parse_args(sys.argv[1:] if argv is None else argv)
+
+    store = sql_examples if not getattr(args, "path", None) else SqlExampleStore(args.path, settings.SQL_EXAMPLES_CAPACITY)
+    if args.command == "stats":
+        store.load()
+        print(json.dumps(store.stats(), indent=2))
+        return 0
+
+    seeds: List[SqlExample] = []
+    if args.seed:
+        with open(args.seed, encoding="utf-8") as fh:
+            raw = [json.loads(line) for line in fh if line.strip()]
+        if args.verify:
+            raw = asyncio.run(_verify(raw))
+        now = time.time()
+        for item in raw:
+            seeds.append(SqlExample(
+                question=item["question"].strip(),
+                normalized=normalize_question(item["question"]),
+                modules=item.get("modules") or modules_for_sql(item["sql"]),
+                sql=item["sql"].strip(),
+                row_count=item.get("row_count"),
+                created_at=now,
+                last_used_at=now,
+            ))
+    print(json.dumps(store.rebuild(seeds), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+Result cache for Laravel execute-sql.
+
+sqlexec_node sent every query to Laravel, even when the same SQL had run
+seconds earlier (follow-ups, dashboards, the semantic and template caches
+producing the same SQL again). Successful results are now kept per
+normalized SQL:
+
+- key: SHA-256 of the SQL after canonicalization: comments and the
+  trailing `;` dropped, whitespace collapsed, keywords and identifiers
+  lower-cased (backticks removed), string literals single-quoted with
+  their content kept as is, numbers canonical (`007` -> `7`, `1.50` -> `1.5`);
+- TTL: the smallest SQL_RESULT_CACHE_TTLS value among the tables the
+  query reads (FROM / JOIN / comma joins), SQL_RESULT_CACHE_DEFAULT_TTL
+  for tables not listed; a table with TTL 0 is never cached;
+- size: results are stored serialized and bounded by their byte size
+  (SQL_RESULT_CACHE_MAX_BYTES in total, SQL_RESULT_CACHE_MAX_ENTRY_BYTES
+  per result), evicting least recently used entries first;
+- invalidation by table: POST /horizon/sql-result-cache/invalidate
+  {"tables": ["projects", "project_financials"]}, for Laravel to call when
+  those tables change (X-Webhook-Secret must match
+  SQL_RESULT_CACHE_WEBHOOK_SECRET when it is set). Each invalidation bumps
+  the tables' generation; a query that was already running when it came
+  in is answered but not cached.
+
+Identical concurrent queries share one Laravel call. The cache is per
+process: with several workers a webhook call reaches one of them and the
+others serve until their TTL runs out.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.db.replica import execute_sql
+from app.services.singleflight import SingleFlight
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.services.sql_result_cache")
+
+SQL_RESULT_CACHE_LOOKUPS = REGISTRY.counter(
+    "horizon_sql_result_cache_lookups_total", "execute-sql result cache lookups by result (hit, miss, bypass)."
+)
+SQL_RESULT_CACHE_BYTES = REGISTRY.gauge(
+    "horizon_sql_result_cache_bytes", "Serialized bytes held by the execute-sql result cache."
+)
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|\#[^\n]*|/\*.*?\*/)
+    |(?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+    |(?P<ident>`[^`]+`)
+    |(?P<number>\d+\.\d*|\.\d+|\d+)
+    |(?P<word>[A-Za-z_][\w$]*)
+    |(?P<op><=|>=|<>|!=|\|\||&&|[^\s\w])
+    """,
+    re.S | re.X,
+)
+# Words that end a FROM list or cannot be a table alias
+_CLAUSE_WORDS = {
+    "where", "group", "order", "having", "limit", "join", "left", "right", "inner", "outer", "cross",
+    "straight_join", "natural", "on", "using", "union", "window", "for", "lock", "into", "procedure",
+}
+
+
+def _tokens(sql: str) -> List[Tuple[str, str]]:
+    out = []
+    for m in _TOKEN_RE.finditer(sql or ""):
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "comment":
+            continue
+        if kind == "string":
+            quote = value[0]
+            body = value[1:-1].replace(quote * 2, quote)
+            value = "'" + body.replace("'", "''") + "'"
+        elif kind == "ident":
+            kind, value = "word", value[1:-1].lower()
+        elif kind == "number":
+            try:
+                number = Decimal(value).normalize()
+                value = format(number, "f")
+            except InvalidOperation:
+                pass
+        else:
+            value = value.lower()
+        out.append((kind, value))
+    while out and out[-1] == ("op", ";"):
+        out.pop()
+    return out
+
+
+def normalize_sql(sql: str) -> str:
+    """Canonical SQL text (see module docstring)."""
+    return " ".join(value for _, value in _tokens(sql))
+
+
+def sql_key(sql: str) -> str:
+    return hashlib.sha256(normalize_sql(sql).encode("utf-8")).hexdigest()
+
+
+def sql_tables(sql: str) -> Set[str]:
+    """Unqualified names of the tables a query reads."""
+    tokens = _tokens(sql)
+    tables: Set[str] = set()
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        if not (kind == "word" and value in ("from", "join")):
+            i += 1
+            continue
+        i += 1
+        while i < len(tokens):
+            if tokens[i] == ("op", "("):
+                # derived table: its own FROM is picked up by the outer loop
+                break
+            if tokens[i][0] != "word":
+                break
+            name = tokens[i][1]
+            i += 1
+            while i + 1 < len(tokens) and tokens[i] == ("op", ".") and tokens[i + 1][0] == "word":
+                name = tokens[i + 1][1]
+                i += 2
+            tables.add(name)
+            # optional alias
+            if i < len(tokens) and tokens[i] == ("word", "as"):
+                i += 2
+            elif i < len(tokens) and tokens[i][0] == "word" and tokens[i][1] not in _CLAUSE_WORDS:
+                i += 1
+            if i < len(tokens) and tokens[i] == ("op", ","):
+                i += 1
+                continue
+            break
+    return tables
+
+
+def _parse_ttls(raw: str) -> Dict[str, int]:
+    if not raw:
+        return {}
+    try:
+        return {str(k).lower(): int(v) for k, v in json.loads(raw).items()}
+    except (ValueError, AttributeError, TypeError):
+        log.warning(f"Invalid SQL_RESULT_CACHE_TTLS {raw!r}; using the default TTL for every table")
+        return {}
+
+
+class _Entry(BaseModel):
+    raw: str
+    size: int
+    tables: List[str]
+    expires_at: float
+
+
+class SqlResultCache:
+    def __init__(self, ttls: Dict[str, int], default_ttl: int, max_bytes: int, max_entry_bytes: int):
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._by_table: Dict[str, Set[str]] = {}
+        # Bumped by invalidate(): results of queries that started before are not stored
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight("sql_result_cache")
+
+    @classmethod
+    def from_settings(cls) -> "SqlResultCache":
+        return cls(
+            ttls=_parse_ttls(settings.SQL_RESULT_CACHE_TTLS),
+            default_ttl=settings.SQL_RESULT_CACHE_DEFAULT_TTL,
+            max_bytes=settings.SQL_RESULT_CACHE_MAX_BYTES,
+            max_entry_bytes=settings.SQL_RESULT_CACHE_MAX_ENTRY_BYTES,
+        )
+
+    def ttl_for(self, tables: Sequence[str]) -> int:
+        if not tables:
+            return 0
+        return min(self.ttls.get(t, self.default_ttl) for t in tables)
+
+    # ---------- storage (lock held by callers) ----------
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry.raw
+
+    def _generation(self, tables: Sequence[str]) -> Tuple[int, Tuple[int, ...]]:
+        with self._lock:
+            return self._epoch, tuple(self._generations.get(t, 0) for t in tables)
+
+    def _set(self, key: str, raw: str, tables: List[str], ttl: int, generation: Tuple[int, Tuple[int, ...]]) -> None:
+        size = len(raw.encode("utf-8"))
+        if size > self.max_entry_bytes:
+            return
+        with self._lock:
+            if (self._epoch, tuple(self._generations.get(t, 0) for t in tables)) != generation:
+                # A table changed while the query ran: the result may predate the change
+                log.info(f"execute-sql result not cached, tables {tables} invalidated while it ran")
+                return
+            self._drop(key)
+            self._entries[key] = _Entry(raw=raw, size=size, tables=tables, expires_at=time.time() + ttl)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+            SQL_RESULT_CACHE_BYTES.set(self._bytes)
+
+    # ---------- public ----------
+
+    async def execute(self, sql: str) -> Any:
+        """Query through the cache (Laravel or replica, per SQL_EXECUTOR); errors and error payloads are never cached."""
+        tables = sorted(sql_tables(sql))
+        ttl = self.ttl_for(tables) if settings.SQL_RESULT_CACHE_ENABLED else 0
+        if ttl <= 0:
+            SQL_RESULT_CACHE_LOOKUPS.inc(result="bypass")
+            return await execute_sql(sql)
+
+        key = sql_key(sql)
+        raw = self._get(key)
+        if raw is not None:
+            SQL_RESULT_CACHE_LOOKUPS.inc(result="hit")
+            log.info(f"execute-sql result cache hit for tables {tables}")
+            # A fresh copy per hit: downstream nodes may modify the rows
+            return json.loads(raw)
+        SQL_RESULT_CACHE_LOOKUPS.inc(result="miss")
+
+        async def run() -> Any:
+            generation = self._generation(tables)
+            result = await execute_sql(sql)
+            if not (isinstance(result, dict) and result.get("error")):
+                self._set(key, json.dumps(result, ensure_ascii=False, default=str), tables, ttl, generation)
+            return result
+
+        return await self._flight.do(key, run)
+
+    def invalidate(self, tables: Optional[Sequence[str]] = None) -> int:
+        """Drop cached results reading any of `tables` (everything when empty)."""
+        with self._lock:
+            if not tables:
+                keys = list(self._entries)
+                self._epoch += 1
+            else:
+                names = {str(t).split(".")[-1].lower() for t in tables}
+                keys = {k for t in names for k in self._by_table.get(t, ())}
+                for table in names:
+                    self._generations[table] = self._generations.get(table, 0) + 1
+            for key in keys:
+                self._drop(key)
+            SQL_RESULT_CACHE_BYTES.set(self._bytes)
+        log.info(f"execute-sql result cache invalidated {len(keys)} entries (tables={list(tables or [])})")
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": settings.SQL_RESULT_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "default_ttl": self.default_ttl,
+                "ttls": self.ttls,
+                "tables": {table: len(keys) for table, keys in self._by_table.items()},
+            }
+
+
+sql_result_cache = SqlResultCache.from_settings()
@@ -0,0 +1,422 @@
+"""
+Parameterized SQL templates for recurring text-to-SQL question shapes.
+
+Much of the SQL traffic is the same question with different literals
+("projects at site ABC Tower in 2024" / "... at site Witting Group in
+2023"). Literals are replaced by typed slots:
+
+    REF   project reference IDs (US-EW-06112025-12987)
+    EMAIL e-mail addresses (post-actions; never bound into SQL)
+    TEXT  quoted strings
+    YEAR  1900-2099
+    NUM   other integers (top N, limits, thresholds)
+    NAME  runs of Capitalised / ACRONYM words after the first word
+
+which gives the question's shape ("projects at site <NAME> in <YEAR>").
+When SQL for a question executed successfully, every bound slot's literal
+is located in it (inside a string literal for REF/TEXT/NAME, as a bare
+number for YEAR/NUM) and replaced by a placeholder; a question whose
+literals cannot all be located, or whose number occurs more than once as
+a bare number in the SQL, is not templated. A later question with
+the same shape binds its own literals into the template:
+
+- strings are quoted with `'` doubled, rejected if they contain a
+  backslash or control characters, and have % and _ escaped inside LIKE
+  patterns; the case the original SQL used (lower / UPPER / as asked) is
+  kept;
+- numbers must parse as integers.
+
+Confidence gate: a template serves SQL (and both sqlgen LLM calls are
+skipped) only in SQL_TEMPLATE_CACHE_MODE="on", and only after its bound
+SQL matched the LLM's SQL in at least SQL_TEMPLATE_MIN_AGREEMENTS shadow
+comparisons with an agreement rate >= SQL_TEMPLATE_MIN_CONFIDENCE.
+Mismatches and served SQL that fails to execute count against it. Until
+then (and always in "shadow" mode) the LLM runs and its SQL is compared
+with the template's. An untrusted template whose shape produced different
+SQL is replaced by the newer one.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.services.intent_classifier import EMAIL_RE, REF_ID_RE, is_follow_up
+from app.services.semantic_cache import normalize_question
+from app.services.sql_example_store import normalize_sql
+from app.telemetry.metrics import REGISTRY
+import logging
+
+log = logging.getLogger("app.services.sql_template_cache")
+
+SQL_TEMPLATE_EVENTS = REGISTRY.counter(
+    "horizon_sql_template_cache_total",
+    "SQL template cache events: lookups (served, shadow, miss, unbindable, skipped), "
+    "shadow comparisons (agree, disagree), learning (learned, replaced, untemplatable) and served SQL failures.",
+)
+
+SQL_TEMPLATE_MODES = ("off", "shadow", "on")
+
+# Slot types whose literal must be located in (and bound into) the SQL
+BOUND_SLOT_TYPES = ("REF", "TEXT", "NAME", "YEAR", "NUM")
+STRING_SLOT_TYPES = ("REF", "TEXT", "NAME")
+
+MAX_SLOT_CHARS = 120
+
+# Quotes, not apostrophes ("O'Hara"): no word character outside the quote marks
+_QUOTED_RE = re.compile(r"(?<!\w)\"([^\"]{1,120})\"(?!\w)|(?<!\w)'([^']{1,120})'(?!\w)")
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+_NUM_RE = re.compile(r"\b\d+\b")
+_NAME_RE = re.compile(r"\b[A-Z][\w&'-]*\w(?:\s+[A-Z][\w&'-]*\w)*\b")
+_SQL_STRING_RE = re.compile(r"'((?:[^']|'')*)'")
+_LIKE_BEFORE_RE = re.compile(r"\blike\s*$", re.I)
+_UNSAFE_TEXT_RE = re.compile(r"[\\\x00-\x1f]")
+
+
+class Slot(BaseModel):
+    type: str
+    value: str
+    start: int
+    end: int
+
+
+def extract_slots(question: str) -> Tuple[str, List[Slot]]:
+    """(shape, slots): the normalized question with typed placeholders, and the literals in order."""
+    text = question or ""
+    taken: List[Tuple[int, int]] = []
+    slots: List[Slot] = []
+
+    def free(start: int, end: int) -> bool:
+        return all(end <= s or start >= e for s, e in taken)
+
+    def add(kind: str, start: int, end: int, value: str) -> None:
+        if free(start, end):
+            taken.append((start, end))
+            slots.append(Slot(type=kind, value=value, start=start, end=end))
+
+    for m in EMAIL_RE.finditer(text):
+        add("EMAIL", m.start(), m.end(), m.group(0))
+    for m in REF_ID_RE.finditer(text):
+        add("REF", m.start(), m.end(), m.group(0))
+    for m in _QUOTED_RE.finditer(text):
+        add("TEXT", m.start(), m.end(), m.group(1) or m.group(2))
+    for m in _YEAR_RE.finditer(text):
+        add("YEAR", m.start(), m.end(), m.group(0))
+    for m in _NUM_RE.finditer(text):
+        add("NUM", m.start(), m.end(), m.group(0))
+    first_word = re.match(r"\s*\S+", text)
+    for m in _NAME_RE.finditer(text):
+        start = m.start()
+        if first_word and start < first_word.end():
+            # The question's first word is capitalised anyway: drop it from the name
+            rest = re.match(r"\S+\s*", text[start:m.end()])
+            start += rest.end() if rest else 0
+            if start >= m.end():
+                continue
+        add("NAME", start, m.end(), text[start:m.end()])
+
+    slots.sort(key=lambda s: s.start)
+    pieces, last = [], 0
+    for slot in slots:
+        pieces.append(normalize_question(text[last:slot.start]))
+        pieces.append(f"<{slot.type}>")
+        last = slot.end
+    pieces.append(normalize_question(text[last:]))
+    return " ".join(p for p in pieces if p), slots
+
+
+class TemplatePart(BaseModel):
+    text: str = ""
+    # index into the question's bound slots; None for plain SQL text
+    slot: Optional[int] = None
+    # "lower", "upper" or "as_is" for string slots
+    case: str = "as_is"
+    like: bool = False
+
+
+class SqlTemplate(BaseModel):
+    shape: str
+    slot_types: List[str]
+    parts: List[TemplatePart]
+    modules: List[str] = []
+    sql: str
+    created_at: float
+    last_used_at: float
+    agreements: int = 0
+    mismatches: int = 0
+    failures: int = 0
+    served: int = 0
+
+    @property
+    def confidence(self) -> float:
+        total = self.agreements + self.mismatches + self.failures
+        return self.agreements / total if total else 0.0
+
+    @property
+    def trusted(self) -> bool:
+        return (
+            self.agreements >= settings.SQL_TEMPLATE_MIN_AGREEMENTS
+            and self.confidence >= settings.SQL_TEMPLATE_MIN_CONFIDENCE
+        )
+
+
+class TemplateMatch(BaseModel):
+    shape: str
+    sql: str
+    modules: List[str]
+    trusted: bool
+    confidence: float
+
+
+def _bound(slots: Sequence[Slot]) -> List[Slot]:
+    return [s for s in slots if s.type in BOUND_SLOT_TYPES]
+
+
+def _case_of(found: str, value: str) -> str:
+    if found == value:
+        return "as_is"
+    if found == value.lower():
+        return "lower"
+    if found == value.upper():
+        return "upper"
+    return ""
+
+
+def parameterize(sql: str, slots: Sequence[Slot]) -> Optional[List[TemplatePart]]:
+    """Template parts for `sql`, or None when some bound slot cannot be located unambiguously."""
+    bound = _bound(slots)
+    # (start, end, slot index, case, like) of every literal occurrence in the SQL
+    spans: List[Tuple[int, int, int, str, bool]] = []
+    strings = [(m.start(1), m.end(1), m.group(1)) for m in _SQL_STRING_RE.finditer(sql)]
+
+    def in_string(pos: int) -> bool:
+        return any(s <= pos < e for s, e, _ in strings)
+
+    for index, slot in enumerate(bound):
+        found = False
+        if slot.type in STRING_SLOT_TYPES:
+            needle = slot.value.replace("'", "''").lower()
+            for s, _, content in strings:
+                at = content.lower().find(needle)
+                while at >= 0:
+                    original = content[at:at + len(needle)].replace("''", "'")
+                    case = _case_of(original, slot.value)
+                    if not case:
+                        return None
+                    like = bool(_LIKE_BEFORE_RE.search(sql[: s - 1]))
+                    spans.append((s + at, s + at + len(needle), index, case, like))
+                    found = True
+                    at = content.lower().find(needle, at + len(needle))
+        else:
+            bare = 0
+            for m in re.finditer(rf"(?<![\w.]){re.escape(slot.value)}(?![\w.])", sql):
+                # Years may also start a date literal ('2024-01-01')
+                if not in_string(m.start()):
+                    bare += 1
+                elif not (slot.type == "YEAR" and sql[m.end():m.end() + 1] == "-"):
+                    continue
+                spans.append((m.start(), m.end(), index, "as_is", False))
+                found = True
+            if bare > 1:
+                # The number also stands for something else (LIMIT 30, status = 2): no telling which
+                return None
+        if not found:
+            return None
+
+    spans.sort()
+    for (_, end, *_), (start, *_) in zip(spans, spans[1:]):
+        if start < end:
+            # Two slots claim the same SQL text (e.g. the same literal twice)
+            return None
+    parts: List[TemplatePart] = []
+    last = 0
+    for start, end, index, case, like in spans:
+        if start > last:
+            parts.append(TemplatePart(text=sql[last:start]))
+        parts.append(TemplatePart(slot=index, case=case, like=like))
+        last = end
+    if last < len(sql):
+        parts.append(TemplatePart(text=sql[last:]))
+    return parts
+
+
+def _bind_value(slot: Slot, part: TemplatePart) -> Optional[str]:
+    if slot.type in ("YEAR", "NUM"):
+        try:
+            return str(int(slot.value))
+        except ValueError:
+            return None
+    value = slot.value
+    if len(value) > MAX_SLOT_CHARS or _UNSAFE_TEXT_RE.search(value):
+        return None
+    if part.case == "lower":
+        value = value.lower()
+    elif part.case == "upper":
+        value = value.upper()
+    if part.like:
+        # MySQL's default LIKE escape character is the backslash
+        value = value.replace("%", "\\%").replace("_", "\\_")
+    return value.replace("'", "''")
+
+
+def bind(template: SqlTemplate, slots: Sequence[Slot]) -> Optional[str]:
+    bound = _bound(slots)
+    if [s.type for s in bound] != template.slot_types:
+        return None
+    out = []
+    for part in template.parts:
+        if part.slot is None:
+            out.append(part.text)
+            continue
+        value = _bind_value(bound[part.slot], part)
+        if value is None:
+            return None
+        out.append(value)
+    return "".join(out)
+
+
+class SqlTemplateCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._templates: "OrderedDict[str, SqlTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def mode(self) -> str:
+        mode = (settings.SQL_TEMPLATE_CACHE_MODE or "off").lower()
+        return mode if mode in SQL_TEMPLATE_MODES else "off"
+
+    def lookup(self, question: str, has_history: bool = False) -> Optional[TemplateMatch]:
+        """Bound SQL for a question of a known shape (`trusted` says whether it may be served)."""
+        if self.mode == "off":
+            return None
+        if is_follow_up(question, has_history):
+            SQL_TEMPLATE_EVENTS.inc(event="skipped")
+            return None
+        shape, slots = extract_slots(question)
+        if not _bound(slots):
+            # Nothing to parameterize: the semantic cache covers repeats
+            return None
+        with self._lock:
+            template = self._templates.get(shape)
+            if template is not None:
+                self._templates.move_to_end(shape)
+                template.last_used_at = time.time()
+        if template is None:
+            SQL_TEMPLATE_EVENTS.inc(event="miss")
+            return None
+        sql = bind(template, slots)
+        if sql is None:
+            SQL_TEMPLATE_EVENTS.inc(event="unbindable")
+            return None
+        with self._lock:
+            trusted = self.mode == "on" and template.trusted
+            if trusted:
+                template.served += 1
+        SQL_TEMPLATE_EVENTS.inc(event="served" if trusted else "shadow")
+        return TemplateMatch(
+            shape=shape, sql=sql, modules=template.modules, trusted=trusted, confidence=round(template.confidence, 4)
+        )
+
+    def compare(self, match: TemplateMatch, llm_sql: Optional[str]) -> bool:
+        """Shadow check of the template's SQL against the LLM's for the same question."""
+        agree = bool(llm_sql) and normalize_sql(match.sql) == normalize_sql(llm_sql)
+        SQL_TEMPLATE_EVENTS.inc(event="agree" if agree else "disagree")
+        with self._lock:
+            template = self._templates.get(match.shape)
+            if template is not None:
+                if agree:
+                    template.agreements += 1
+                else:
+                    template.mismatches += 1
+        if not agree:
+            log.info(f"SQL template disagreed with the LLM for shape {match.shape!r}:\n{match.sql}\n{llm_sql}")
+        return agree
+
+    def learn(
+        self,
+        question: str,
+        sql: Optional[str],
+        modules: Optional[Sequence[str]],
+        has_history: bool = False,
+        served: bool = False,
+        failed: bool = False,
+    ) -> None:
+        """Feedback after execution: learn a template from LLM SQL that ran, or penalize served SQL that failed."""
+        if self.mode == "off" or not sql or is_follow_up(question, has_history):
+            return
+        shape, slots = extract_slots(question)
+        if served:
+            if failed:
+                SQL_TEMPLATE_EVENTS.inc(event="failed")
+                with self._lock:
+                    template = self._templates.get(shape)
+                    if template is not None:
+                        template.failures += 1
+                log.warning(f"SQL served from template {shape!r} failed to execute")
+            return
+        if failed or modules is None or not _bound(slots):
+            return
+        parts = parameterize(sql, slots)
+        if parts is None:
+            SQL_TEMPLATE_EVENTS.inc(event="untemplatable")
+            return
+        now = time.time()
+        template = SqlTemplate(
+            shape=shape,
+            slot_types=[s.type for s in _bound(slots)],
+            parts=parts,
+            modules=sorted(set(modules)),
+            sql=sql,
+            created_at=now,
+            last_used_at=now,
+        )
+        with self._lock:
+            existing = self._templates.get(shape)
+            if existing is not None and (existing.parts == template.parts or existing.trusted):
+                return
+            self._templates[shape] = template
+            self._templates.move_to_end(shape)
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+        SQL_TEMPLATE_EVENTS.inc(event="replaced" if existing is not None else "learned")
+
+    def invalidate(self, match: Optional[str] = None) -> int:
+        """Drop every template, or those whose shape or SQL contains `match` (e.g. a table name)."""
+        needle = (match or "").lower()
+        with self._lock:
+            keys = [
+                k for k, t in self._templates.items() if not needle or needle in k or needle in t.sql.lower()
+            ]
+            for key in keys:
+                del self._templates[key]
+        log.info(f"SQL template cache invalidated {len(keys)} templates (match={match!r})")
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            templates = list(self._templates.values())
+        return {
+            "mode": self.mode,
+            "templates": len(templates),
+            "trusted": sum(1 for t in templates if t.trusted),
+            "max_entries": self.max_entries,
+            "top": [
+                {
+                    "shape": t.shape,
+                    "agreements": t.agreements,
+                    "mismatches": t.mismatches,
+                    "failures": t.failures,
+                    "served": t.served,
+                    "confidence": round(t.confidence, 4),
+                }
+                for t in sorted(templates, key=lambda t: t.agreements + t.served, reverse=True)[:20]
+            ],
+        }
+
+
+sql_templates = SqlTemplateCache(max_entries=settings.SQL_TEMPLATE_MAX_ENTRIES)
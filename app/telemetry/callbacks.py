@@ -1,4 +1,21 @@
-import time, structlog
+import asyncio
+import functools
+import time
+from typing import Any, Callable, Dict, Optional
+from uuid import UUID
+
+import structlog
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.core.deadline import deadline_scope
+from app.telemetry.metrics import (
+    GRAPH_NODE_SECONDS,
+    LLM_COMPLETION_TOKENS,
+    LLM_PROMPT_TOKENS,
+    LLM_REQUEST_SECONDS,
+    SPAN_SECONDS,
+)
 
 
 log = structlog.get_logger()
@@ -8,9 +25,8 @@ class Trace:
     def __init__(self, request_id: str):
         self.request_id = request_id
 
-
-def span(self, name: str):
-    return _Span(name, self.request_id)
+    def span(self, name: str):
+        return _Span(name, self.request_id)
 
 
 class _Span:
@@ -18,12 +34,117 @@ class _Span:
         self.name = name
         self.request_id = request_id
 
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        SPAN_SECONDS.observe(elapsed, name=self.name)
+        log.info("span", request_id=self.request_id, name=self.name, duration_ms=int(elapsed * 1000))
+
+
+# ---------- LLM instrumentation ----------
+
+
+def _token_usage(response: LLMResult) -> tuple[Optional[int], Optional[int]]:
+    """Extract (prompt, completion) token counts across OpenAI / Bedrock shapes."""
+    try:
+        message = response.generations[0][0].message  # type: ignore[attr-defined]
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            return usage.get("input_tokens"), usage.get("output_tokens")
+    except (IndexError, AttributeError):
+        pass
+
+    llm_output = response.llm_output or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+    prompt = usage.get("prompt_tokens", usage.get("input_tokens"))
+    completion = usage.get("completion_tokens", usage.get("output_tokens"))
+    return prompt, completion
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """
+    Records latency and token usage for every chat model call.
+
+    Attached to the underlying LangChain chat model by each provider, so the
+    provider/model labels are known up front and every call path (chains,
+    `.chat()`, `.complete()`) is covered.
+    """
+
+    run_inline = True
+
+    def __init__(self, provider: str, model: Optional[str]):
+        self.provider = provider
+        self.model = model or "default"
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            LLM_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, provider=self.provider, model=self.model, status="ok"
+            )
+        prompt_tokens, completion_tokens = _token_usage(response)
+        if prompt_tokens is not None:
+            LLM_PROMPT_TOKENS.observe(prompt_tokens, provider=self.provider, model=self.model)
+        if completion_tokens is not None:
+            LLM_COMPLETION_TOKENS.observe(completion_tokens, provider=self.provider, model=self.model)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            LLM_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, provider=self.provider, model=self.model, status="error"
+            )
+
+
+# ---------- LangGraph node instrumentation ----------
+
+
+def instrument_node(fn: Callable, name: Optional[str] = None) -> Callable:
+    """
+    Wrap a LangGraph node (sync or async) so its wall time is recorded in
+    `horizon_graph_node_duration_seconds{node, status}`. The request
+    deadline carried in `state["deadline"]` is bound for the node's duration.
+    """
+    node_name = name or getattr(fn, "__name__", "node")
+
+    if asyncio.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(state, *args, **kwargs):
+            started = time.perf_counter()
+            status = "ok"
+            try:
+                with deadline_scope(state.get("deadline")):
+                    return await fn(state, *args, **kwargs)
+            except BaseException:
+                status = "error"
+                raise
+            finally:
+                GRAPH_NODE_SECONDS.observe(time.perf_counter() - started, node=node_name, status=status)
 
-def __enter__(self):
-    self.start = time.time()
-    return self
+        return async_wrapper
 
+    @functools.wraps(fn)
+    def sync_wrapper(state, *args, **kwargs):
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            with deadline_scope(state.get("deadline")):
+                return fn(state, *args, **kwargs)
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            GRAPH_NODE_SECONDS.observe(time.perf_counter() - started, node=node_name, status=status)
 
-def __exit__(self, exc_type, exc, tb):
-    dur = int((time.time() - self.start) * 1000)
-    log.info("span", request_id=self.request_id, name=self.name, duration_ms=dur)
\ No newline at end of file
+    return sync_wrapper
@@ -0,0 +1,223 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are keyed by a sorted label tuple and
+rendered by `render_latest()` for the `/metrics` endpoint. Everything is
+guarded by a single lock; updates are O(buckets) and cheap enough for the
+request path.
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+_lock = threading.Lock()
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: Iterable[Tuple[str, str]]) -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in key]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        with _lock:
+            return [(dict(k), v) for k, v in self._values.items()]
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(k)} {_format_value(v)}"
+            for k, v in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with _lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(k)} {_format_value(v)}"
+            for k, v in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label key -> [bucket counts..., sum, count]
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> float:
+        series = self._series.get(_label_key(labels))
+        return series[-1] if series else 0.0
+
+    def _render_samples(self) -> List[str]:
+        lines: List[str] = []
+        for key, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = _format_value(bound)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(key + (('le', le),))} {_format_value(cumulative)}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get_or_create(self, cls, name: str, documentation: str, **kwargs):
+        with _lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._get_or_create(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation)
+
+    def histogram(self, name: str, documentation: str, buckets: Optional[Iterable[float]] = None) -> Histogram:
+        kwargs = {"buckets": buckets} if buckets is not None else {}
+        return self._get_or_create(Histogram, name, documentation, **kwargs)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
+
+
+# ---------- Shared application metrics ----------
+
+GRAPH_NODE_SECONDS = REGISTRY.histogram(
+    "horizon_graph_node_duration_seconds", "Wall time spent in each LangGraph node."
+)
+GRAPH_BUILD_SECONDS = REGISTRY.histogram(
+    "horizon_graph_build_seconds", "Time spent compiling a graph version."
+)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "horizon_llm_request_duration_seconds", "LLM call latency per provider and model."
+)
+LLM_PROMPT_TOKENS = REGISTRY.histogram(
+    "horizon_llm_prompt_tokens", "Prompt tokens per LLM call.", buckets=TOKEN_BUCKETS
+)
+LLM_COMPLETION_TOKENS = REGISTRY.histogram(
+    "horizon_llm_completion_tokens", "Completion tokens per LLM call.", buckets=TOKEN_BUCKETS
+)
+LARAVEL_REQUEST_SECONDS = REGISTRY.histogram(
+    "horizon_laravel_request_duration_seconds", "Latency of Laravel MCP API tool calls."
+)
+SPAN_SECONDS = REGISTRY.histogram(
+    "horizon_span_duration_seconds", "Duration of ad-hoc tracing spans."
+)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Settings has required fields; tests never talk to DigitalOcean
+os.environ.setdefault("DO_MAX_TOKENS", "512")
+os.environ.setdefault("DO_TIMEOUT", "30")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
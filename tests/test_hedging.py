@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from langchain_core.callbacks import AsyncCallbackManager
+from langchain_core.tracers.event_stream import _AstreamEventsCallbackHandler
+
+from app.core.config import settings
+from app.llms.runnable import hedging
+from app.llms.runnable.hedging import Hedger
+
+
+class FakeLLM:
+    temperature = 0.0
+    max_tokens = 64
+
+    def __init__(self, provider_name, model_id, delay=0.0, result=None, error=None):
+        self.provider_name = provider_name
+        self.model_id = model_id
+        self.delay = delay
+        self.result = result
+        self.error = error
+        self.calls = []
+
+    async def _ainvoke_admitted(self, input, config, kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def hedger(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_HEDGE_PROVIDERS", "do_serverless")
+    monkeypatch.setattr(settings, "LLM_HEDGE_SECONDARY", "openai:gpt-4o-mini")
+    monkeypatch.setattr(settings, "LLM_HEDGE_MAX_DELAY_SECONDS", 0.05)
+    return Hedger()
+
+
+def test_failure_after_delay_fails_over_when_budget_is_spent(hedger, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_MAX_RATE", 0.0)
+    hedger._budget = 0.0
+    primary = FakeLLM("do_serverless", "llama", delay=0.1, error=RuntimeError("502 Bad Gateway"))
+    secondary = FakeLLM("openai", "gpt-4o-mini", result="from secondary")
+    monkeypatch.setattr(hedger, "_secondary_llm", lambda llm: secondary)
+
+    assert asyncio.run(hedger.call(primary, "hi", None, {})) == "from secondary"
+    assert len(secondary.calls) == 1
+
+
+def test_failure_after_delay_without_secondary_raises(hedger, monkeypatch):
+    primary = FakeLLM("do_serverless", "llama", delay=0.1, error=RuntimeError("502 Bad Gateway"))
+    monkeypatch.setattr(hedger, "_secondary_llm", lambda llm: None)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(hedger.call(primary, "hi", None, {}))
+
+
+def test_deadline_is_not_failed_over(hedger, monkeypatch):
+    primary = FakeLLM("do_serverless", "llama", error=hedging.DeadlineExceeded("deadline"))
+    secondary = FakeLLM("openai", "gpt-4o-mini", result="from secondary")
+    monkeypatch.setattr(hedger, "_secondary_llm", lambda llm: secondary)
+
+    with pytest.raises(hedging.DeadlineExceeded):
+        asyncio.run(hedger.call(primary, "hi", None, {}))
+    assert secondary.calls == []
+
+
+def test_streaming_calls_are_not_hedged(hedger, monkeypatch):
+    primary = FakeLLM("do_serverless", "llama", delay=0.1, result="from primary")
+    secondary = FakeLLM("openai", "gpt-4o-mini", result="from secondary")
+    monkeypatch.setattr(hedger, "_secondary_llm", lambda llm: secondary)
+
+    async def streamed():
+        # The event-stream handler astream_events attaches (it needs a running loop)
+        config = {"callbacks": AsyncCallbackManager(handlers=[_AstreamEventsCallbackHandler()])}
+        return await hedger.call(primary, "hi", config, {})
+
+    assert asyncio.run(streamed()) == "from primary"
+    assert secondary.calls == []
+
+
+def test_provider_specific_kwargs_are_not_sent_to_the_secondary(hedger, monkeypatch):
+    primary = FakeLLM("do_serverless", "llama", error=RuntimeError("500"))
+    secondary = FakeLLM("openai", "gpt-4o-mini", result="from secondary")
+    monkeypatch.setattr(hedger, "_secondary_llm", lambda llm: secondary)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(hedger.call(primary, "hi", None, {"tools": [{"name": "x"}]}))
+    assert secondary.calls == []
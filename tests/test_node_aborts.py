@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from app.core.deadline import DeadlineExceeded
+from app.graphs.nodes import app_info_node as node
+from app.llms.runnable.admission import AdmissionRejected
+
+
+def _failing_llm(error):
+    def raise_error(_):
+        raise error
+
+    return RunnableLambda(raise_error)
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    async def no_docs(state, intent):
+        return []
+
+    async def no_hit(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(node, "get_documents", no_docs)
+    monkeypatch.setattr(node.semantic_cache, "lookup", no_hit)
+    monkeypatch.setattr(node.semantic_cache, "store", no_hit)
+
+
+@pytest.mark.parametrize(
+    "error", [AdmissionRejected("do_serverless", "llama", "queue_full", 2.0), DeadlineExceeded("deadline")]
+)
+def test_request_aborts_propagate(monkeypatch, error):
+    monkeypatch.setattr(node, "get_chain_llm", lambda *args: _failing_llm(error))
+    with pytest.raises(type(error)):
+        asyncio.run(node.app_info_node({"user_input": "how do I create a work request?"}))
+
+
+def test_other_llm_errors_still_get_the_fallback_answer(monkeypatch):
+    monkeypatch.setattr(node, "get_chain_llm", lambda *args: _failing_llm(RuntimeError("500")))
+    state = asyncio.run(node.app_info_node({"user_input": "how do I create a work request?"}))
+    assert state["response"].startswith("Sorry")
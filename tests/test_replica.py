@@ -0,0 +1,43 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.core.deadline import Deadline, DeadlineExceeded, deadline_scope
+from app.db.replica import ReplicaExecutor
+
+SLOW_SQL = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 50000000) SELECT COUNT(*) FROM c"
+
+
+@pytest.fixture
+def replica(tmp_path):
+    path = tmp_path / "replica.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY, project_title TEXT, cost NUMERIC)")
+        conn.executemany("INSERT INTO projects VALUES (?, ?, ?)", [(i, f"Project {i}", i * 10.5) for i in range(1, 4)])
+    return ReplicaExecutor(f"sqlite+aiosqlite:///{path}", pool_size=2, max_overflow=0, pool_timeout=1, pool_recycle=60)
+
+
+def _run(replica, coro_fn):
+    async def main():
+        try:
+            return await coro_fn()
+        finally:
+            await replica.dispose()
+
+    return asyncio.run(main())
+
+
+def test_rows_and_read_only(replica):
+    result = _run(replica, lambda: replica.execute("SELECT id, project_title FROM projects WHERE project_title LIKE '%2%'"))
+    assert result == {"rows": [{"id": 2, "project_title": "Project 2"}]}
+    assert "error" in _run(replica, lambda: replica.execute("DELETE FROM projects"))
+
+
+def test_query_is_bounded_by_the_request_deadline(replica):
+    async def within_deadline():
+        with deadline_scope(Deadline(0.2)):
+            return await replica.execute(SLOW_SQL)
+
+    with pytest.raises(DeadlineExceeded):
+        _run(replica, within_deadline)
@@ -0,0 +1,51 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.semantic_cache import SemanticCache, content_words
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ("projects for tesco", "projects for asda"),
+        ("show open projects", "show closed projects"),
+        ("labour cost this month", "labour cost last month"),
+        ("top 5 vendors by spend", "top 10 vendors by spend"),
+        ("open projects in UK", "open projects in US"),
+        ("cost by vendor", "cost of vendor"),
+    ],
+)
+def test_different_questions_have_different_content_words(a, b):
+    assert content_words(a) != content_words(b)
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ("Show me the open projects", "list open projects"),
+        ("What are the open projects?", "open projects please"),
+    ],
+)
+def test_rephrasings_have_the_same_content_words(a, b):
+    assert content_words(a) == content_words(b)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_THRESHOLDS", '{"text_to_sql": 0.95}')
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_TTLS", '{"text_to_sql": 3600}')
+    # Every question embeds identically: only the guard can tell them apart
+    monkeypatch.setattr(SemanticCache, "_embed", staticmethod(lambda text: np.ones(4, dtype=np.float32) / 2))
+    return SemanticCache()
+
+
+def test_text_to_sql_hit_requires_same_content_words(cache):
+    asyncio.run(cache.store("text_to_sql", "projects for tesco", "SELECT 1"))
+
+    assert asyncio.run(cache.lookup("text_to_sql", "projects for asda")) is None
+    hit = asyncio.run(cache.lookup("text_to_sql", "show me the projects for Tesco"))
+    assert hit is not None and hit.answer == "SELECT 1"
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import sql_result_cache as module
+from app.services.sql_result_cache import SqlResultCache, normalize_sql, sql_tables
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(settings, "SQL_RESULT_CACHE_ENABLED", True)
+    return SqlResultCache({"projects": 60}, default_ttl=60, max_bytes=1 << 20, max_entry_bytes=1 << 16)
+
+
+def test_normalization_and_tables():
+    assert normalize_sql("select  `id` from Projects -- x\n LIMIT 007;") == normalize_sql("SELECT id FROM projects LIMIT 7")
+    assert sql_tables("SELECT p.id FROM projects p JOIN project_statuses AS ps ON 1 = 1") == {"projects", "project_statuses"}
+
+
+def test_hit_after_miss(cache, monkeypatch):
+    calls = []
+
+    async def execute(sql):
+        calls.append(sql)
+        return {"rows": [{"id": 1}]}
+
+    monkeypatch.setattr(module, "execute_sql", execute)
+
+    async def main():
+        first = await cache.execute("SELECT id FROM projects LIMIT 1")
+        second = await cache.execute("select id from projects limit 1")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == second == {"rows": [{"id": 1}]}
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("tables", [["projects"], None])
+def test_invalidation_during_a_running_query_is_not_overwritten(cache, monkeypatch, tables):
+    started = None
+
+    async def execute(sql):
+        started.set()
+        await asyncio.sleep(0.05)
+        return {"rows": [{"cost": "before the change"}]}
+
+    monkeypatch.setattr(module, "execute_sql", execute)
+
+    async def main():
+        nonlocal started
+        started = asyncio.Event()
+        query = asyncio.ensure_future(cache.execute("SELECT cost FROM projects LIMIT 1"))
+        await started.wait()
+        cache.invalidate(tables)
+        await query
+
+    asyncio.run(main())
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,56 @@
+import asyncio
+
+from app.graphs.nodes import sqlexec_node as node
+from app.safety.sql_validator import sql_guard
+from app.services.sql_template_cache import SqlTemplateCache, extract_slots, parameterize
+
+
+async def _noop(*args, **kwargs):
+    return None
+
+
+def test_guard_rewritten_sql_still_agrees_in_shadow_mode(monkeypatch):
+    templates = SqlTemplateCache(max_entries=10)
+    executed = []
+
+    async def execute(sql):
+        executed.append(sql)
+        return {"rows": [{"id": 1}]}
+
+    async def catalog():
+        return {"projects": ["id", "created_at"]}
+
+    monkeypatch.setattr(node, "sql_templates", templates)
+    monkeypatch.setattr(node.sql_result_cache, "execute", execute)
+    monkeypatch.setattr(node.semantic_cache, "store", _noop)
+    monkeypatch.setattr(node.sql_examples, "record", _noop)
+    monkeypatch.setattr(sql_guard, "catalog", catalog)
+
+    llm_sql = "SELECT id FROM projects WHERE YEAR(created_at) = {year} LIMIT 10;"
+    state = {"user_input": "projects created in 2024", "sql": llm_sql.format(year=2024), "sql_modules": ["projects"]}
+    state = asyncio.run(node.sqlexec_node(state))
+
+    # The guard rewrote the SQL that ran, the template learned the generated SQL
+    assert "YEAR(" not in executed[0]
+    assert state["sql_raw"] == llm_sql.format(year=2024)
+
+    match = templates.lookup("projects created in 2023")
+    assert match is not None and match.sql == llm_sql.format(year=2023)
+    assert templates.compare(match, llm_sql.format(year=2023))
+
+
+def test_number_that_also_appears_as_another_literal_is_not_templated():
+    _, slots = extract_slots("top 30 projects in 2024")
+    assert parameterize("SELECT id FROM projects WHERE YEAR(created_at) = 2024 ORDER BY cost DESC LIMIT 30", slots)
+    ambiguous = "SELECT id FROM projects WHERE status = 30 AND YEAR(created_at) = 2024 LIMIT 30"
+    assert parameterize(ambiguous, slots) is None
+
+    templates = SqlTemplateCache(max_entries=10)
+    templates.learn("top 30 projects in 2024", ambiguous, ["projects"])
+    assert templates.stats()["templates"] == 0
+
+
+def test_year_in_date_literals_stays_bound():
+    _, slots = extract_slots("projects created in 2024")
+    parts = parameterize("SELECT id FROM projects WHERE created_at >= '2024-01-01' AND YEAR(created_at) = 2024", slots)
+    assert [part.slot for part in parts if part.slot is not None] == [0, 0]
@@ -0,0 +1,113 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.safety import sql_validator
+from app.safety.sql_validator import SqlRejected, clamp_limit, is_safe_sql, sql_guard, validate_sql
+from app.schemas.registry import SCHEMA_REGISTRY
+from app.services.schema_index import schema_index
+
+LARGE_TABLES = ["projects", "project_labours", "project_vendors", "project_financials"]
+GOLD = [
+    json.loads(line)
+    for line in (Path(__file__).resolve().parents[1] / "extras/bench/sql_questions.jsonl").read_text().splitlines()
+    if line.strip()
+]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return {table: list(columns) for table, columns in schema_index.index_for(SCHEMA_REGISTRY).tables.items()}
+
+
+@pytest.mark.parametrize("item", GOLD, ids=[item["question"] for item in GOLD])
+def test_gold_queries_pass_enforce_mode(item, catalog):
+    result = validate_sql(item["sql"], catalog, 100, LARGE_TABLES, enforce=True)
+    assert result.violations == []
+
+
+def test_table_missing_from_catalog_is_only_a_warning(catalog):
+    sql = "SELECT pl.total FROM project_labours AS pl JOIN projects AS p ON pl.project_id = p.id LIMIT 5"
+    result = validate_sql(sql, catalog, 100, LARGE_TABLES, enforce=True)
+    assert result.sql == sql
+    assert result.warnings == ["table project_labours not in the schema catalog"]
+
+
+def test_unknown_column_of_known_table_is_rejected(catalog):
+    with pytest.raises(SqlRejected, match="unknown column projects.nope"):
+        validate_sql("SELECT nope FROM projects", catalog, 100, LARGE_TABLES, enforce=True)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "DELETE FROM projects",
+        "SELECT 1; DROP TABLE projects",
+        "SELECT id FROM projects FOR UPDATE",
+        "SELECT SLEEP(5)",
+        "SELECT * FROM information_schema.tables",
+    ],
+)
+def test_unsafe_sql_is_rejected_in_any_mode(sql, catalog):
+    with pytest.raises(SqlRejected):
+        validate_sql(sql, catalog, 100, LARGE_TABLES, enforce=False)
+
+
+def test_star_is_expanded_and_limit_clamped(catalog):
+    result = validate_sql("SELECT p.* FROM projects p LIMIT 500", catalog, 100, LARGE_TABLES)
+    assert result.sql.startswith("SELECT p.id, p.site_name, p.project_title")
+    assert result.sql.endswith("LIMIT 100")
+
+
+def test_cartesian_join_and_non_sargable_predicate(catalog):
+    with pytest.raises(SqlRejected, match="cartesian join"):
+        validate_sql("SELECT p.id FROM projects p, project_statuses s", catalog, 100, LARGE_TABLES)
+    with pytest.raises(SqlRejected, match="non-sargable"):
+        validate_sql("SELECT id FROM projects WHERE cost + 1 > 5", catalog, 100, LARGE_TABLES)
+    result = validate_sql("SELECT id FROM projects WHERE site_name LIKE '%tower%'", catalog, 100, LARGE_TABLES)
+    assert result.violations == []
+
+
+def test_year_predicate_is_rewritten_as_range():
+    catalog = {"projects": ["id", "created_at"]}
+    result = validate_sql("SELECT id FROM projects WHERE YEAR(created_at) = 2024", catalog, 100, LARGE_TABLES)
+    assert "created_at >= '2024-01-01' AND created_at < '2025-01-01'" in result.sql
+
+
+def test_legacy_helpers():
+    assert is_safe_sql("SELECT 1 LIMIT 1")
+    assert not is_safe_sql("SELECT 1")
+    assert clamp_limit("SELECT id FROM projects LIMIT 1000") == "SELECT id FROM projects LIMIT 100"
+
+
+def test_guard_off_passes_missing_sql(monkeypatch):
+    monkeypatch.setattr(settings, "SQL_GUARD_MODE", "off")
+    assert asyncio.run(sql_guard.check(None)).sql is None
+
+
+def test_catalog_is_built_once_per_schema_version(monkeypatch):
+    from app.services import schema_cache as schema_cache_module
+
+    builds = []
+    bundle = schema_cache_module._bundle(["projects"], SCHEMA_REGISTRY, "v1")
+
+    async def get(modules, prefetched=None):
+        return bundle
+
+    def build(schema):
+        builds.append(schema)
+        return {"projects": ["id"]}
+
+    monkeypatch.setattr(schema_cache_module.schema_cache, "get", get)
+    monkeypatch.setattr(sql_validator, "_build_catalog", build)
+    guard = sql_validator.SqlGuard()
+    assert asyncio.run(guard.catalog()) == {"projects": ["id"]}
+    assert asyncio.run(guard.catalog()) == {"projects": ["id"]}
+    assert len(builds) == 1
+
+    bundle = schema_cache_module._bundle(["projects"], SCHEMA_REGISTRY, "v2")
+    asyncio.run(guard.catalog())
+    assert len(builds) == 2